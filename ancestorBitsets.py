@@ -0,0 +1,255 @@
+# Copyright (c) 2011 Julian Wintermayr
+# 
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+
+import cPickle
+import struct
+import commonAncestor
+
+
+# Bytes of a bitset which are scanned bit by bit, longer ones are split
+SCAN_BYTES = 32
+
+
+
+def fromBytes(data):
+	"""
+	Return the integer of the little-endian bytes data. Python 2 has no int.from_bytes(), but
+	the pickle opcode LONG4 converts bytes in linear time (int(hexString, 16) doesn't).
+	"""
+	return cPickle.loads(b'\x80\x02\x8b' + struct.pack('<i', len(data) + 1) + str(data) + b'\x00.')
+
+
+def toBytes(bits):
+	"""
+	Return the little-endian bytes of a non-negative integer, the inverse of fromBytes().
+	"""
+	data = cPickle.dumps(long(bits), 2)
+
+	# Opcode LONG1 has one byte of length, LONG4 four
+	return data[4:-1] if data[2] == b'\x8a' else data[7:-1]
+
+
+
+class AncestorBitsets:
+	"""
+	Class for the ancestor sets of many mathematicians as bitsets. The ancestors of the searched
+	mathematicians are visited once and re-indexed densely by their height (the length of the
+	longest path from a mathematician without advisors, as in commonAncestor.LCAFinder), so that
+	the bit of index i stands for persons[i] and higher bits never belong to lower heights. Ancestor
+	sets are Python integers: the set of a mathematician is the union of the sets of their advisors,
+	intersections and unions work on whole machine words, and the highest bit of a set is one of
+	its deepest mathematicians.
+	"""
+	def __init__(self, advisorsOf, studentsOf):
+		self.advisorsOf = advisorsOf
+		self.studentsOf = studentsOf
+		self.persons = []
+		self.index = {}
+		self.heights = {}
+		self.levelStarts = {}
+		self.bitsets = {}
+
+		# For the paths from the LCA down to the IDs
+		self.finder = commonAncestor.LCAFinder(advisorsOf, studentsOf, self.ancestorSet)
+
+
+	def reindex(self, ids):
+		"""
+		Index the ancestors of ids and of the mathematicians indexed before and create their bitsets.
+		Advisors are done before their students. Those left over have an advisor in a cycle of the
+		table 'advised' and get their height from LCAFinder.height().
+		"""
+		if all(id in self.index for id in ids):
+			return
+
+		advisors = {}
+		stack = list(ids) + self.persons
+
+		while stack:
+			person = stack.pop()
+
+			if person not in advisors:
+				advisors[person] = list(self.advisorsOf(person))
+				stack.extend(advisors[person])
+
+		pending = dict((person, len(personAdvisors)) for person, personAdvisors in advisors.items())
+		students = dict((person, []) for person in advisors)
+
+		for person, personAdvisors in advisors.items():
+			for advisor in personAdvisors:
+				students[advisor].append(person)
+
+		order = [person for person in advisors if pending[person] == 0]
+		heights = dict((person, 0) for person in order)
+
+		for advisor in order:
+			for student in students[advisor]:
+				heights[student] = max(heights.get(student, 0), heights[advisor] + 1)
+				pending[student] -= 1
+
+				if pending[student] == 0:
+					order.append(student)
+
+		leftOver = [person for person in advisors if pending[person] > 0]
+
+		if len(leftOver) > 0:
+			finder = commonAncestor.LCAFinder(self.advisorsOf, self.studentsOf)
+			finder.heights = dict((person, heights[person]) for person in order)
+
+			for person in leftOver:
+				heights[person] = finder.height(person)
+
+		self.persons = sorted(advisors, key=lambda person: (heights[person], person))
+		self.index = dict((person, index) for index, person in enumerate(self.persons))
+		self.heights = heights
+		self.levelStarts = {}
+		self.bitsets = {}
+
+		for index in xrange(len(self.persons) - 1, -1, -1):
+			self.levelStarts[heights[self.persons[index]]] = index
+
+		for person in order:
+			bits = 1 << self.index[person]
+
+			for advisor in advisors[person]:
+				bits |= self.bitsets[advisor]
+
+			self.bitsets[person] = bits
+
+		for person in leftOver:
+			bits = bytearray(len(self.persons) // 8 + 1)
+
+			for ancestor in commonAncestor.LCAFinder(self.advisorsOf, self.studentsOf).ancestors(person):
+				index = self.index[ancestor]
+				bits[index >> 3] |= 1 << (index & 7)
+
+			self.bitsets[person] = fromBytes(bits)
+
+
+	def ancestors(self, id):
+		"""
+		Return the bitset of id and all its ancestors.
+		"""
+		self.reindex([id])
+
+		return self.bitsets[id]
+
+
+	def ancestorSet(self, id):
+		return set(self.members(self.ancestors(id)))
+
+
+	def members(self, bits):
+		"""
+		Return the list of the IDs of a bitset, the deepest first. Runs of zero bytes are skipped
+		by lstrip() and rstrip(), the remaining bytes are split in halves until they are short.
+		"""
+		indexes = []
+		stack = [(0, toBytes(bits))]
+
+		while stack:
+			offset, data = stack.pop()
+			trimmed = data.lstrip(b'\x00')
+			offset += len(data) - len(trimmed)
+			trimmed = trimmed.rstrip(b'\x00')
+
+			if len(trimmed) > SCAN_BYTES:
+				half = len(trimmed) // 2
+				stack.append((offset, trimmed[:half]))
+				stack.append((offset + half, trimmed[half:]))
+				continue
+
+			for position, byte in enumerate(bytearray(trimmed), offset):
+				for bit in xrange(8):
+					if byte >> bit & 1:
+						indexes.append(8 * position + bit)
+
+		indexes.sort(reverse=True)
+
+		return [self.persons[index] for index in indexes]
+
+
+	def deepest(self, bits):
+		"""
+		Return the sorted list of the deepest IDs of a bitset and their height.
+		"""
+		height = self.heights[self.persons[bits.bit_length() - 1]]
+		start = self.levelStarts[height]
+
+		return sorted(self.members(bits >> start << start)), height
+
+
+	def union(self, ids):
+		self.reindex(ids)
+		bits = 0
+
+		for id in ids:
+			bits |= self.bitsets[id]
+
+		return bits
+
+
+	def commonAncestors(self, ids):
+		"""
+		Return the list of (ID, height) of all common ancestors of ids (including ids themselves),
+		the deepest first.
+		"""
+		self.reindex(ids)
+		common = self.bitsets[ids[0]]
+
+		for id in ids[1:]:
+			common &= self.bitsets[id]
+
+		return [(person, self.heights[person]) for person in self.members(common)]
+
+
+	def find(self, ids):
+		"""
+		Return the sorted list of the LCA of ids and the number of mathematicians on the longest
+		path from a mathematician without advisors down to them (0 if there is no LCA). The LCA
+		are found pairwise as in LCAFinder.find().
+		"""
+		self.reindex(ids)
+		lca = [ids[0]]
+		maxPrefix = 0
+
+		for id in ids[1:]:
+			candidates = 0
+
+			for singleLCA in lca:
+				candidates |= self.bitsets[singleLCA]
+
+			candidates &= self.bitsets[id]
+
+			if candidates == 0:
+				return [], 0
+
+			lca, height = self.deepest(candidates)
+			maxPrefix = height + 1
+
+		return lca, maxPrefix
+
+
+	def connectingPaths(self, lca, ids):
+		return self.finder.connectingPaths(lca, ids)
@@ -0,0 +1,217 @@
+# Copyright (c) 2011 Julian Wintermayr
+# 
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+import collections
+
+
+# A table is built again if more than this share of the mathematicians is affected by a change
+REBUILD_SHARE = 0.1
+
+
+def rebuildNeeded(cursor, affected):
+	"""
+	Return True if so many mathematicians are affected by a change that building a table
+	again is faster than computing their rows one by one.
+	"""
+	cursor.execute("SELECT COUNT(*) FROM person")
+
+	return len(affected) > REBUILD_SHARE * cursor.fetchone()[0]
+
+
+def currentAdvisors(cursor, ids):
+	"""
+	Return a dictionary of the given mathematicians with the set of their advisors.
+	"""
+	advisorsOf = {}
+
+	for id in ids:
+		cursor.execute("SELECT DISTINCT advisor FROM advised, dissertation WHERE student=dID AND author=?", (id,))
+		advisorsOf[id] = set(row["advisor"] for row in cursor.fetchall())
+		advisorsOf[id].discard(id)
+
+	return advisorsOf
+
+
+def advisorsFirst(affected, advisorsOf):
+	"""
+	Yield the affected mathematicians, every one after their affected advisors, so that the rows
+	of the advisors are complete when a student is computed. The caller has to finish every
+	mathematician before the next one is taken. Mathematicians in a cycle of the table 'advised'
+	are yielded in any order.
+	"""
+	waitingFor = dict((id, len(advisorsOf[id] & affected)) for id in affected)
+	studentsOf = collections.defaultdict(list)
+
+	for id in affected:
+		for advisor in advisorsOf[id] & affected:
+			studentsOf[advisor].append(id)
+
+	ready = collections.deque(id for id in affected if waitingFor[id] == 0)
+	done = set()
+
+	while len(done) < len(affected):
+		if len(ready) == 0:
+			ready.append(min(affected - done))
+
+		id = ready.popleft()
+
+		if id in done:
+			continue
+
+		done.add(id)
+		yield id
+
+		for student in studentsOf[id]:
+			waitingFor[student] -= 1
+
+			if waitingFor[student] == 0:
+				ready.append(student)
+
+
+class AncestryTable:
+	"""
+	Class for the table 'ancestry', which stores every pair of an ancestor and a descendant with
+	the smallest number of degrees between them. The table is optional: it is empty until it is
+	built and only kept up to date afterwards. If the advisors of mathematicians change, the rows
+	of them and of their descendants are computed again from the rows of their advisors, unless
+	so many are affected that building the whole table is faster.
+	"""
+	def __init__(self, connector):
+		self.connection = connector[0]
+		self.cursor = connector[1]
+
+
+	def isEmpty(self):
+		self.cursor.execute("SELECT 1 FROM ancestry LIMIT 1")
+
+		return self.cursor.fetchone() is None
+
+
+	def build(self):
+		"""
+		Fill the table generation by generation: the advisors of all students first, then the
+		advisors of the advisors and so on. The first row of a pair has the smallest distance.
+		Return the number of rows.
+		"""
+		self.cursor.execute("DELETE FROM ancestry")
+		self.cursor.execute("CREATE TEMP TABLE IF NOT EXISTS edge (advisor INTEGER, student INTEGER, \
+							PRIMARY KEY (advisor, student)) WITHOUT ROWID")
+		self.cursor.execute("DELETE FROM edge")
+		self.cursor.execute("INSERT OR IGNORE INTO edge SELECT advisor, author FROM advised, dissertation \
+							WHERE student=dID AND advisor != author")
+		self.cursor.execute("INSERT INTO ancestry SELECT advisor, student, 1 FROM edge")
+		rows = self.cursor.rowcount
+		distance = 1
+
+		while True:
+			self.cursor.execute("INSERT OR IGNORE INTO ancestry SELECT ancestor, student, ? + 1 FROM ancestry, edge \
+								WHERE minDistance=? AND advisor=descendant AND ancestor != student", (distance, distance))
+
+			if self.cursor.rowcount < 1:
+				break
+
+			rows += self.cursor.rowcount
+			distance += 1
+
+		self.cursor.execute("DROP TABLE edge")
+
+		return rows
+
+
+	def update(self, ids):
+		"""
+		Compute the rows of the given mathematicians and of all their descendants again after
+		their advisors changed. Call it after the changes are written, but before the table
+		is used. Nothing is done if the table isn't used.
+		"""
+		if len(ids) == 0 or self.isEmpty():
+			return
+
+		affected = set(ids)
+
+		# Every former descendant may have lost ancestors
+		for id in ids:
+			self.cursor.execute("SELECT descendant FROM ancestry WHERE ancestor=?", (id,))
+			affected.update(row["descendant"] for row in self.cursor.fetchall())
+
+		if rebuildNeeded(self.cursor, affected):
+			self.build()
+			return
+
+		advisorsOf = currentAdvisors(self.cursor, affected)
+		self.cursor.executemany("DELETE FROM ancestry WHERE descendant=?", [(id,) for id in affected])
+
+		for id in advisorsFirst(affected, advisorsOf):
+			self.insertRows(id, advisorsOf[id])
+
+
+	def insertRows(self, id, advisors):
+		if len(advisors) == 0:
+			return
+
+		advisors = list(advisors)
+		self.cursor.execute("INSERT INTO ancestry SELECT ancestor, ?, MIN(minDistance) + 1 FROM ancestry \
+							WHERE descendant IN ({}) AND ancestor != ? GROUP BY ancestor"
+							.format(", ".join("?" * len(advisors))), [id] + advisors + [id])
+
+		# Direct advisors replace the rows of longer distances
+		self.cursor.executemany("INSERT INTO ancestry VALUES (?, ?, 1)", [(advisor, id) for advisor in advisors])
+
+
+	def ancestors(self, id):
+		"""
+		Return a dictionary of the ancestors of id with their smallest distance.
+		"""
+		self.cursor.execute("SELECT ancestor, minDistance FROM ancestry WHERE descendant=?", (id,))
+
+		return dict((row["ancestor"], row["minDistance"]) for row in self.cursor.fetchall())
+
+
+	def descendants(self, id):
+		"""
+		Return a dictionary of the descendants of id with their smallest distance.
+		"""
+		self.cursor.execute("SELECT descendant, minDistance FROM ancestry WHERE ancestor=?", (id,))
+
+		return dict((row["descendant"], row["minDistance"]) for row in self.cursor.fetchall())
+
+
+	def ancestorSet(self, id):
+		"""
+		Return the set of id and all its ancestors.
+		"""
+		found = set(self.ancestors(id))
+		found.add(id)
+
+		return found
+
+
+	def distance(self, ancestor, descendant):
+		"""
+		Return the smallest number of degrees between ancestor and descendant or None if
+		ancestor isn't an ancestor of descendant.
+		"""
+		self.cursor.execute("SELECT minDistance FROM ancestry WHERE descendant=? AND ancestor=?", (descendant, ancestor))
+		row = self.cursor.fetchone()
+
+		return row["minDistance"] if row is not None else None
@@ -0,0 +1,1873 @@
+#!/usr/bin/python
+
+
+# Copyright (c) 2011 Julian Wintermayr
+# 
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""
+Benchmarks for the Math-Genealogy-Database. Nothing in here talks to the real
+Mathematics Genealogy Project: the crawler is pointed at a local stand-in server
+which serves either saved id.php pages (one file per record named <ID>.html) or
+a synthetic genealogy in the same HTML format.
+
+Example usage:
+
+   python benchmark.py crawl --size 300 --jobs 1,4,8 --latency 0.05
+   python benchmark.py crawl --pages path/to/saved/pages --root 18231
+   python benchmark.py crawl --size 1000 --jobs 4 --harvest
+   python benchmark.py http --size 500 --latency 0 --connect-latency 0.02
+   python benchmark.py parse --pages corpus
+   python benchmark.py parse --cache path/to/page/cache
+   python benchmark.py write --size 2000
+   python benchmark.py retry --size 300 --failure-rate 0.2 --jobs 4
+   python benchmark.py mirror --size 1000 --jobs 4 --latency 0
+   python benchmark.py ingest --size 20000 --jobs 1,2,4
+   python benchmark.py names --size 200000
+   python benchmark.py graph --size 200000
+   python benchmark.py indexes --size 200000
+   python benchmark.py lca --size 2000 --generations 16
+   python benchmark.py ancestry --size 200000
+   python benchmark.py batch --size 200000 --jobs 1,2,4
+   python benchmark.py bitsets --size 200000
+   python benchmark.py path --size 200000
+   python benchmark.py depth --size 200000
+   python benchmark.py record --archive mgp.archive --size 2000
+   python benchmark.py replay --archive mgp.archive --jobs 1,4 --latency 0.05 --serve
+
+Archives of the real Mathematics Genealogy Project are recorded with
+'mgdb.py -i -d ID --record FILE' and replayed with 'benchmark.py replay'.
+"""
+
+
+from optparse import OptionParser
+import BaseHTTPServer
+import SocketServer
+import threading
+import random
+import time
+import urlparse
+from xml.sax.saxutils import escape
+import urllib2
+import zlib
+import os
+import shutil
+import tempfile
+import grab
+import update
+import crawl
+import pageCache
+import databaseConnection
+import retry
+import httpArchive
+import httpSession
+import search
+import genealogyGraph
+import schemaMigration
+import ancestry
+import commonAncestor
+import ancestorBitsets
+import relationPath
+import generationDepth
+
+
+
+# Head, menu and footer like on the real pages, so that the parsers have to skip the same amount of markup
+PAGE_HEADER = u"""<meta http-equiv="Content-Type" content="text/html; charset=utf-8" />
+<link rel="stylesheet" type="text/css" href="mgp.css" />
+<script type="text/javascript" src="mgp.js"></script>
+</head>
+<body>
+<div id="header">
+<div id="logo"><a href="index.php"><img src="img/logo.png" alt="Mathematics Genealogy Project" /></a></div>
+<form method="post" action="query-prep.php" id="quicksearch">
+<input type="text" name="searchTerms" size="20" />
+<input type="submit" value="Search" />
+</form>
+</div>
+<div id="menu">
+<ul>
+""" + u"".join(u"<li><a href=\"page{0}.php\" title=\"Menu entry {0}\">Menu entry {0}</a></li>\n".format(i)
+			 for i in range(40)) + u"""</ul>
+</div>
+<div id="paddingWrapper">
+"""
+
+PAGE_FOOTER = u"""</div>
+<div id="footer">
+""" + u"".join(u"<p class=\"footer\">Footer line {0} with <a href=\"link{0}.php\">a link</a></p>\n".format(i)
+			 for i in range(20)) + u"""</div>
+</body>
+</html>
+"""
+
+
+
+class Genealogy(dict):
+	"""
+	Synthetic genealogy: ID -> [name, degrees, students] where every degree is
+	[university, year, advisors]. The numbers of descendants are computed once.
+	"""
+	def __init__(self):
+		dict.__init__(self)
+		self.counts = {}
+
+
+	def advisors(self, id):
+		advisors = []
+
+		for degree in self[id][1]:
+			advisors.extend(degree[2])
+
+		return advisors
+
+
+	def numberOfDescendants(self, id):
+		if id not in self.counts:
+			seen = set()
+			stack = list(self[id][2])
+
+			while stack:
+				student = stack.pop()
+
+				if student not in seen:
+					seen.add(student)
+					stack.extend(self[student][2])
+
+			self.counts[id] = len(seen)
+
+		return self.counts[id]
+
+
+
+def syntheticGenealogy(size, branching=3, coAdvisors=0.1, secondDegrees=0.05, seed=1):
+	"""
+	Create a random genealogy with 'size' mathematicians. Record 1 is the root
+	and every other record has one advisor, sometimes a second one or a second
+	degree with another advisor. Advisors always have smaller IDs than their students.
+	Some records have names with special characters and some miss the university or year.
+	"""
+	rand = random.Random(seed)
+	genealogy = Genealogy()
+	genealogy[1] = [u"Root Mathematician", [[u"Universit\u00e4t Helmstedt", u"1700", []]], []]
+	parents = [1]
+	nextID = 2
+
+	while nextID <= size:
+		advisor = parents.pop(0)
+
+		for i in range(rand.randint(0, 2 * branching)):
+			if nextID > size:
+				break
+
+			advisors = [advisor]
+
+			if nextID > 2 and rand.random() < coAdvisors:
+				second = rand.randint(1, nextID - 1)
+
+				if second != advisor:
+					advisors.append(second)
+
+			name = u"Mathematician No. {}".format(nextID)
+
+			if nextID % 7 == 0:
+				name = u"Fran\u00e7ois Gau\u00df & No. {}".format(nextID)
+
+			year = u"{}".format(int(genealogy[advisor][1][0][1] or 1700) + rand.randint(20, 40))
+			degrees = [[u"Universit\u00e4t G\u00f6ttingen" if nextID % 11 else u"", year if nextID % 13 else u"",
+						advisors]]
+
+			if nextID > 2 and rand.random() < secondDegrees:
+				degrees.append([u"Universit\u00e4t Leipzig", year, [rand.randint(1, nextID - 1)]])
+
+			genealogy[nextID] = [name, degrees, []]
+
+			for adv in set(genealogy.advisors(nextID)):
+				genealogy[adv][2].append(nextID)
+
+			parents.append(nextID)
+			nextID += 1
+
+		# Keep the genealogy growing even if a record got no students
+		if len(parents) == 0:
+			parents.append(advisor)
+
+	return genealogy
+
+
+def inbredGenealogy(generations, width, advisors=2, seed=1):
+	"""
+	Create a genealogy of 'generations' generations of 'width' records each. Every record
+	after the first generation has 'advisors' advisors in the generation before. Hence,
+	every record of the last generation has advisors**(generations-1) paths to the first one.
+	"""
+	rand = random.Random(seed)
+	genealogy = Genealogy()
+
+	for generation in range(generations):
+		for i in range(width):
+			id = generation * width + i + 1
+			previous = range((generation - 1) * width + 1, generation * width + 1)
+			degreeAdvisors = rand.sample(previous, advisors) if generation > 0 else []
+			genealogy[id] = [u"Mathematician No. {}".format(id), [[u"Universit\u00e4t Leipzig",
+							 u"{}".format(1500 + 30 * generation), degreeAdvisors]], []]
+
+			for advisor in degreeAdvisors:
+				genealogy[advisor][2].append(id)
+
+	return genealogy
+
+
+def renderPage(genealogy, id):
+	"""
+	Render a record of a synthetic genealogy like an id.php page of the
+	Mathematics Genealogy Project.
+	"""
+	if id not in genealogy:
+		return u"<p>You have specified an ID that does not exist in the database. Please back up and try again.</p>\n"
+
+	[name, degrees, students] = genealogy[id]
+
+	page = u"<!DOCTYPE html PUBLIC \"-//W3C//DTD XHTML 1.0 Strict//EN\">\n"
+	page += u"<html><head><title>The Mathematics Genealogy Project - {}</title>\n".format(escape(name))
+	page += PAGE_HEADER
+	page += u"<h2 style=\"text-align: center; margin-bottom: 0.5ex; margin-top: 1ex\">\n"
+	page += u"{}</h2>\n".format(escape(name))
+
+	for number, [uni, year, advisors] in enumerate(degrees):
+		page += u"<div style=\"line-height: 30px; text-align: center; margin-bottom: 1ex\">\n"
+		page += u"<span style=\"margin-right: 0.5em\">Ph.D. <span style=\"color:\n"
+		page += u"#006633; margin-left: 0.5em\">{}</span> {}</span>\n".format(escape(uni), year)
+		page += u"<div style=\"line-height: 30px; text-align: center; margin-bottom: 1ex\">\n"
+		page += u"<span style=\"margin-right: 0.5em\">Dissertation: <span id=\"thesisTitle\" style=\"font-style:italic\">\n"
+		page += u"\n"
+		page += u"{}</span></div>\n".format(escape(u"De numeris & functionibus <{}.{}>".format(id, number + 1)))
+
+		if len(advisors) > 0:
+			links = [u"Advisor {}: <a href=\"id.php?id={}\">{}</a>".format(i + 1, adv, escape(genealogy[adv][0]))
+					 for i, adv in enumerate(advisors)]
+			page += u"<p style=\"text-align: center; line-height: 2.75ex\">{}</p>\n".format(u"<br />".join(links))
+
+		else:
+			page += u"<p style=\"text-align: center; line-height: 2.75ex\">Advisor: Unknown</p>\n"
+
+	if len(students) > 0:
+		page += u"<table border=\"0\" align=\"center\"><tr><th>Name</th><th>School</th><th>Year</th>"
+		page += u"<th>Descendants</th></tr>\n"
+
+		for student in students:
+			[sName, sDegrees] = genealogy[student][:2]
+			sDescendants = genealogy.numberOfDescendants(student)
+			page += u"<tr ><td><a href=\"id.php?id={}\">{}</a></td><td>{}</td>"\
+					.format(student, escape(sName), escape(sDegrees[0][0]))
+			page += u"<td style=\"text-align: right\">{}</td><td style=\"text-align: right\">{}</td></tr>\n"\
+					.format(sDegrees[0][1], sDescendants if sDescendants > 0 else u"")
+
+		page += u"</table>\n"
+		page += u"<p style=\"text-align: center\">According to our current on-line database, {} has {} "\
+				.format(escape(name), len(students))
+		page += u"<a href=\"students.php?id={}\">students</a> and {} <a href=\"descendants.php?id={}\">"\
+				.format(id, genealogy.numberOfDescendants(id), id)
+		page += u"descendants</a>.\n"
+
+	else:
+		page += u"<p style=\"text-align: center\">No students known.</p>\n"
+
+	page += u"<p>If you have additional information or corrections regarding this mathematician, please use the "
+	page += u"update form.</p>\n"
+	page += PAGE_FOOTER
+
+	return page
+
+
+def renderSearchPage(genealogy, lastName):
+	page = u"<table>\n"
+
+	for id in sorted(genealogy):
+		[name, degrees] = genealogy[id][:2]
+
+		if lastName.lower() in name.lower():
+			page += u"<tr><td><a href=\"id.php?id={}\">{}</a></td>\n".format(id, escape(name))
+			page += u"<td>{}</td>\n".format(escape(degrees[0][0]))
+			page += u"<td>{}</td></tr>\n".format(degrees[0][1])
+
+	page += u"</table>\n"
+
+	return page
+
+
+
+class StandInHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+	"""
+	Answer id.php and query-prep.php like the Mathematics Genealogy Project.
+	"""
+	# Keep connections alive like a real web server
+	protocol_version = "HTTP/1.1"
+	disable_nagle_algorithm = True
+	wbufsize = -1
+
+	def setup(self):
+		# One handler serves one connection, so this simulates the cost of a new connection
+		time.sleep(self.server.connectLatency)
+		BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+
+
+	def do_GET(self):
+		url = urlparse.urlparse(self.path)
+		query = urlparse.parse_qs(url.query)
+
+		if self.injectFailure():
+			return
+
+		if self.server.archive is not None:
+			self.replyRecorded(self.server.archive.lookup(self.path))
+
+		elif not url.path.endswith("id.php") or "id" not in query:
+			self.send_error(404)
+
+		else:
+			self.reply(self.server.page(int(query["id"][0])))
+
+
+	def do_POST(self):
+		length = int(self.headers.getheader("content-length", 0))
+		data = self.rfile.read(length)
+		query = urlparse.parse_qs(data)
+
+		if self.injectFailure():
+			return
+
+		if self.server.archive is not None:
+			self.replyRecorded(self.server.archive.lookup(self.path, data))
+
+		else:
+			self.reply(renderSearchPage(self.server.genealogy, query.get("family_name", [""])[0].decode("utf-8")))
+
+
+	def replyRecorded(self, body):
+		if body is None:
+			self.send_error(404)
+
+		else:
+			self.reply(body)
+
+
+	def injectFailure(self):
+		"""
+		Answer with '503 Service Unavailable' or close the connection without an answer
+		instead of serving the page. Return True if a failure was injected.
+		"""
+		failure = self.server.failure()
+
+		if failure == "unavailable":
+			self.send_response(503)
+			self.send_header("Retry-After", "0")
+			self.send_header("Content-Length", "0")
+			self.end_headers()
+
+		elif failure == "reset":
+			self.close_connection = True
+
+		return failure is not None
+
+
+	def reply(self, page):
+		self.server.requests += 1
+		time.sleep(self.server.latency)
+
+		# Recorded answers are already encoded
+		body = page.encode("utf-8") if isinstance(page, unicode) else page
+		self.send_response(200)
+		self.send_header("Content-Type", "text/html; charset=utf-8")
+
+		if self.server.gzip and "gzip" in self.headers.getheader("accept-encoding", ""):
+			compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+			body = compressor.compress(body) + compressor.flush()
+			self.send_header("Content-Encoding", "gzip")
+
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+
+	def log_message(self, format, *args):
+		pass
+
+
+
+class StandInServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+	"""
+	Local stand-in for the Mathematics Genealogy Project. Serves the answers of the
+	httpArchive.HTTPArchive 'archive' or the saved pages of 'pageDir' if given,
+	otherwise the pages of the synthetic 'genealogy'.
+	'latency' seconds are added to every answer and 'connectLatency' seconds
+	to every new connection to simulate the network.
+	Pages are gzip compressed if the client accepts it and 'gzip' is set.
+	A request fails with the probability 'failureRate'.
+	"""
+	daemon_threads = True
+
+	def __init__(self, genealogy=None, pageDir=None, latency=0.0, gzip=True, connectLatency=0.0, failureRate=0.0,
+				 archive=None):
+		BaseHTTPServer.HTTPServer.__init__(self, ("127.0.0.1", 0), StandInHandler)
+		self.genealogy = genealogy if genealogy is not None else {}
+		self.pageDir = pageDir
+		self.latency = latency
+		self.gzip = gzip
+		self.connectLatency = connectLatency
+		self.requests = 0
+		self.thread = None
+		self.handlers = []
+		self.failureRate = failureRate
+		self.archive = archive
+		self.failures = {"unavailable": 0, "reset": 0}
+		self.random = random.Random(1)
+		self.lock = threading.Lock()
+
+
+	def failure(self):
+		with self.lock:
+			if self.random.random() >= self.failureRate:
+				return None
+
+			failure = self.random.choice(["unavailable", "reset"])
+			self.failures[failure] += 1
+
+			return failure
+
+
+	def page(self, id):
+		if self.pageDir is not None:
+			path = os.path.join(self.pageDir, "{}.html".format(id))
+
+			if os.path.exists(path):
+				with open(path, "rb") as pageFile:
+					return pageFile.read().decode("utf-8")
+
+			return renderPage({}, id)
+
+		return renderPage(self.genealogy, id)
+
+
+	def process_request(self, request, clientAddress):
+		# Remember the thread of every connection to wait for it when stopping
+		thread = threading.Thread(target=self.process_request_thread, args=(request, clientAddress))
+		thread.daemon = True
+		thread.start()
+		self.handlers.append(thread)
+
+
+	def handle_error(self, request, clientAddress):
+		# Clients close their idle keep-alive connections at any time
+		pass
+
+
+	def start(self):
+		self.thread = threading.Thread(target=self.serve_forever)
+		self.thread.daemon = True
+		self.thread.start()
+
+		return "http://127.0.0.1:{}/".format(self.server_address[1])
+
+
+	def stop(self):
+		self.shutdown()
+		self.server_close()
+
+		# Connections which are still open are closed by the client later
+		for thread in self.handlers:
+			thread.join(1)
+
+
+
+def benchmarkCrawl(options):
+	"""
+	Crawl all descendants of the root record with different numbers of jobs
+	and print the number of records per second. With --harvest, students without
+	descendants are stored from the pages of their advisors.
+	"""
+	genealogy = None
+
+	if options.pages is None:
+		genealogy = syntheticGenealogy(options.size)
+
+	server = StandInServer(genealogy, options.pages, options.latency, connectLatency=options.connectLatency)
+	grab.BASE_URL = server.start()
+	grab.Grabber.rateLimiter.setRate(options.rate, max(1, options.rate))
+
+	print(u"Crawling the descendants of #{} with {}s latency and a rate limit of {}/s"
+		  .format(options.root, options.latency, options.rate).encode('utf-8'))
+
+	try:
+		for jobs in [int(jobs) for jobs in options.jobs.split(",")]:
+			connector = databaseConnection.DatabaseConnector().connectToSQLite(":memory:")
+			updater = update.Updater(connector, True, False, jobs)
+			updater.foundID = True
+			updater.harvestStudents = options.harvest
+
+			requestsBefore = server.requests
+			start = time.time()
+			updater.updateByID([options.root], False, True)
+			seconds = time.time() - start
+
+			connector[1].execute("SELECT COUNT(*) FROM person")
+			records = connector[1].fetchone()[0]
+			connector[0].close()
+
+			print(u"jobs = {:3}  records = {:6}  requests = {:6}  time = {:8.2f}s  records/s = {:8.1f}"
+				  .format(jobs, records, server.requests - requestsBefore, seconds, records / seconds).encode('utf-8'))
+
+	finally:
+		grab.Grabber.session.close()
+		server.stop()
+
+
+
+def benchmarkRetry(options):
+	"""
+	Crawl all descendants of the root record from a stand-in server which fails
+	randomly. Print the retries and check that no record is missing.
+	"""
+	genealogy = syntheticGenealogy(options.size)
+	server = StandInServer(genealogy, None, options.latency, connectLatency=options.connectLatency,
+						   failureRate=options.failureRate)
+	grab.BASE_URL = server.start()
+	grab.Grabber.rateLimiter.setRate(options.rate, max(1, options.rate))
+
+	print(u"Crawling the descendants of #{} with a failure rate of {}".format(options.root, options.failureRate)
+		  .encode('utf-8'))
+
+	try:
+		for jobs in [int(jobs) for jobs in options.jobs.split(",")]:
+			# Short waits keep the benchmark fast, the ratios are the same as by default
+			grab.Grabber.retryPolicy = retry.RetryPolicy(12, 0.01, 0.5, retry.CircuitBreaker(5, 0.2))
+			connector = databaseConnection.DatabaseConnector().connectToSQLite(":memory:")
+			updater = update.Updater(connector, True, False, jobs)
+			updater.foundID = True
+
+			requestsBefore = server.requests
+			start = time.time()
+			updater.updateByID([options.root], False, True)
+			seconds = time.time() - start
+
+			connector[1].execute("SELECT COUNT(*) FROM person")
+			records = connector[1].fetchone()[0]
+			connector[0].close()
+
+			print(u"jobs = {:3}  records = {:6} of {:6}  requests = {:6}  time = {:8.2f}s"
+				  .format(jobs, records, genealogy.numberOfDescendants(options.root) + 1,
+						  server.requests - requestsBefore, seconds).encode('utf-8'))
+			print(grab.Grabber.retryPolicy.statistics().encode('utf-8'))
+
+		print(u"Injected failures: {}".format(server.failures).encode('utf-8'))
+
+	finally:
+		grab.Grabber.session.close()
+		server.stop()
+
+
+
+def benchmarkMirror(options):
+	"""
+	Mirror ranges of a synthetic genealogy which overlap the ranges of earlier mirrors, with
+	another shard size, and after a mirror which was interrupted before it grabbed anything.
+	Check the number of IDs left and that every record of the ranges is stored.
+	"""
+	genealogy = syntheticGenealogy(options.size)
+	server = StandInServer(genealogy, None, options.latency, connectLatency=options.connectLatency)
+	grab.BASE_URL = server.start()
+	grab.Grabber.rateLimiter.setRate(options.rate, max(1, options.rate))
+	jobs = int(options.jobs.split(",")[-1])
+	size = options.size
+	tenth = max(1, size // 10)
+
+	# Every scenario is a list of mirrors (first, last, shard size). A shard size of 0 only
+	# stores the shards, as if the mirror was interrupted at once.
+	scenarios = [("smaller range first", [(1, tenth, tenth), (1, size, 3 * tenth)]),
+				 ("interrupted larger range first", [(1, size, 0), (1, size // 2, 3 * tenth), (1, size, tenth)]),
+				 ("shifted ranges", [(tenth, 5 * tenth, 2 * tenth), (3 * tenth, size, 3 * tenth)])]
+
+	try:
+		for description, mirrors in scenarios:
+			print(description.encode('utf-8'))
+			connector = databaseConnection.DatabaseConnector().connectToSQLite(":memory:")
+			cursor = connector[1]
+			updater = update.Updater(connector, True, False, jobs)
+			stored = set()
+
+			for first, last, shardSize in mirrors:
+				if shardSize == 0:
+					crawl.ShardFrontier(connector, first, last, tenth, jobs)
+					print(u"   {:5} - {:5}  interrupted".format(first, last).encode('utf-8'))
+					continue
+
+				left = len(crawl.ShardFrontier(connector, first, last, shardSize, jobs))
+				expected = len(set(range(first, last + 1)).difference(stored))
+				updater.mirror(first, last, shardSize)
+				stored.update(range(first, last + 1))
+
+				cursor.execute("SELECT pID FROM person")
+				records = set(row["pID"] for row in cursor.fetchall())
+				missing = len([id for id in genealogy if id in stored and id not in records])
+
+				print(u"   {:5} - {:5}  shards of {:4}: {:5} ID(s) left (expected {:5}), {:5} record(s) missing"
+					  .format(first, last, shardSize, left, expected, missing).encode('utf-8'))
+
+			connector[0].close()
+
+	finally:
+		grab.Grabber.session.close()
+		server.stop()
+
+
+
+def replayScenarios(options, ids):
+	"""
+	Return the crawls of the replay benchmark as (name, function(updater)) tuples.
+	"""
+	leaf = options.leaf if options.leaf is not None else max(ids)
+
+	return [("-i -d {}".format(options.root), lambda updater: updater.updateByID([options.root], False, True)),
+			("-i -a {}".format(leaf), lambda updater: updater.updateByID([leaf], True, False)),
+			("-n {}".format(options.name), lambda updater: updater.findID(options.name))]
+
+
+def benchmarkRecord(options):
+	"""
+	Record the crawls of the replay benchmark from a synthetic genealogy (or --pages) in --archive.
+	"""
+	genealogy = None
+
+	if options.pages is None:
+		genealogy = syntheticGenealogy(options.size)
+
+	server = StandInServer(genealogy, options.pages)
+	grab.BASE_URL = server.start()
+	grab.Grabber.rateLimiter.setRate(0)
+
+	archive = httpArchive.HTTPArchive(options.archive)
+	session = grab.Grabber.session
+	grab.Grabber.session = httpArchive.RecordingSession(session, archive)
+
+	try:
+		for name, crawl in replayScenarios(options, genealogy if genealogy is not None else [options.size]):
+			# The web mode only prints the IDs found by update-by-name
+			connector = databaseConnection.DatabaseConnector().connectToSQLite(":memory:")
+			updater = update.Updater(connector, True, not name.startswith("-n"), 4)
+			updater.printRecords = False
+			crawl(updater)
+			connector[0].close()
+
+			print(u"Recorded {}".format(name).encode('utf-8'))
+
+		print(u"{} answers in {}".format(len(archive), options.archive).encode('utf-8'))
+
+	finally:
+		grab.Grabber.session = session
+		session.close()
+		archive.close()
+		server.stop()
+
+
+
+def benchmarkReplay(options):
+	"""
+	Replay the crawls -i -d, -i -a and -n from --archive with different numbers of jobs, either
+	in this process or from a stand-in server (--serve), and print the records per second.
+	"""
+	archive = httpArchive.HTTPArchive(options.archive)
+	ids = [int(path.split("id=")[1]) for path, data in archive.requests() if "id=" in path]
+	session = grab.Grabber.session
+	server = None
+
+	if options.serve:
+		server = StandInServer(latency=options.latency, connectLatency=options.connectLatency, archive=archive)
+		grab.BASE_URL = server.start()
+		replaySession = httpSession.HTTPSession()
+		where = "a stand-in server"
+
+	else:
+		grab.BASE_URL = "http://replay/"
+		replaySession = httpArchive.ReplaySession(archive, options.latency)
+		where = "this process"
+
+	grab.Grabber.session = replaySession
+	grab.Grabber.rateLimiter.setRate(0)
+
+	print(u"Replaying {} answers from {} with {}s latency".format(len(archive), where, options.latency).encode('utf-8'))
+
+	try:
+		for name, crawl in replayScenarios(options, ids):
+			for jobs in [int(jobs) for jobs in options.jobs.split(",")]:
+				connector = databaseConnection.DatabaseConnector().connectToSQLite(":memory:")
+				updater = update.Updater(connector, True, not name.startswith("-n"), jobs)
+				updater.printRecords = False
+
+				start = time.time()
+				crawl(updater)
+				seconds = time.time() - start
+
+				connector[1].execute("SELECT COUNT(*) FROM person")
+				records = connector[1].fetchone()[0]
+				connector[0].close()
+
+				print(u"{:16}  jobs = {:3}  records = {:6}  time = {:8.2f}s  records/s = {:8.1f}"
+					  .format(name, jobs, records, seconds, records / seconds).encode('utf-8'))
+
+				# Update-by-name grabs one record after the other
+				if name.startswith("-n"):
+					break
+
+		print(replaySession.statistics().encode('utf-8'))
+
+	finally:
+		grab.Grabber.session = session
+		replaySession.close()
+		archive.close()
+
+		if server is not None:
+			server.stop()
+
+
+
+def benchmarkHTTP(options):
+	"""
+	Fetch the same records with a new connection per request (urllib2) and
+	with the keep-alive session of the Grabber class. Print the latency per record.
+	"""
+	genealogy = syntheticGenealogy(options.size)
+	server = StandInServer(genealogy, options.pages, options.latency, connectLatency=options.connectLatency)
+	baseURL = server.start()
+	ids = sorted(genealogy)
+
+	try:
+		start = time.time()
+
+		for id in ids:
+			urllib2.urlopen(baseURL + "id.php?id=" + str(id)).read()
+
+		urllibSeconds = time.time() - start
+
+		session = grab.Grabber.session
+		start = time.time()
+
+		for id in ids:
+			session.request(baseURL + "id.php?id=" + str(id))
+
+		sessionSeconds = time.time() - start
+
+	finally:
+		session.close()
+		server.stop()
+
+	print(u"urllib2.urlopen: {:8.3f}ms per record".format(1000 * urllibSeconds / len(ids)).encode('utf-8'))
+	print(u"HTTPSession:     {:8.3f}ms per record".format(1000 * sessionSeconds / len(ids)).encode('utf-8'))
+	print(session.statistics().encode('utf-8'))
+
+
+
+def writeCorpus(options, path):
+	"""
+	Write the pages of a synthetic genealogy to 'path' (one file per record named <ID>.html).
+	"""
+	genealogy = syntheticGenealogy(options.size)
+
+	if not os.path.isdir(path):
+		os.makedirs(path)
+
+	for id in genealogy:
+		with open(os.path.join(path, "{}.html".format(id)), "wb") as pageFile:
+			pageFile.write(renderPage(genealogy, id).encode("utf-8"))
+
+	print(u"Wrote {} pages to {}".format(len(genealogy), path).encode('utf-8'))
+
+
+def loadPages(options):
+	"""
+	Return a dictionary ID -> page with the saved pages of --pages, the cached pages
+	of --cache or the pages of a synthetic genealogy.
+	"""
+	pages = {}
+
+	if options.pages is not None:
+		for filename in os.listdir(options.pages):
+			if filename.endswith(".html"):
+				with open(os.path.join(options.pages, filename), "rb") as pageFile:
+					pages[int(filename[:-5])] = pageFile.read().decode("utf-8")
+
+	elif options.cache is not None:
+		cache = pageCache.PageCache(options.cache)
+
+		for id in cache.ids():
+			pages[id] = cache.get(id, float("inf"))
+
+		cache.close()
+
+	else:
+		genealogy = syntheticGenealogy(options.size)
+
+		for id in genealogy:
+			pages[id] = renderPage(genealogy, id)
+
+	return pages
+
+
+def benchmarkParse(options):
+	"""
+	Parse the same pages with the single-pass parser and the former line-based
+	parser. Check that both return the same fields and print the pages per second.
+	"""
+	pages = loadPages(options)
+	results = {}
+
+	for method in ["parseLines", "parse"]:
+		start = time.time()
+
+		for i in range(options.repeat):
+			for id, page in pages.items():
+				grabber = grab.Grabber(id, page)
+				getattr(grabber, method)()
+
+				results[method, id] = [grabber.name, grabber.institution, grabber.year, grabber.advisors,
+									   grabber.descendants, grabber.dissertation, grabber.numberOfDescendants]
+
+		seconds = time.time() - start
+		print(u"{:10}  pages = {:7}  time = {:7.2f}s  pages/s = {:9.1f}"
+			  .format(method, len(pages) * options.repeat, seconds, len(pages) * options.repeat / seconds)
+			  .encode('utf-8'))
+
+	differences = [id for id in pages if results["parse", id] != results["parseLines", id]]
+
+	if len(differences) > 0:
+		print(u"Different results for the IDs {}".format(sorted(differences)).encode('utf-8'))
+
+	else:
+		print(u"Both parsers return the same fields for all {} pages".format(len(pages)).encode('utf-8'))
+
+
+
+def benchmarkIngest(options):
+	"""
+	Parse saved pages (--pages or a synthetic genealogy written to a temporary folder)
+	into a new database with different numbers of processes. Print the pages per second.
+	"""
+	folder = tempfile.mkdtemp()
+	path = options.pages
+
+	try:
+		if path is None:
+			path = os.path.join(folder, "pages")
+			writeCorpus(options, path)
+
+		for jobs in [int(jobs) for jobs in options.jobs.split(",")]:
+			connector = databaseConnection.DatabaseConnector().connectToSQLite(os.path.join(folder, "{}.sqlite".format(jobs)))
+			updater = update.Updater(connector, False, True, jobs, 500)
+
+			start = time.time()
+			updater.updateFromPages(path)
+			seconds = time.time() - start
+
+			connector[1].execute("SELECT COUNT(*) FROM person")
+			records = connector[1].fetchone()[0]
+			connector[0].close()
+
+			print(u"processes = {:3}  records = {:7}  time = {:8.2f}s  pages/s = {:9.1f}"
+				  .format(jobs, records, seconds, records / seconds).encode('utf-8'))
+
+	finally:
+		shutil.rmtree(folder)
+
+
+
+def benchmarkNames(options):
+	"""
+	Search names in a local database of a synthetic genealogy with the full-text index
+	and with a scan of the table person. Print the time per search.
+	"""
+	genealogy = syntheticGenealogy(options.size)
+	connector = databaseConnection.DatabaseConnector().connectToSQLite(":memory:")
+	updater = update.Updater(connector, True, True, 1, 10000, float("inf"))
+
+	for id in genealogy:
+		[name, degrees] = genealogy[id][:2]
+		updater.insertOrUpdate(id, name, [degrees[0][0]], [degrees[0][1]], degrees[0][2], [None], 0)
+
+	updater.flush()
+
+	for name in [u"gau", u"Fran\u00e7ois Gau\u00df", u"mathematician no 12345", u"root"]:
+		start = time.time()
+
+		for i in range(options.repeat):
+			found = len(updater.searchNames(name))
+
+		indexSeconds = (time.time() - start) / options.repeat
+		like = u"%" + name.replace(u" ", u"%") + u"%"
+		start = time.time()
+
+		for i in range(options.repeat):
+			connector[1].execute("SELECT pID FROM person WHERE name LIKE ?", (like,))
+			scanned = len(connector[1].fetchall())
+
+		scanSeconds = (time.time() - start) / options.repeat
+
+		print(u"{:28} index: {:6} found {:8.2f}ms   LIKE scan: {:6} found {:8.2f}ms"
+			  .format(name, found, 1000 * indexSeconds, scanned, 1000 * scanSeconds).encode('utf-8'))
+
+	connector[0].close()
+
+
+
+def storeGenealogy(genealogy, connector):
+	"""
+	Write all records of a synthetic genealogy with all their degrees to the local database.
+	"""
+	updater = update.Updater(connector, True, True, 1, 10000, float("inf"))
+
+	for id in sorted(genealogy):
+		[name, degrees] = genealogy[id][:2]
+		advisors = []
+
+		for degree in degrees:
+			if len(advisors) > 0:
+				advisors.append(0)
+
+			advisors.extend(degree[2])
+
+		updater.insertOrUpdate(id, name, [degree[0] for degree in degrees], [degree[1] for degree in degrees],
+							   advisors, [None] * len(degrees), genealogy.numberOfDescendants(id))
+
+	updater.flush()
+
+
+def benchmarkGraph(options):
+	"""
+	Search ancestors, descendants and the paths of the LCA search in a local database of a
+	synthetic genealogy with every backend of the Searcher: one query per visited node, one
+	recursive query per search and the graph in memory. Print the time of every search and
+	the time to load the graph.
+	"""
+	genealogy = syntheticGenealogy(options.size)
+	connector = databaseConnection.DatabaseConnector().connectToSQLite(":memory:")
+	storeGenealogy(genealogy, connector)
+
+	start = time.time()
+	inMemory = search.Searcher(connector, None, False)
+	print(u"Graph of {} edges loaded in {:.2f}s".format(inMemory.graph.edges, time.time() - start).encode('utf-8'))
+
+	backends = [("node", search.Searcher(connector, None, False, "node")),
+				("query", search.Searcher(connector, None, False, "query")),
+				("memory", inMemory)]
+	leaf = options.leaf or max(genealogy)
+	middle = max(2, options.size // 400)
+
+	def ancestors(searcher, id):
+		searcher.collectAncestors(id)
+		found, searcher.ancestorSet = searcher.ancestorSet, set()
+
+		return found
+
+	def descendants(searcher, id):
+		searcher.collectDescendants(id)
+		found, searcher.descendantSet = searcher.descendantSet, set()
+
+		return found
+
+	def generations(searcher, id):
+		return searcher.generationsOf(id, False)
+
+	def lcaPaths(searcher, id):
+		return PathSearch(searcher.createAdvisorSet).generatePathOf(id)
+
+	queries = [("ancestors of {}".format(leaf), ancestors, leaf),
+			   ("ancestors of {}".format(leaf - 1), ancestors, leaf - 1),
+			   ("descendants of {}".format(middle), descendants, middle),
+			   ("generations below {}".format(middle), generations, middle),
+			   ("descendants of 1", descendants, 1),
+			   ("LCA paths of {}".format(leaf), lcaPaths, leaf)]
+
+	for description, query, id in queries:
+		line = u"{:24}".format(description)
+		expected = None
+
+		for backend, searcher in backends:
+			start = time.time()
+
+			for i in range(options.repeat):
+				found = query(searcher, id)
+
+			seconds = (time.time() - start) / options.repeat
+			line += u"   {}: {:9.2f}ms".format(backend, 1000 * seconds)
+
+			if expected is None:
+				expected = found
+
+			elif found != expected:
+				line += u" (another result!)"
+
+		print(u"{} {:7} found".format(line, len(found)).encode('utf-8'))
+
+	connector[0].close()
+
+
+
+class PathSearch:
+	"""
+	Former LCA search of the Searcher, kept as an independent reference for the LCA search on
+	the ancestor sets. It stores every path from a mathematician without advisors down to a
+	mathematician as a string like '1.5.42.' and compares all pairs of paths. Their number grows
+	exponentially with the number of generations.
+	"""
+	def __init__(self, advisorsOf):
+		self.advisorsOf = advisorsOf
+		self.maxPrefix = 0
+		self.paths = set()
+
+
+	def pathLCA(self, ids):
+		id1 = [0, ids[0]]
+
+		for i in range(len(ids)-1):
+			if len(id1) < 1:
+				break
+
+			else:
+				id1 = self.recursiveLCA(id1, ids[i+1])
+
+		return id1
+
+
+	def recursiveLCA(self, idSet, id2):
+		path2 = self.generatePathOf(id2)
+		self.maxPrefix = 0
+		lca = []
+
+		for id1 in idSet:
+			if id1 == 0:
+				continue
+
+			path1 = self.generatePathOf(id1)
+
+			for row1 in path1:
+				splitPath1 = row1.split('.')
+
+				for row2 in path2:
+					prefix = 0
+					splitPath2 = row2.split('.')
+
+					if len(splitPath1) >= len(splitPath2):
+						longPathIter = iter(splitPath1)
+						shortPathIter = iter(splitPath2)
+
+					else:
+						longPathIter = iter(splitPath2)
+						shortPathIter = iter(splitPath1)
+
+					for singlePathID1 in shortPathIter:
+						singlePathID2 = next(longPathIter)
+
+						prefix += 1
+
+						if singlePathID1 == singlePathID2:
+							if prefix == self.maxPrefix:
+								if int(singlePathID1) not in lca:
+									lca.append(int(singlePathID1))
+
+							if prefix > self.maxPrefix:
+								lca = [int(singlePathID1)]
+								self.maxPrefix = prefix
+
+						else:
+							break
+
+		return lca
+
+
+	def generatePathOf(self, id):
+		nextAdvisors = self.advisorsOf(id)
+
+		if len(nextAdvisors) > 0:
+			self.recursiveAncestorsPath(nextAdvisors, str(id))
+
+		else:
+			self.paths.add(str(id) + ".")
+
+		allPaths = self.paths
+		self.paths = set()
+
+		return allPaths
+
+
+	def recursiveAncestorsPath(self, advisors, treeString):
+		for advisor in advisors:
+			nextAdvisors = self.advisorsOf(advisor)
+
+			treeString = str(advisor) + "." + treeString
+
+			if len(nextAdvisors) > 0:
+				self.recursiveAncestorsPath(nextAdvisors, treeString)
+
+			else:
+				# If we reach the highest ancestor, then store this string!
+				self.paths.add(treeString + ".")
+
+			# We have to delete the last node from the string because we are following another path now
+			treeString = treeString.split(".", 1)[1]
+
+
+
+def benchmarkLCA(options):
+	"""
+	Compare the LCA search on the ancestors with the former search on all paths (PathSearch). Check that
+	both give the same LCA for random pairs and triples of a synthetic genealogy. Then time both
+	on two records of the last generation of inbred genealogies with growing numbers of generations.
+	The former search is skipped as soon as it took more than a minute.
+	"""
+	def pathLCA(searcher, ids):
+		pathSearch = PathSearch(searcher.createAdvisorSet)
+
+		return sorted(pathSearch.pathLCA(ids)), pathSearch.maxPrefix
+
+	genealogy = syntheticGenealogy(options.size)
+	connector = databaseConnection.DatabaseConnector().connectToSQLite(":memory:")
+	storeGenealogy(genealogy, connector)
+	searcher = search.Searcher(connector, None, False)
+	rand = random.Random(1)
+	agree = 0
+	searches = 0
+	failed = 0
+
+	for number in [2] * 200 + [3] * 50:
+		ids = rand.sample(sorted(genealogy), number)
+		searches += 1
+
+		try:
+			expected = pathLCA(searcher, ids)
+
+		# The path search fails if an ID is the LCA of the IDs before
+		except ValueError:
+			failed += 1
+			continue
+
+		if searcher.lcaFinder().find(ids) == expected:
+			agree += 1
+
+		else:
+			print(u"LCA of {}: different results!".format(ids).encode('utf-8'))
+
+	print(u"Same LCA in {} of {} searches (the path search failed in {})".format(agree, searches, failed)
+		  .encode('utf-8'))
+	connector[0].close()
+
+	pathSeconds = 0.0
+
+	for generations in range(4, options.generations + 1, 2):
+		genealogy = inbredGenealogy(generations, options.width)
+		connector = databaseConnection.DatabaseConnector().connectToSQLite(":memory:")
+		storeGenealogy(genealogy, connector)
+		searcher = search.Searcher(connector, None, False)
+		ids = [len(genealogy) - 1, len(genealogy)]
+
+		start = time.time()
+		lca = searcher.lcaFinder().find(ids)
+		seconds = time.time() - start
+		line = u"generations: {:3}  paths per record: {:8}  LCA: {:20}  ancestors: {:7.2f}ms" \
+			   .format(generations, 2 ** (generations - 1), str(lca[0]), 1000 * seconds)
+
+		if pathSeconds < 60:
+			start = time.time()
+			samePaths = pathLCA(searcher, ids) == lca
+			pathSeconds = time.time() - start
+			line += u"   all paths: {:9.2f}ms{}".format(1000 * pathSeconds, "" if samePaths else " (different result!)")
+
+		else:
+			line += u"   all paths: skipped"
+
+		print(line.encode('utf-8'))
+		connector[0].close()
+
+
+
+def databaseSize(cursor):
+	cursor.execute("PRAGMA page_count")
+	pages = cursor.fetchone()[0]
+	cursor.execute("PRAGMA page_size")
+
+	return pages * cursor.fetchone()[0]
+
+
+def benchmarkAncestry(options):
+	"""
+	Build the table 'ancestry' for a database file of a synthetic genealogy and print its build
+	time and size. Compare the time of ancestor checks and searches with the table, with the
+	recursive query and in memory. Change the advisors of some records and compare the time of
+	the incremental update with a new build, which has to give the same table.
+	"""
+	genealogy = syntheticGenealogy(options.size)
+	folder = tempfile.mkdtemp()
+
+	try:
+		connector = databaseConnection.DatabaseConnector().connectToSQLite(os.path.join(folder, "MGDB"))
+		storeGenealogy(genealogy, connector)
+		cursor = connector[1]
+		table = ancestry.AncestryTable(connector)
+		size = databaseSize(cursor)
+
+		start = time.time()
+		rows = table.build()
+		connector[0].commit()
+		buildSeconds = time.time() - start
+
+		print(u"Ancestry table of {} rows built in {:.2f}s. Database: {:.1f}MB before, {:.1f}MB after"
+			  .format(rows, buildSeconds, size / 1e6, databaseSize(cursor) / 1e6).encode('utf-8'))
+
+		backends = [(backend, search.Searcher(connector, None, False, backend)) for backend in
+					["ancestry", "query", "memory"]]
+		rand = random.Random(1)
+		leaf = options.leaf or max(genealogy)
+		middle = max(2, options.size // 400)
+
+		# Half of the checks are about a real ancestor, the other half about a random record
+		checks = []
+
+		for i in range(200):
+			descendant = rand.randint(2, options.size)
+			ancestors = table.ancestors(descendant)
+			checks.append((rand.choice(sorted(ancestors)) if i % 2 == 0 and len(ancestors) > 0 else
+						   rand.randint(1, options.size), descendant))
+
+		queries = [("is X an ancestor of Y?", lambda searcher: [searcher.ancestry.distance(*check) for check in checks]
+					if searcher.ancestry is not None else [searcher.generationsOf(check[1], True).get(check[0])
+														   for check in checks], len(checks)),
+				   ("ancestors of {}".format(leaf), lambda searcher: searcher.generationsOf(leaf, True), 1),
+				   ("descendants of {}".format(middle), lambda searcher: searcher.generationsOf(middle, False), 1),
+				   ("descendants of 1", lambda searcher: searcher.generationsOf(1, False), 1)]
+
+		for description, query, number in queries:
+			line = u"{:24}".format(description)
+			expected = None
+
+			for backend, searcher in backends:
+				start = time.time()
+
+				for i in range(options.repeat):
+					found = query(searcher)
+
+				seconds = (time.time() - start) / options.repeat / number
+				line += u"   {}: {:9.3f}ms".format(backend, 1000 * seconds)
+
+				if expected is None:
+					expected = found
+
+				elif found != expected:
+					line += u" (another result!)"
+
+			print(line.encode('utf-8'))
+
+		# Give random records another advisor with a smaller ID, then give the root an advisor
+		updater = update.Updater(connector, True, True, 1, 10000, float("inf"))
+
+		for changed in [rand.sample(range(2, options.size + 1), 20), [middle], [1]]:
+			for id in changed:
+				[name, degrees] = genealogy[id][:2]
+				advisors = [rand.randint(1, id - 1)] + degrees[0][2][1:] if id > 1 else [options.size + 1]
+				updater.insertOrUpdate(id, name, [degrees[0][0]], [degrees[0][1]], advisors, [None], 0)
+
+			start = time.time()
+			updater.flush()
+			updateSeconds = time.time() - start
+
+			cursor.execute("SELECT ancestor, descendant, minDistance FROM ancestry")
+			updated = set(tuple(row) for row in cursor.fetchall())
+
+			start = time.time()
+			table.build()
+			buildSeconds = time.time() - start
+
+			cursor.execute("SELECT ancestor, descendant, minDistance FROM ancestry")
+			built = set(tuple(row) for row in cursor.fetchall())
+
+			if updated == built:
+				result = u"same table"
+
+			else:
+				result = u"DIFFERENT TABLES ({} rows missing, {} rows wrong)".format(len(built - updated),
+																					 len(updated - built))
+
+			records = u"record {}".format(changed[0]) if len(changed) == 1 else u"{} records".format(len(changed))
+			print(u"Advisors of {:24} changed: update {:6.2f}s, new build {:6.2f}s, {}"
+				  .format(records, updateSeconds, buildSeconds, result).encode('utf-8'))
+
+		connector[0].close()
+
+	finally:
+		shutil.rmtree(folder)
+
+
+def benchmarkBatch(options):
+	"""
+	Search the LCA of random pairs of the records of a few departments of a synthetic genealogy
+	in a batch for every number of processes of --jobs. Compare the throughput with searches
+	which start from scratch, as every call of 'mgdb.py -L' does after loading the graph.
+	"""
+	genealogy = syntheticGenealogy(options.size)
+	folder = tempfile.mkdtemp()
+
+	try:
+		database = os.path.join(folder, "MGDB")
+		connector = databaseConnection.DatabaseConnector().connectToSQLite(database)
+		storeGenealogy(genealogy, connector)
+		connector[0].close()
+
+		rand = random.Random(1)
+		departments = [rand.sample(range(1, options.size + 1), 100) for i in range(10)]
+		lines = []
+
+		for i in range(10 * options.size // 100):
+			department = rand.choice(departments)
+			lines.append(u"{} {}\n".format(*rand.sample(department, 2)))
+
+		start = time.time()
+		graph = genealogyGraph.GenealogyGraph(databaseConnection.DatabaseConnector().connectToSQLite(database))
+		loadSeconds = time.time() - start
+
+		start = time.time()
+
+		for line in lines[:200]:
+			commonAncestor.LCAFinder(graph.advisors, graph.students).find([int(id) for id in line.split()])
+
+		seconds = (time.time() - start) / 200
+		print(u"From scratch: {:9.1f} queries/s  ({:9.1f} queries/s with loading the graph every time)"
+			  .format(1 / seconds, 1 / (seconds + loadSeconds)).encode('utf-8'))
+
+		for jobs in [int(jobs) for jobs in options.jobs.split(",")]:
+			output = open(os.devnull, "w")
+			start = time.time()
+			number = commonAncestor.batchLCA(database, lines, jobs, output)
+			seconds = time.time() - start
+			output.close()
+
+			print(u"Batch, jobs = {:2}: {:9.1f} queries/s  ({} queries in {:.2f}s)"
+				  .format(jobs, number / seconds, number, seconds).encode('utf-8'))
+
+	finally:
+		shutil.rmtree(folder)
+
+
+def benchmarkBitsets(options):
+	"""
+	Search the LCA and all common ancestors of 2 to 100 random records of the younger half of a
+	synthetic genealogy (few ancestors per record) and of an inbred genealogy (many shared
+	ancestors) on ancestor sets (commonAncestor.LCAFinder) and on bitsets (ancestorBitsets.
+	AncestorBitsets). Both start from scratch for every search.
+	"""
+	for description, genealogy in [("synthetic genealogy of {} records".format(options.size),
+									 syntheticGenealogy(options.size)),
+									("inbred genealogy of {} generations".format(options.generations),
+									 inbredGenealogy(options.generations, options.width))]:
+		print(description.encode('utf-8'))
+		connector = databaseConnection.DatabaseConnector().connectToSQLite(":memory:")
+		storeGenealogy(genealogy, connector)
+		compareBitsets(genealogyGraph.GenealogyGraph(connector), max(genealogy), options.repeat)
+		connector[0].close()
+
+
+def compareBitsets(graph, last, repeat):
+	def setLCA(ids):
+		return commonAncestor.LCAFinder(graph.advisors, graph.students).find(ids)
+
+	def bitsetLCA(ids):
+		return ancestorBitsets.AncestorBitsets(graph.advisors, graph.students).find(ids)
+
+	def setCommon(ids):
+		finder = commonAncestor.LCAFinder(graph.advisors, graph.students)
+		common = set(finder.ancestors(ids[0]))
+
+		for id in ids[1:]:
+			common.intersection_update(finder.ancestors(id))
+
+		return sorted([(person, finder.height(person)) for person in common], key=lambda pair: (-pair[1], pair[0]))
+
+	def bitsetCommon(ids):
+		common = ancestorBitsets.AncestorBitsets(graph.advisors, graph.students).commonAncestors(ids)
+
+		return sorted(common, key=lambda pair: (-pair[1], pair[0]))
+
+	rand = random.Random(1)
+
+	for number in [2, 10, 50, 100]:
+		samples = [rand.sample(range(last // 2, last + 1), number) for i in range(repeat)]
+
+		for description, onSets, onBitsets in [("LCA", setLCA, bitsetLCA), ("common ancestors", setCommon, bitsetCommon)]:
+			start = time.time()
+			expected = [onSets(ids) for ids in samples]
+			setSeconds = (time.time() - start) / len(samples)
+
+			start = time.time()
+			found = [onBitsets(ids) for ids in samples]
+			bitsetSeconds = (time.time() - start) / len(samples)
+
+			print(u"{:3} IDs, {:16}   sets: {:9.2f}ms   bitsets: {:9.2f}ms{}"
+				  .format(number, description, 1000 * setSeconds, 1000 * bitsetSeconds,
+						  "" if found == expected else " (different result!)").encode('utf-8'))
+
+
+
+def benchmarkPath(options):
+	"""
+	Search the shortest path between random pairs of records of a synthetic genealogy in both
+	directions and upwards only. Compare the search from both ends with a breadth-first search
+	from one end. Both are done on the graph in memory and with one query per visited node.
+	"""
+	genealogy = syntheticGenealogy(options.size)
+	connector = databaseConnection.DatabaseConnector().connectToSQLite(":memory:")
+	storeGenealogy(genealogy, connector)
+	rand = random.Random(1)
+	pairs = [(rand.randint(1, options.size), rand.randint(1, options.size)) for i in range(options.repeat)]
+
+	def oneEnd(source, target, advisorsOf, studentsOf, upwards):
+		if upwards:
+			return upwardDistance(source, target, advisorsOf)
+
+		distances = {source: 0}
+		frontier = [source]
+
+		while len(frontier) > 0 and target not in distances:
+			following = []
+
+			for person in frontier:
+				for neighbour in list(advisorsOf(person)) + list(studentsOf(person)):
+					if neighbour not in distances:
+						distances[neighbour] = distances[person] + 1
+						following.append(neighbour)
+
+			frontier = following
+
+		return distances.get(target)
+
+	def upwardDistance(source, target, advisorsOf):
+		ancestors = []
+
+		for end in (source, target):
+			distances = {end: 0}
+			frontier = [end]
+
+			while len(frontier) > 0:
+				following = []
+
+				for person in frontier:
+					for advisor in advisorsOf(person):
+						if advisor not in distances:
+							distances[advisor] = distances[person] + 1
+							following.append(advisor)
+
+				frontier = following
+
+			ancestors.append(distances)
+
+		common = [ancestors[0][person] + ancestors[1][person] for person in ancestors[0] if person in ancestors[1]]
+
+		return min(common) if len(common) > 0 else None
+
+	def bothEnds(source, target, advisorsOf, studentsOf, upwards):
+		path = relationPath.shortestPath(source, target, advisorsOf, studentsOf, upwards)
+
+		return len(path) - 1 if path is not None else None
+
+	for backend in ["node", "memory"]:
+		searcher = search.Searcher(connector, None, False, backend)
+		advisorsOf, studentsOf = searcher.relations()
+
+		for upwards in [False, True]:
+			line = u"{:6} {:9}".format(backend, "upwards" if upwards else "both ways")
+			results = []
+
+			for description, pathSearch in [("one end", oneEnd), ("both ends", bothEnds)]:
+				start = time.time()
+				results.append([pathSearch(source, target, advisorsOf, studentsOf, upwards) for source, target in pairs])
+				seconds = (time.time() - start) / len(pairs)
+				line += u"   {}: {:9.2f}ms".format(description, 1000 * seconds)
+
+			found = [length for length in results[1] if length is not None]
+			line += u"   mean length: {:5.2f}{}".format(float(sum(found)) / max(len(found), 1),
+													   "" if results[0] == results[1] else " (different lengths!)")
+			print(line.encode('utf-8'))
+
+	connector[0].close()
+
+
+
+def benchmarkDepth(options):
+	"""
+	Build the tables of generation depths for a synthetic genealogy and an inbred genealogy and
+	compare the LCA search of 2 random records of the younger half without and with the stored
+	heights. Compare searches for the ancestors and descendants up to some generations with the
+	full searches. Change the advisors of some records and compare the incremental update with
+	a new build, which has to give the same depths.
+	"""
+	for description, genealogy in [("synthetic genealogy of {} records".format(options.size),
+									 syntheticGenealogy(options.size)),
+									("inbred genealogy of {} generations".format(options.generations),
+									 inbredGenealogy(options.generations, options.width))]:
+		print(description.encode('utf-8'))
+		connector = databaseConnection.DatabaseConnector().connectToSQLite(":memory:")
+		storeGenealogy(genealogy, connector)
+		cursor = connector[1]
+		graph = genealogyGraph.GenealogyGraph(connector)
+		depths = generationDepth.DepthTable(connector)
+		last = max(genealogy)
+
+		start = time.time()
+		rows = depths.build()
+		buildSeconds = time.time() - start
+
+		start = time.time()
+		depths.load()
+		loadSeconds = time.time() - start
+
+		cursor.execute("SELECT COUNT(*), MAX(maxDepth) FROM componentDepth")
+		components, height = cursor.fetchone()
+		print(u"Depths of {} records in {} component(s) of height {} built in {:.2f}s, loaded in {:.2f}s"
+			  .format(rows, components, height, buildSeconds, loadSeconds).encode('utf-8'))
+
+		rand = random.Random(1)
+		samples = [rand.sample(range(last // 2, last + 1), 2) for i in range(options.repeat)]
+		results = []
+		line = u"LCA of 2 IDs"
+
+		for name, finderDepths in [("full", None), ("pruned", depths)]:
+			start = time.time()
+			results.append([commonAncestor.LCAFinder(graph.advisors, graph.students, depths=finderDepths).find(ids)
+							for ids in samples])
+			line += u"   {}: {:9.2f}ms".format(name, 1000 * (time.time() - start) / len(samples))
+
+		print((line + ("" if results[0] == results[1] else " (different result!)")).encode('utf-8'))
+
+		for id, upwards in [(last, True), (1, False)]:
+			line = u"{} of {:6}".format("ancestors  " if upwards else "descendants", id)
+
+			for limit in [1, 3, None]:
+				start = time.time()
+
+				for i in range(options.repeat):
+					found = len(list(graph.generations(id, upwards, limit)))
+
+				line += u"   {}: {:9.3f}ms ({:6})".format("all" if limit is None else "within {}".format(limit),
+														 1000 * (time.time() - start) / options.repeat, found)
+
+			print(line.encode('utf-8'))
+
+		# Give random records another advisor with a smaller ID, then give the root an advisor
+		updater = update.Updater(connector, True, True, 1, 10000, float("inf"))
+
+		for changed in [rand.sample(range(2, last + 1), 20), [last // 2], [1]]:
+			for id in changed:
+				[name, degrees] = genealogy[id][:2]
+				advisors = [rand.randint(1, id - 1)] + degrees[0][2][1:] if id > 1 else [last + 1]
+				updater.insertOrUpdate(id, name, [degrees[0][0]], [degrees[0][1]], advisors, [None], 0)
+
+			start = time.time()
+			updater.flush()
+			updateSeconds = time.time() - start
+
+			cursor.execute("SELECT pID, minDepth, maxDepth FROM generationDepth")
+			updated = set(tuple(row) for row in cursor.fetchall())
+
+			start = time.time()
+			depths.build()
+			buildSeconds = time.time() - start
+
+			cursor.execute("SELECT pID, minDepth, maxDepth FROM generationDepth")
+			built = set(tuple(row) for row in cursor.fetchall())
+			records = u"record {}".format(changed[0]) if len(changed) == 1 else u"{} records".format(len(changed))
+			print(u"Advisors of {:24} changed: update {:6.2f}s, new build {:6.2f}s, {}"
+				  .format(records, updateSeconds, buildSeconds, "same depths" if updated == built else
+						  "DIFFERENT DEPTHS ({} rows)".format(len(built ^ updated))).encode('utf-8'))
+
+		connector[0].close()
+
+
+
+def hotQueries(leaf, middle):
+	"""
+	Return the frequent queries of the Searcher, the Visualizer and the Updater as lists
+	[description, query, parameters, indexes which the query plan has to use].
+	"""
+	return [["advisors of {}".format(leaf), "SELECT advisor FROM advised, dissertation WHERE student=dID AND author=?",
+			 (leaf,), ["dissertationAuthor", "sqlite_autoindex_advised_1"]],
+			["students of {}".format(middle), "SELECT author FROM advised, dissertation WHERE student=dID AND advisor=?",
+			 (middle,), ["advisedAdvisor"]],
+			["dissertations of {}".format(leaf), "SELECT university, year FROM dissertation WHERE author=?",
+			 (leaf,), ["dissertationAuthor"]],
+			["ancestors of {}".format(leaf), search.REACHABLE.format("advisor", "author"),
+			 (leaf,), ["dissertationAuthor", "sqlite_autoindex_advised_1"]],
+			["descendants of {}".format(middle), search.REACHABLE.format("author", "advisor"),
+			 (middle,), ["advisedAdvisor"]],
+			["generations below {}".format(middle), search.GENERATIONS.format("author", "advisor"),
+			 (middle, search.MAX_GENERATIONS), ["advisedAdvisor"]]]
+
+
+def benchmarkIndexes(options):
+	"""
+	Time the frequent queries in a local database of a synthetic genealogy without and with the
+	indexes of the schema migrations. Fail if a query plan scans 'advised' or 'dissertation'
+	or doesn't use the expected indexes.
+	"""
+	genealogy = syntheticGenealogy(options.size)
+	connector = databaseConnection.DatabaseConnector().connectToSQLite(":memory:")
+	storeGenealogy(genealogy, connector)
+	cursor = connector[1]
+
+	leaf = options.leaf or max(genealogy)
+	middle = max(2, options.size // 400)
+	queries = hotQueries(leaf, middle)
+	failures = []
+
+	for indexed in [False, True]:
+		if indexed:
+			schemaMigration.createNameIndex(cursor)
+			schemaMigration.createAdvisorIndex(cursor)
+
+		else:
+			cursor.execute("DROP INDEX dissertationAuthor")
+			cursor.execute("DROP INDEX advisedAdvisor")
+
+		for query in queries:
+			start = time.time()
+
+			for i in range(options.repeat):
+				cursor.execute(query[1], query[2])
+				found = len(cursor.fetchall())
+
+			query.append((time.time() - start) / options.repeat)
+
+			if indexed:
+				cursor.execute("EXPLAIN QUERY PLAN " + query[1], query[2])
+				plan = [row["detail"] for row in cursor.fetchall()]
+				scans = [step for step in plan if step.split()[:2] in [["SCAN", "advised"], ["SCAN", "dissertation"]]]
+				missing = [index for index in query[3] if not any(index in step for step in plan)]
+
+				if len(scans) > 0 or len(missing) > 0:
+					failures.append(u"{}: {}".format(query[0], u"; ".join(plan)))
+
+				print(u"{:24} {:7} found   without indexes: {:9.2f}ms   with indexes: {:7.2f}ms   plan: {}"
+					  .format(query[0], found, 1000 * query[4], 1000 * query[5], "ok" if len(scans) + len(missing) == 0
+							  else "FAILED").encode('utf-8'))
+
+	connector[0].close()
+
+	if len(failures) > 0:
+		raise AssertionError(u"Query plans without the expected indexes:\n" + u"\n".join(failures))
+
+
+
+def legacyInsertOrUpdate(connector, id, name, unis, years, advisors, dissertations, numberOfDescendants):
+	"""
+	Former Updater.insertOrUpdate which commits every single row. Only used by 'benchmark.py write'.
+	"""
+	[connection, cursor] = connector
+
+	cursor.execute("DELETE FROM dissertation WHERE author=?", (id,))
+	connection.commit()
+
+	cursor.execute("INSERT INTO person (pID, name, onlineDescendants) VALUES (?, ?, ?)",  (id, name, numberOfDescendants))
+	connection.commit()
+
+	advOrder = 0
+	iterAdvisor = iter(advisors)
+	iterUni = iter(unis)
+	iterYear = iter(years)
+
+	for dissertation in dissertations:
+		uni = next(iterUni)
+		year = next(iterYear)
+
+		cursor.execute("INSERT INTO dissertation VALUES (NULL, ?, ?, ?, ?)", (id, dissertation, uni, year))
+		connection.commit()
+		did = cursor.lastrowid
+
+		for advID in iterAdvisor:
+			if advID == 0:
+				advOrder = 0
+				break
+
+			advOrder += 1
+			cursor.execute("INSERT INTO advised VALUES (?, ?, ?)",  (did, advOrder, advID))
+			connection.commit()
+
+
+def benchmarkWrite(options):
+	"""
+	Write the records of a synthetic genealogy to a database file with the former
+	commit-per-row method and with the buffered transactions of the Updater for
+	every flush size of --flush-sizes. Print the rows per second.
+	"""
+	records = []
+
+	for id, page in sorted(loadPages(options).items()):
+		grabber = grab.Grabber(id, page)
+		grabber.parse()
+		records.append([id, grabber.name, grabber.institution, grabber.year, grabber.advisors,
+						grabber.dissertation, grabber.numberOfDescendants])
+
+	folder = tempfile.mkdtemp()
+
+	try:
+		for flushSize in [None] + [int(size) for size in options.flushSizes.split(",")]:
+			path = os.path.join(folder, "MGDB-{}".format(flushSize))
+			connector = databaseConnection.DatabaseConnector().connectToSQLite(path)
+			start = time.time()
+
+			if flushSize is None:
+				method = "commit per row"
+
+				for record in records:
+					legacyInsertOrUpdate(connector, *record)
+
+			else:
+				method = "flush size {}".format(flushSize)
+				updater = update.Updater(connector, True, False, 1, flushSize, float("inf"))
+
+				for record in records:
+					updater.insertOrUpdate(*record)
+
+				updater.flush()
+
+			seconds = time.time() - start
+
+			connector[1].execute("SELECT (SELECT COUNT(*) FROM person) + (SELECT COUNT(*) FROM dissertation) + \
+								 (SELECT COUNT(*) FROM advised)")
+			rows = connector[1].fetchone()[0]
+			connector[0].close()
+
+			print(u"{:16}  records = {:6}  rows = {:7}  time = {:7.2f}s  rows/s = {:9.1f}"
+				  .format(method, len(records), rows, seconds, rows / seconds).encode('utf-8'))
+
+	finally:
+		shutil.rmtree(folder)
+
+
+
+if __name__ == "__main__":
+	parser = OptionParser()
+	parser.set_usage("%prog [options] crawl|http|parse|write|retry|mirror|ingest|names|graph|indexes|lca|ancestry|batch|bitsets|path|depth|record|replay|corpus DIR")
+	parser.set_description("Run benchmarks of the Math-Genealogy-Database against a local stand-in server.")
+
+	parser.add_option("--size", action="store", type="int", dest="size", default=300,
+					  help="Number of records of the synthetic genealogy [default: %default]")
+	parser.add_option("--pages", action="store", type="string", dest="pages", default=None,
+					  help="Serve saved id.php pages (<ID>.html) from this folder instead of a synthetic genealogy")
+	parser.add_option("--cache", action="store", type="string", dest="cache", default=None,
+					  help="Parse the pages of this page cache instead of a synthetic genealogy")
+	parser.add_option("--repeat", action="store", type="int", dest="repeat", default=5,
+					  help="Number of times every page is parsed or search is run [default: %default]")
+	parser.add_option("--flush-sizes", action="store", type="string", dest="flushSizes", default="1,50,500",
+					  help="Comma-separated flush sizes of the Updater to compare [default: %default]")
+	parser.add_option("--root", action="store", type="int", dest="root", default=1,
+					  help="ID where the crawl starts [default: %default]")
+	parser.add_option("--jobs", action="store", type="string", dest="jobs", default="1,4,8",
+					  help="Comma-separated numbers of jobs to compare [default: %default]")
+	parser.add_option("--rate", action="store", type="float", dest="rate", default=0.0,
+					  help="Rate limit in requests per second, 0 disables the limit [default: %default]")
+	parser.add_option("--latency", action="store", type="float", dest="latency", default=0.05,
+					  help="Latency of the stand-in server in seconds [default: %default]")
+	parser.add_option("--connect-latency", action="store", type="float", dest="connectLatency", default=0.01,
+					  help="Additional latency of a new connection in seconds [default: %default]")
+
+	parser.add_option("--archive", action="store", type="string", dest="archive", default="benchmark.archive",
+					  help="Archive file of the record and replay benchmarks [default: %default]")
+	parser.add_option("--serve", action="store_true", dest="serve", default=False,
+					  help="Replay the archive from a stand-in server instead of in this process")
+	parser.add_option("--leaf", action="store", type="int", dest="leaf", default=None,
+					  help="ID whose ancestors are grabbed or searched in the record, replay, graph and indexes benchmarks [default: highest ID]")
+	parser.add_option("--name", action="store", type="string", dest="name", default="Gau",
+					  help="Last name searched in the record and replay benchmarks [default: %default]")
+	parser.add_option("--generations", action="store", type="int", dest="generations", default=16,
+					  help="Largest number of generations of the inbred genealogies in the LCA benchmark [default: %default]")
+	parser.add_option("--width", action="store", type="int", dest="width", default=20,
+					  help="Number of records per generation of the inbred genealogies in the LCA benchmark \
+					  [default: %default]")
+	parser.add_option("--harvest", action="store_true", dest="harvest", default=False,
+					  help="Store students without descendants from the pages of their advisors in the crawl benchmark")
+	parser.add_option("--failure-rate", action="store", type="float", dest="failureRate", default=0.2,
+					  help="Probability that the stand-in server fails a request in the retry benchmark \
+					  [default: %default]")
+
+	(options, args) = parser.parse_args()
+
+	if args == ["crawl"]:
+		benchmarkCrawl(options)
+
+	elif args == ["http"]:
+		benchmarkHTTP(options)
+
+	elif args == ["parse"]:
+		benchmarkParse(options)
+
+	elif args == ["write"]:
+		benchmarkWrite(options)
+
+	elif args == ["retry"]:
+		benchmarkRetry(options)
+
+	elif args == ["mirror"]:
+		benchmarkMirror(options)
+
+	elif args == ["ingest"]:
+		benchmarkIngest(options)
+
+	elif args == ["names"]:
+		benchmarkNames(options)
+
+	elif args == ["graph"]:
+		benchmarkGraph(options)
+
+	elif args == ["indexes"]:
+		benchmarkIndexes(options)
+
+	elif args == ["lca"]:
+		benchmarkLCA(options)
+
+	elif args == ["ancestry"]:
+		benchmarkAncestry(options)
+
+	elif args == ["batch"]:
+		benchmarkBatch(options)
+
+	elif args == ["bitsets"]:
+		benchmarkBitsets(options)
+
+	elif args == ["path"]:
+		benchmarkPath(options)
+
+	elif args == ["depth"]:
+		benchmarkDepth(options)
+
+	elif args == ["record"]:
+		benchmarkRecord(options)
+
+	elif args == ["replay"]:
+		benchmarkReplay(options)
+
+	elif len(args) == 2 and args[0] == "corpus":
+		writeCorpus(options, args[1])
+
+	else:
+		parser.error("choose one benchmark")
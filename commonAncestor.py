@@ -0,0 +1,352 @@
+# Copyright (c) 2011 Julian Wintermayr
+# 
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+import collections
+import heapq
+import multiprocessing
+import itertools
+import json
+import sys
+import re
+import databaseConnection
+import genealogyGraph
+import generationDepth
+
+
+# IDs of a batch query are separated by spaces or commas
+SEPARATOR = re.compile(r'[\s,]+')
+
+# Finder of this process in a batch search, kept for all of its queries
+workerFinder = None
+
+# Number of ancestor sets which the finder of a batch search keeps
+BATCH_CACHED_SETS = 4096
+
+
+
+class LCAFinder:
+	"""
+	Class for the lowest common ancestors (LCA) of mathematicians. The height of a mathematician is
+	the length of the longest path from a mathematician without advisors down to him. The LCA of
+	two mathematicians are their common ancestors (or themselves) of greatest height. The LCA of
+	more mathematicians are found pairwise: the LCA of the first two with the third one and so on.
+	Every step only visits the ancestors of the mathematicians, instead of comparing all of their
+	paths. Heights and ancestor sets are kept for later searches, but only the cachedSets ancestor
+	sets used last if cachedSets is given. If ancestorsOf is given, it returns the ancestor sets
+	(including the mathematician) instead of a search on advisorsOf. If depths
+	(a generationDepth.DepthTable) is given, mathematicians of different components have no LCA
+	and the stored heights prune the search.
+	"""
+	def __init__(self, advisorsOf, studentsOf, ancestorsOf=None, depths=None, cachedSets=None):
+		self.advisorsOf = advisorsOf
+		self.studentsOf = studentsOf
+		self.ancestorsOf = ancestorsOf
+		self.depths = depths
+		self.cachedSets = cachedSets
+		self.heights = {}
+		self.ancestorSets = collections.OrderedDict()
+
+
+	def ancestors(self, id):
+		"""
+		Return the set of id and all its ancestors.
+		"""
+		if id in self.ancestorSets:
+			# The set becomes the one used last
+			if self.cachedSets is not None:
+				self.ancestorSets[id] = self.ancestorSets.pop(id)
+
+			return self.ancestorSets[id]
+
+		if self.ancestorsOf is not None:
+			self.ancestorSets[id] = self.ancestorsOf(id)
+
+		else:
+			found = set([id])
+			stack = [id]
+
+			while stack:
+				for advisor in self.advisorsOf(stack.pop()):
+					if advisor not in found:
+						found.add(advisor)
+						stack.append(advisor)
+
+			self.ancestorSets[id] = found
+
+		ancestors = self.ancestorSets[id]
+
+		# The set used first is dropped
+		if self.cachedSets is not None and len(self.ancestorSets) > self.cachedSets:
+			self.ancestorSets.popitem(False)
+
+		return ancestors
+
+
+	def height(self, id):
+		"""
+		Return the number of degrees on the longest path from a mathematician without advisors to id.
+		Advisors in a cycle of the table 'advised' are ignored when the cycle is closed.
+		"""
+		if id in self.heights:
+			return self.heights[id]
+
+		stack = [id]
+		visiting = set()
+
+		while stack:
+			person = stack[-1]
+
+			if person in self.heights:
+				stack.pop()
+				continue
+
+			advisors = self.advisorsOf(person)
+
+			if person not in visiting:
+				visiting.add(person)
+				pending = [advisor for advisor in advisors if advisor not in self.heights and advisor not in visiting]
+
+				if len(pending) > 0:
+					stack.extend(pending)
+					continue
+
+			self.heights[person] = 1 + max([self.heights[advisor] for advisor in advisors if advisor in self.heights]
+										   or [-1])
+			visiting.discard(person)
+			stack.pop()
+
+		return self.heights[id]
+
+
+	def find(self, ids):
+		"""
+		Return the sorted list of the LCA of ids and the number of mathematicians on the longest path
+		from a mathematician without advisors down to them (0 if there is no LCA).
+		"""
+		if self.depths is not None:
+			components = set(self.depths.component(id) for id in ids)
+
+			if None not in components and len(components) > 1:
+				return [], 0
+
+		lca = [ids[0]]
+		maxPrefix = 0
+
+		for id in ids[1:]:
+			if self.depths is not None:
+				found = self.findByDepth(lca, id)
+
+				if found is not None:
+					lca, maxPrefix = found
+
+					if len(lca) == 0:
+						return [], 0
+
+					continue
+
+			candidates = set()
+
+			for singleLCA in lca:
+				candidates.update(self.ancestors(singleLCA))
+
+			candidates.intersection_update(self.ancestors(id))
+
+			if len(candidates) == 0:
+				return [], 0
+
+			heights = dict((candidate, self.height(candidate)) for candidate in candidates)
+			maxPrefix = max(heights.values()) + 1
+			lca = sorted(candidate for candidate in candidates if heights[candidate] == maxPrefix - 1)
+
+		return lca, maxPrefix
+
+
+	def findByDepth(self, lca, id):
+		"""
+		Return the LCA of the mathematicians lca and id with the number of mathematicians on the
+		longest path down to them by walking upwards from the greatest stored height. Every
+		mathematician knows which sides reach it when it is visited, since all of its students
+		are higher. The search stops below the first common ancestor, instead of visiting all
+		ancestors. Return None if a height is missing or an advisor isn't above their student
+		(i.e., in a cycle of the table 'advised').
+		"""
+		reachedBy = {}
+		heap = []
+
+		for person, side in [(person, 1) for person in lca] + [(id, 2)]:
+			height = self.depths.maxDepth(person)
+
+			if height is None:
+				return None
+
+			if person not in reachedBy:
+				heapq.heappush(heap, (-height, person))
+
+			reachedBy[person] = reachedBy.get(person, 0) | side
+
+		found = []
+		foundHeight = -1
+
+		while heap:
+			height, person = heapq.heappop(heap)
+			height = -height
+
+			if height < foundHeight:
+				break
+
+			if reachedBy[person] == 3:
+				found.append(person)
+				foundHeight = height
+				continue
+
+			for advisor in self.advisorsOf(person):
+				advisorHeight = self.depths.maxDepth(advisor)
+
+				if advisorHeight is None or advisorHeight >= height:
+					return None
+
+				if advisor not in reachedBy:
+					heapq.heappush(heap, (-advisorHeight, advisor))
+					reachedBy[advisor] = 0
+
+				reachedBy[advisor] |= reachedBy[person]
+
+		return sorted(found), foundHeight + 1
+
+
+	def connectingPaths(self, lca, ids):
+		"""
+		Return the set of the LCA and of all mathematicians on the paths from them down to ids.
+		"""
+		onPath = set(lca)
+
+		for id in ids:
+			ancestors = self.ancestors(id)
+			stack = [singleLCA for singleLCA in lca if singleLCA in ancestors]
+			found = set(stack)
+
+			while stack:
+				for student in self.studentsOf(stack.pop()):
+					if student in ancestors and student not in found:
+						found.add(student)
+						stack.append(student)
+
+			onPath.update(found)
+
+		return onPath
+
+
+
+def readQueries(lines):
+	"""
+	Yield a tuple of IDs for every line of at least two IDs. Empty lines and lines starting
+	with '#' are ignored. Other lines are reported on stderr and skipped.
+	"""
+	for number, line in enumerate(lines, 1):
+		line = line.strip()
+
+		if len(line) == 0 or line.startswith("#"):
+			continue
+
+		fields = SEPARATOR.split(line)
+
+		if len(fields) < 2 or not all(field.isdigit() for field in fields):
+			sys.stderr.write("Line {} skipped: enter at least two IDs\n".format(number))
+			continue
+
+		yield tuple(int(field) for field in fields)
+
+
+def startWorker(database, depthTable=False):
+	"""
+	Load the graph of the database for the LCA searches of this process, unless the process
+	was forked from a process which has already loaded it. Load the generation depths as well
+	if depthTable is set.
+	"""
+	global workerFinder
+
+	if workerFinder is not None:
+		return
+
+	connector = databaseConnection.DatabaseConnector().connectToSQLite(database)
+	graph = genealogyGraph.GenealogyGraph(connector)
+	depths = None
+
+	if depthTable:
+		depths = generationDepth.DepthTable(connector)
+		depths.load()
+
+	connector[0].close()
+	workerFinder = LCAFinder(graph.advisors, graph.students, depths=depths, cachedSets=BATCH_CACHED_SETS)
+
+
+def findLCA(ids):
+	lca, maxPrefix = workerFinder.find(list(ids))
+
+	return ids, lca, maxPrefix
+
+
+def batchLCA(database, lines, processes=1, output=sys.stdout, chunkSize=64, depthTable=False):
+	"""
+	Search the LCA of every query of 'lines' and write one JSON object per query to output in
+	the order of the queries. Every process gets the graph once and keeps the heights and the
+	BATCH_CACHED_SETS ancestor sets used last for all of its queries. The stored generation depths prune the searches if depthTable
+	is set. Return the number of queries.
+	"""
+	global workerFinder
+
+	queries = readQueries(lines)
+	pool = None
+
+	workerFinder = None
+	startWorker(database, depthTable)
+
+	if processes > 1:
+		pool = multiprocessing.Pool(processes, startWorker, (database, depthTable))
+		results = pool.imap(findLCA, queries, chunkSize)
+
+	else:
+		results = itertools.imap(findLCA, queries)
+
+	number = 0
+
+	try:
+		for ids, lca, maxPrefix in results:
+			result = collections.OrderedDict([("ids", list(ids)), ("lca", lca), ("commonAncestors", maxPrefix)])
+			output.write(json.dumps(result) + "\n")
+			number += 1
+
+		if pool is not None:
+			pool.close()
+
+	except:
+		if pool is not None:
+			pool.terminate()
+
+		raise
+
+	finally:
+		if pool is not None:
+			pool.join()
+
+	return number
@@ -0,0 +1,375 @@
+# Copyright (c) 2011 Julian Wintermayr
+# 
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import threading
+import collections
+import Queue
+import time
+
+
+
+class Frontier:
+	"""
+	Class for the work queue of an update-by-ID, stored in the table 'frontier' of the local database.
+	Every ID is queued at most once per direction ("seed", "ancestors" or "descendants").
+	An interrupted update continues with the IDs which are still to be grabbed.
+	"""
+	def __init__(self, connector):
+		self.connection = connector[0]
+		self.cursor = connector[1]
+
+		self.queued = set()
+		self.pending = collections.deque()
+
+		self.cursor.execute("SELECT pID, direction, grabbed FROM frontier ORDER BY rowid")
+
+		for row in self.cursor.fetchall():
+			self.queued.add((row["pID"], row["direction"]))
+
+			if row["grabbed"] == 0:
+				self.pending.append((row["pID"], row["direction"]))
+
+
+	def __len__(self):
+		return len(self.pending)
+
+
+	def add(self, ids, direction):
+		"""
+		Queue the given IDs if they haven't been queued for this direction yet.
+		ID=0 just separates sets of advisors and won't be queued.
+		"""
+		for id in ids:
+			task = (id, direction)
+
+			if id == 0 or task in self.queued:
+				continue
+
+			self.queued.add(task)
+			self.pending.append(task)
+			self.cursor.execute("INSERT INTO frontier (pID, direction) VALUES (?, ?)", task)
+
+
+	def pop(self):
+		return self.pending.popleft()
+
+
+	def done(self, id, direction):
+		"""
+		Mark the ID as grabbed. Not committed here: the Updater commits it together with
+		the record and the queued students or advisors of this ID.
+		"""
+		self.cursor.execute("UPDATE frontier SET grabbed=1 WHERE pID=? AND direction=?", (id, direction))
+
+
+	def clear(self):
+		self.cursor.execute("DELETE FROM frontier")
+		self.connection.commit()
+
+		self.queued = set()
+		self.pending = collections.deque()
+
+
+
+class ShardFrontier:
+	"""
+	Class for the work queue of a mirror of a whole ID range, stored in the table 'mirrorShard'.
+	The range is split into shards of consecutive IDs. Several shards are grabbed at the same time
+	and every shard remembers the lowest ID which hasn't been grabbed yet. Hence, an interrupted
+	mirror continues where it stopped when it is started again.
+	"""
+	def __init__(self, connector, first, last, shardSize, activeShards):
+		self.connection = connector[0]
+		self.cursor = connector[1]
+		self.activeShards = activeShards
+
+		# Shards of an earlier mirror are kept, even if they have another size. Shards which reach
+		# beyond the range are split at its bounds, so that every shard lies inside or outside of it.
+		for bound in [first, last + 1]:
+			self.cursor.execute("SELECT first, last, next, missing FROM mirrorShard WHERE first<? AND last>=?",
+								(bound, bound))
+
+			for row in self.cursor.fetchall():
+				self.cursor.execute("UPDATE mirrorShard SET last=?, next=? WHERE first=?",
+									(bound - 1, min(row["next"], bound), row["first"]))
+				self.cursor.execute("INSERT INTO mirrorShard (first, last, next) VALUES (?, ?, ?)",
+									(bound, row["last"], max(row["next"], bound)))
+
+		# Only the gaps between the earlier shards get new shards
+		self.cursor.execute("SELECT first, last FROM mirrorShard WHERE first>=? AND last<=? ORDER BY first",
+							(first, last))
+		gapStart = first
+
+		for row in self.cursor.fetchall() + [{"first": last + 1, "last": last}]:
+			for start in range(gapStart, row["first"], shardSize):
+				end = min(start + shardSize - 1, row["first"] - 1)
+				self.cursor.execute("INSERT INTO mirrorShard (first, last, next) VALUES (?, ?, ?)", (start, end, start))
+
+			gapStart = max(gapStart, row["last"] + 1)
+
+		self.connection.commit()
+
+		# Every shard is a list [first, last, next ID to queue, queued IDs which aren't done yet, missing IDs]
+		self.waiting = collections.deque()
+		self.active = []
+		self.owner = {}
+		self.remaining = 0
+		self.turn = 0
+
+		self.cursor.execute("SELECT first, last, next, missing FROM mirrorShard WHERE first>=? AND last<=? AND \
+							next<=last ORDER BY first", (first, last))
+
+		for row in self.cursor.fetchall():
+			self.waiting.append([row["first"], row["last"], row["next"], set(), row["missing"]])
+			self.remaining += row["last"] - row["next"] + 1
+
+
+	def __len__(self):
+		return self.remaining
+
+
+	def pop(self):
+		"""
+		Return the next ID of the active shards in turn.
+		"""
+		while len(self.active) < self.activeShards and len(self.waiting) > 0:
+			self.active.append(self.waiting.popleft())
+
+		self.turn = (self.turn + 1) % len(self.active)
+		shard = self.active[self.turn]
+
+		id = shard[2]
+		shard[2] += 1
+		shard[3].add(id)
+		self.owner[id] = shard
+		self.remaining -= 1
+
+		# All IDs of this shard are queued. It stays known through self.owner until they are done.
+		if shard[2] > shard[1]:
+			self.active.remove(shard)
+
+		return (id, "mirror")
+
+
+	def done(self, id, missing=False):
+		"""
+		Mark the ID as grabbed and move the checkpoint of its shard. Not committed here:
+		the Updater commits it together with the record.
+		"""
+		shard = self.owner.pop(id)
+		shard[3].remove(id)
+
+		if missing:
+			shard[4] += 1
+
+		checkpoint = min(shard[3]) if len(shard[3]) > 0 else shard[2]
+		self.cursor.execute("UPDATE mirrorShard SET next=?, missing=? WHERE first=?", (checkpoint, shard[4], shard[0]))
+
+
+
+class Stage:
+	"""
+	Threads of one step of the Crawler. Every thread takes (task, value) out of the input queue,
+	calls function(id) (first stage) or function(id, value) and puts (task, result) into the
+	output queue. The busy time of all threads is summed up.
+	"""
+	def __init__(self, name, function, threads, input, output, first):
+		self.name = name
+		self.function = function
+		self.threads = threads
+		self.input = input
+		self.output = output
+		self.first = first
+
+		self.items = 0
+		self.busy = 0.0
+		self.depthSum = 0
+		self.depthMax = 0
+		self.samples = 0
+		self.lock = threading.Lock()
+
+
+	def work(self, errors):
+		while True:
+			entry = self.input.get()
+
+			# None signals the end of the crawl
+			if entry is None:
+				break
+
+			task, value = entry
+			start = time.time()
+
+			try:
+				if self.first:
+					result = self.function(task[0])
+
+				else:
+					result = self.function(task[0], value)
+
+			except Exception as e:
+				# Errors skip the following stages
+				errors.put((task, None, e))
+				continue
+
+			finally:
+				with self.lock:
+					self.items += 1
+					self.busy += time.time() - start
+
+			self.output.put((task, result))
+
+
+	def sample(self):
+		depth = self.input.qsize()
+		self.depthSum += depth
+		self.depthMax = max(self.depthMax, depth)
+		self.samples += 1
+
+
+	def statistics(self):
+		average = self.busy / self.items if self.items > 0 else 0.0
+		depth = float(self.depthSum) / self.samples if self.samples > 0 else 0.0
+
+		return u"{:6} threads: {:3}  items: {:7}  busy: {:8.2f}s  per item: {:7.1f}ms  queue: {:5.1f} avg {:4} max"\
+			   .format(self.name, self.threads, self.items, self.busy, 1000 * average, depth, self.depthMax)
+
+
+
+class Crawler:
+	"""
+	Class for grabbing several records at the same time in a pipeline of stages.
+	Every stage is a (name, function, threads) tuple: the first one fetches the pages of the
+	IDs of the frontier, the next ones (e.g. parsing) work on the result of the stage before.
+	Bounded queues connect the stages, so a slow stage holds back the ones before it.
+	The calling thread is the last stage: it collects the results, writes them to the
+	database and queues the next IDs. Hence, it is the only writer of the database and
+	the only thread which touches the frontier.
+	"""
+	def __init__(self, stages, frontier, queueSize=None):
+		self.frontier = frontier
+		self.threads = []
+
+		workers = stages[0][2]
+		self.queueSize = queueSize if queueSize is not None else 2 * workers
+
+		self.todo = Queue.Queue()
+		self.done = Queue.Queue()
+		self.stages = []
+		input = self.todo
+
+		for number, (name, function, threads) in enumerate(stages):
+			output = self.done if number == len(stages) - 1 else Queue.Queue(self.queueSize)
+			self.stages.append(Stage(name, function, threads, input, output, number == 0))
+			input = output
+
+		# Only for the statistics: the calling thread does the work of the last stage
+		self.writer = Stage("write", None, 1, self.done, None, False)
+		self.inFlight = 0
+
+
+	def start(self):
+		for stage in self.stages:
+			for i in range(stage.threads):
+				thread = threading.Thread(target=stage.work, args=(self.done,))
+				thread.daemon = True
+				thread.start()
+				self.threads.append((stage, thread))
+
+
+	def stop(self):
+		# Stop the stages one after the other, so that no thread waits for a stopped stage
+		for stage in self.stages:
+			threads = [thread for threadStage, thread in self.threads if threadStage is stage]
+			self.drain(stage.input)
+
+			for thread in threads:
+				stage.input.put(None)
+
+			for thread in threads:
+				while thread.is_alive():
+					thread.join(0.1)
+
+					# A thread may wait for space in the next queue which nobody empties anymore
+					if stage.output is not self.done:
+						self.drain(stage.output)
+
+		self.threads = []
+
+
+	@staticmethod
+	def drain(queue):
+		"""
+		Throw away the tasks of an interrupted crawl. The frontier still knows them.
+		"""
+		try:
+			while True:
+				queue.get_nowait()
+
+		except Queue.Empty:
+			pass
+
+
+	def results(self):
+		"""
+		Yield (id, direction, result) for every grabbed record until the frontier
+		is empty. Errors of the stages are raised here.
+		"""
+		while True:
+			# Keep every stage busy without taking the whole frontier out of the database
+			while self.inFlight < self.queueSize and len(self.frontier) > 0:
+				self.todo.put((self.frontier.pop(), None))
+				self.inFlight += 1
+
+			if self.inFlight == 0:
+				break
+
+			# A timeout keeps the calling thread responsive to Ctrl-C
+			try:
+				entry = self.done.get(True, 1)
+
+			except Queue.Empty:
+				continue
+
+			self.inFlight -= 1
+
+			for stage in self.stages + [self.writer]:
+				stage.sample()
+
+			if len(entry) == 3:
+				raise entry[2]
+
+			task, result = entry
+			start = time.time()
+
+			yield task[0], task[1], result
+
+			self.writer.items += 1
+			self.writer.busy += time.time() - start
+
+
+	def statistics(self):
+		"""
+		Return the number of threads, items, busy time and queue depth of every stage.
+		The stage with the highest time per item and thread limits the throughput.
+		"""
+		return u"\n".join(stage.statistics() for stage in self.stages + [self.writer])
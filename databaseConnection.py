@@ -21,6 +21,7 @@
 
 
 import sqlite3
+import schemaMigration
 
 
 
@@ -46,28 +47,11 @@ class DatabaseConnector:
 				self.connection.row_factory = sqlite3.Row
 				self.cursor = self.connection.cursor()
 
-				self.cursor.execute("CREATE TABLE IF NOT EXISTS person (\
-									pID INTEGER PRIMARY KEY ON CONFLICT REPLACE, \
-									name VARCHAR(255), \
-									onlineDescendants INTEGER)")
+				# Replaced rows fire the DELETE triggers as well. Otherwise the name index would keep replaced names.
+				self.cursor.execute("PRAGMA recursive_triggers = ON")
 
-				self.cursor.execute("CREATE TABLE IF NOT EXISTS dissertation (\
-									dID INTEGER PRIMARY KEY ON CONFLICT REPLACE AUTOINCREMENT, \
-									author INTEGER REFERENCES person ON DELETE SET NULL ON UPDATE CASCADE, \
-									title TEXT, \
-									university TEXT, \
-									year VARCHAR(255))")
-
-				self.cursor.execute("CREATE TABLE IF NOT EXISTS advised (\
-									student INTEGER REFERENCES dissertation ON DELETE CASCADE ON UPDATE CASCADE, \
-									advisorOrder INTEGER CHECK (advisorOrder > 0), \
-					                advisor INTEGER REFERENCES person ON DELETE CASCADE ON UPDATE CASCADE, \
-									PRIMARY KEY (student, advisor) ON CONFLICT REPLACE)")
-
-				self.cursor.execute("CREATE TRIGGER IF NOT EXISTS delPerson AFTER DELETE ON dissertation FOR EACH ROW \
-									BEGIN \
-										DELETE FROM person WHERE OLD.author = pID; \
-									END")
+				# Create the tables or upgrade the tables of an older version
+				schemaMigration.migrate([self.connection, self.cursor])
 
 				self.connection.commit()
 
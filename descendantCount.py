@@ -0,0 +1,143 @@
+# Copyright (c) 2011 Julian Wintermayr
+# 
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import collections
+
+
+
+class DescendantCounter:
+	"""
+	Class for the table 'descendantCount', which stores the number of descendants of every
+	mathematician in the local database. The whole table is computed in one pass over the
+	advised-table. Changed advisors delete the numbers of all ancestors, which are computed
+	again with one query when they are needed.
+	"""
+	def __init__(self, connector):
+		self.connection = connector[0]
+		self.cursor = connector[1]
+
+
+	def isEmpty(self):
+		self.cursor.execute("SELECT 1 FROM descendantCount LIMIT 1")
+
+		return self.cursor.fetchone() is None
+
+
+	def build(self):
+		"""
+		Compute the number of descendants of every mathematician. The mathematicians are visited
+		in topological order, students before their advisors. The descendants of a mathematician
+		are the union of his students and their descendants. The sets are stored as bits of an
+		integer and dropped as soon as every advisor has used them.
+		"""
+		self.cursor.execute("SELECT DISTINCT advisor, author FROM advised, dissertation WHERE student=dID")
+		students = collections.defaultdict(list)
+		numberOfAdvisors = collections.defaultdict(int)
+
+		for row in self.cursor.fetchall():
+			students[row["advisor"]].append(row["author"])
+			numberOfAdvisors[row["author"]] += 1
+
+		self.cursor.execute("SELECT pID FROM person")
+		persons = set(row["pID"] for row in self.cursor.fetchall())
+		persons.update(students)
+
+		# Number of students which haven't been visited yet
+		waitingFor = dict((id, len(students[id])) for id in persons)
+		ready = collections.deque(id for id in persons if waitingFor[id] == 0)
+
+		# Bit positions are given in visiting order, so the sets of students only use low bits
+		bit = {}
+		descendants = {}
+		advisorsLeft = dict((id, numberOfAdvisors[id]) for id in persons)
+		advisorsOf = collections.defaultdict(list)
+
+		for advisor in students:
+			for student in students[advisor]:
+				advisorsOf[student].append(advisor)
+
+		counts = []
+
+		while ready:
+			id = ready.popleft()
+			bit[id] = 1 << len(bit)
+			descendantSet = 0
+
+			for student in students[id]:
+				descendantSet |= bit[student] | descendants[student]
+				advisorsLeft[student] -= 1
+
+				if advisorsLeft[student] == 0:
+					del descendants[student]
+
+			descendants[id] = descendantSet
+			counts.append((id, bin(descendantSet).count("1")))
+
+			if advisorsLeft[id] == 0:
+				del descendants[id]
+
+			for advisor in advisorsOf[id]:
+				waitingFor[advisor] -= 1
+
+				if waitingFor[advisor] == 0:
+					ready.append(advisor)
+
+		self.cursor.execute("DELETE FROM descendantCount")
+		self.cursor.executemany("INSERT INTO descendantCount VALUES (?, ?)", counts)
+
+		# Mathematicians in a cycle of the advised-table never get ready. Their numbers are computed when needed.
+		return len(persons) - len(counts)
+
+
+	def get(self, id):
+		"""
+		Return the stored number of descendants. If it isn't stored, compute and store it.
+		"""
+		self.cursor.execute("SELECT number FROM descendantCount WHERE pID=?", (id,))
+		row = self.cursor.fetchone()
+
+		if row is not None:
+			return row["number"]
+
+		# UNION removes duplicates, so every descendant is counted once
+		self.cursor.execute("WITH RECURSIVE down(pID) AS ( \
+								SELECT author FROM advised, dissertation WHERE student=dID AND advisor=? \
+								UNION \
+								SELECT author FROM advised, dissertation, down WHERE student=dID AND advisor=down.pID) \
+							SELECT COUNT(*) FROM down", (id,))
+		number = self.cursor.fetchone()[0]
+
+		self.cursor.execute("INSERT INTO descendantCount VALUES (?, ?)", (id, number))
+
+		return number
+
+
+	def invalidate(self, ids):
+		"""
+		Delete the numbers of the given mathematicians and all their ancestors.
+		"""
+		for id in ids:
+			self.cursor.execute("WITH RECURSIVE up(pID) AS ( \
+									SELECT ? \
+									UNION \
+									SELECT advisor FROM advised, dissertation, up WHERE student=dID AND author=up.pID) \
+								DELETE FROM descendantCount WHERE pID IN up", (id,))
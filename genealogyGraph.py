@@ -0,0 +1,152 @@
+# Copyright (c) 2011 Julian Wintermayr
+# 
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+from array import array
+from itertools import izip
+
+
+
+def compressedRows(sources, targets, size):
+	"""
+	Sort the edges (sources[i], targets[i]) by their source with a counting sort.
+	Return the arrays 'offsets' and 'neighbours': the neighbours of the node v are
+	neighbours[offsets[v]:offsets[v+1]].
+	"""
+	offsets = array('i', [0]) * (size + 1)
+
+	for source in sources:
+		offsets[source + 1] += 1
+
+	for v in xrange(size):
+		offsets[v + 1] += offsets[v]
+
+	position = array('i', offsets)
+	neighbours = array('i', [0]) * len(targets)
+
+	for source, target in izip(sources, targets):
+		neighbours[position[source]] = target
+		position[source] += 1
+
+	return offsets, neighbours
+
+
+
+class GenealogyGraph:
+	"""
+	Class for the advisor relations of the local database held in memory. The table 'advised'
+	is joined with 'dissertation' once and stored as two compressed adjacency lists (one for
+	advisors, one for students) in integer arrays, which are indexed by the ID of the
+	mathematician. Searches on the graph don't send any query to the database.
+	"""
+	def __init__(self, connector):
+		cursor = connector[1]
+		cursor.execute("SELECT DISTINCT author, advisor FROM advised, dissertation WHERE student=dID")
+
+		authors = array('i')
+		advisors = array('i')
+
+		for row in cursor:
+			authors.append(row[0])
+			advisors.append(row[1])
+
+		self.size = max(max(authors), max(advisors)) + 1 if len(authors) > 0 else 0
+		self.edges = len(authors)
+
+		self.advisorOffsets, self.advisorList = compressedRows(authors, advisors, self.size)
+		self.studentOffsets, self.studentList = compressedRows(advisors, authors, self.size)
+
+
+	def advisors(self, id):
+		if id >= self.size:
+			return ()
+
+		return self.advisorList[self.advisorOffsets[id]:self.advisorOffsets[id + 1]]
+
+
+	def students(self, id):
+		if id >= self.size:
+			return ()
+
+		return self.studentList[self.studentOffsets[id]:self.studentOffsets[id + 1]]
+
+
+	def ancestors(self, id):
+		"""
+		Return the set of all ancestors of id including id.
+		"""
+		return self.reachable(id, self.advisorOffsets, self.advisorList)
+
+
+	def descendants(self, id):
+		"""
+		Return the set of all descendants of id including id.
+		"""
+		return self.reachable(id, self.studentOffsets, self.studentList)
+
+
+	def reachable(self, id, offsets, neighbours):
+		found = set([id])
+		stack = [id]
+
+		while stack:
+			v = stack.pop()
+
+			if v >= self.size:
+				continue
+
+			for w in neighbours[offsets[v]:offsets[v + 1]]:
+				if w not in found:
+					found.add(w)
+					stack.append(w)
+
+		return found
+
+
+	def generations(self, id, upwards, limit=None):
+		"""
+		Yield (ID, generation) for every ancestor (upwards) or descendant of id as soon as it is found,
+		generation by generation. Visited IDs are marked in a byte array, so that apart from it only
+		the current and the next generation are kept. Nothing beyond the generation limit is visited.
+		"""
+		offsets, neighbours = (self.advisorOffsets, self.advisorList) if upwards else \
+							  (self.studentOffsets, self.studentList)
+		visited = bytearray(max(self.size, id + 1))
+		visited[id] = 1
+		current = [id]
+		generation = 0
+
+		while current and generation != limit:
+			generation += 1
+			following = []
+
+			for v in current:
+				if v >= self.size:
+					continue
+
+				for w in neighbours[offsets[v]:offsets[v + 1]]:
+					if not visited[w]:
+						visited[w] = 1
+						following.append(w)
+						yield w, generation
+
+			current = following
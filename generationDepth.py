@@ -0,0 +1,264 @@
+# Copyright (c) 2011 Julian Wintermayr
+# 
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+
+from array import array
+import genealogyGraph
+import commonAncestor
+import ancestry
+
+# Descendants of a mathematician with the current advisors
+DESCENDANTS = "WITH RECURSIVE found(pID) AS (SELECT ? UNION SELECT author FROM advised, dissertation, found \
+			  WHERE student=dID AND advisor=found.pID) SELECT pID FROM found"
+
+
+class DepthTable:
+	"""
+	Class for the tables 'generationDepth' and 'componentDepth'. The depths of a mathematician are
+	the lengths of the shortest and of the longest path from a mathematician without advisors down
+	to them. The longest one is the height of commonAncestor.LCAFinder. Connected components are
+	named by their smallest ID. The tables are optional: they are empty until they are built and
+	only kept up to date afterwards. Updates only merge components: a component which loses the
+	relation that connected it stays one component until the tables are built again.
+	"""
+	def __init__(self, connector):
+		self.connector = connector
+		self.connection = connector[0]
+		self.cursor = connector[1]
+
+		# Arrays indexed by the ID if all rows are loaded (-1 for missing rows)
+		self.components = None
+		self.maxDepths = None
+
+
+	def isEmpty(self):
+		self.cursor.execute("SELECT 1 FROM generationDepth LIMIT 1")
+
+		return self.cursor.fetchone() is None
+
+
+	def build(self):
+		"""
+		Compute the depths of all mathematicians on the graph in memory and store them. The
+		shortest paths are found breadth-first from the mathematicians without advisors, the longest
+		ones when all advisors are done. Mathematicians with an advisor in a cycle of the table
+		'advised' get their longest path from LCAFinder.height(), a cycle without ancestors outside
+		of it has the depth 0. Return the number of rows.
+		"""
+		graph = genealogyGraph.GenealogyGraph(self.connector)
+		self.cursor.execute("SELECT pID FROM person")
+		persons = set(row["pID"] for row in self.cursor.fetchall())
+		persons.update(id for id in xrange(graph.size) if len(graph.advisors(id)) > 0 or len(graph.students(id)) > 0)
+		size = max(graph.size, max(persons) + 1 if len(persons) > 0 else 0)
+
+		pending = array('i', [len(graph.advisors(id)) for id in xrange(size)])
+		roots = [id for id in persons if pending[id] == 0]
+		minDepths = array('i', [-1]) * size
+		maxDepths = array('i', [0]) * size
+
+		for root in roots:
+			minDepths[root] = 0
+
+		current = roots
+
+		while current:
+			following = []
+
+			for advisor in current:
+				for student in graph.students(advisor):
+					if minDepths[student] < 0:
+						minDepths[student] = minDepths[advisor] + 1
+						following.append(student)
+
+			current = following
+
+		order = list(roots)
+
+		for advisor in order:
+			for student in graph.students(advisor):
+				maxDepths[student] = max(maxDepths[student], maxDepths[advisor] + 1)
+				pending[student] -= 1
+
+				if pending[student] == 0:
+					order.append(student)
+
+		if len(order) < len(persons):
+			finder = commonAncestor.LCAFinder(graph.advisors, graph.students)
+			finder.heights = dict((id, maxDepths[id]) for id in order)
+
+			for id in persons:
+				maxDepths[id] = finder.height(id)
+
+		# Union-find with the smallest ID of every component as its root
+		parents = array('i', xrange(size))
+
+		def find(id):
+			while parents[id] != id:
+				parents[id] = parents[parents[id]]
+				id = parents[id]
+
+			return id
+
+		for id in xrange(graph.size):
+			for advisor in graph.advisors(id):
+				first, second = find(id), find(advisor)
+
+				if first != second:
+					parents[max(first, second)] = min(first, second)
+
+		self.cursor.execute("DELETE FROM generationDepth")
+		self.cursor.execute("DELETE FROM componentDepth")
+		self.cursor.executemany("INSERT INTO generationDepth VALUES (?, ?, ?, ?)",
+								((id, find(id), max(minDepths[id], 0), maxDepths[id]) for id in sorted(persons)))
+		self.cursor.execute("INSERT INTO componentDepth SELECT component, COUNT(*), MIN(minDepth), MAX(maxDepth) \
+							FROM generationDepth GROUP BY component")
+		self.components = None
+		self.maxDepths = None
+
+		return len(persons)
+
+
+	def update(self, ids):
+		"""
+		Compute the depths of the given mathematicians and of all their descendants again after
+		their advisors changed, and merge the components they connect. Call it after the changes
+		are written, but before the tables are used. Nothing is done if the tables aren't used.
+		"""
+		if len(ids) == 0 or self.isEmpty():
+			return
+
+		affected = set(ids)
+
+		for id in ids:
+			self.cursor.execute(DESCENDANTS, (id,))
+			affected.update(row["pID"] for row in self.cursor.fetchall())
+
+		if ancestry.rebuildNeeded(self.cursor, affected):
+			self.build()
+			return
+
+		self.components = None
+		self.maxDepths = None
+		advisorsOf = ancestry.currentAdvisors(self.cursor, affected)
+		depths = {}
+		touched = set()
+
+		for id in ancestry.advisorsFirst(affected, advisorsOf):
+			advisorDepths = [depths[advisor] if advisor in depths else self.row(advisor)[1:]
+							 for advisor in advisorsOf[id] if advisor in depths or advisor not in affected]
+
+			if len(advisorDepths) > 0:
+				depths[id] = (1 + min(depth[0] for depth in advisorDepths), 1 + max(depth[1] for depth in advisorDepths))
+
+			else:
+				depths[id] = (0, 0)
+
+			component = self.row(id)[0]
+			self.cursor.execute("INSERT INTO generationDepth VALUES (?, ?, ?, ?)", (id, component, depths[id][0],
+																				   depths[id][1]))
+
+			# Relations to another component merge both
+			components = set([component] + [self.row(advisor)[0] for advisor in advisorsOf[id]])
+			merged = min(components)
+			touched.update(components)
+
+			if len(components) > 1:
+				self.cursor.execute("UPDATE generationDepth SET component=? WHERE component IN ({})"
+									.format(", ".join("?" * (len(components) - 1))),
+									[merged] + sorted(components.difference([merged])))
+
+		touched = sorted(touched)
+
+		for i in range(0, len(touched), 500):
+			chunk = touched[i:i+500]
+			marks = ", ".join("?" * len(chunk))
+			self.cursor.execute("DELETE FROM componentDepth WHERE component IN ({})".format(marks), chunk)
+			self.cursor.execute("INSERT INTO componentDepth SELECT component, COUNT(*), MIN(minDepth), MAX(maxDepth) \
+								FROM generationDepth WHERE component IN ({}) GROUP BY component".format(marks), chunk)
+
+
+	def row(self, id):
+		"""
+		Return (component, minDepth, maxDepth) of id. A mathematician without a row is stored
+		as a component of its own without advisors.
+		"""
+		self.cursor.execute("SELECT component, minDepth, maxDepth FROM generationDepth WHERE pID=?", (id,))
+		row = self.cursor.fetchone()
+
+		if row is None:
+			self.cursor.execute("INSERT INTO generationDepth VALUES (?, ?, 0, 0)", (id, id))
+			self.cursor.execute("INSERT INTO componentDepth VALUES (?, 1, 0, 0)", (id,))
+
+			return id, 0, 0
+
+		return row["component"], row["minDepth"], row["maxDepth"]
+
+
+	def load(self):
+		"""
+		Keep the components and the longest paths of all mathematicians in memory.
+		"""
+		self.cursor.execute("SELECT MAX(pID) FROM generationDepth")
+		size = (self.cursor.fetchone()[0] or 0) + 1
+		self.components = array('i', [-1]) * size
+		self.maxDepths = array('i', [-1]) * size
+		self.cursor.execute("SELECT pID, component, maxDepth FROM generationDepth")
+
+		for row in self.cursor:
+			self.components[row[0]] = row[1]
+			self.maxDepths[row[0]] = row[2]
+
+
+	def lookUp(self, column, loaded, id):
+		if loaded is not None:
+			return loaded[id] if id < len(loaded) and loaded[id] >= 0 else None
+
+		self.cursor.execute("SELECT {} FROM generationDepth WHERE pID=?".format(column), (id,))
+		row = self.cursor.fetchone()
+
+		return row[0] if row is not None else None
+
+
+	def component(self, id):
+		"""
+		Return the component of id or None if id has no row.
+		"""
+		return self.lookUp("component", self.components, id)
+
+
+	def maxDepth(self, id):
+		"""
+		Return the length of the longest path from a mathematician without advisors down to id
+		or None if id has no row.
+		"""
+		return self.lookUp("maxDepth", self.maxDepths, id)
+
+
+	def componentDepth(self, component):
+		"""
+		Return (size, minDepth, maxDepth) of a component or None if there is no such component.
+		"""
+		self.cursor.execute("SELECT size, minDepth, maxDepth FROM componentDepth WHERE component=?", (component,))
+		row = self.cursor.fetchone()
+
+		return (row["size"], row["minDepth"], row["maxDepth"]) if row is not None else None
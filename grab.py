@@ -23,9 +23,48 @@
 # Modified 2011 by Julian Wintermayr
 
 
-import urllib2
 import time
+import re
 import HTMLParser
+import rateLimit
+import httpSession
+import retry
+
+
+# Address of the Math Genealogy Project. Can be changed to query a mirror or a local test server.
+BASE_URL = 'http://genealogy.math.ndsu.nodak.edu/'
+
+# The Math Genealogy Project answers with this message if an ID doesn't exist.
+NOT_FOUND = 'You have specified an ID that does not exist in the database'
+
+# One unescaper for all pages
+UNESCAPER = HTMLParser.HTMLParser()
+
+# Markers of the parts of a page which contain information. Every part lies on the line of its marker,
+# except for the name (on the line after the heading) and the dissertation title (two lines after its marker).
+# Uses only '</a> and ' to find the number of descendants and not '>students</a> and '
+# because 'students' can change to 'student' !
+MARKERS = [('name', 'h2 style='),
+		   ('year', '#006633; margin-left: 0.5em">'),
+		   ('title', 'thesisTitle'),
+		   ('advisors', '<p style="text-align: center; line-height: 2.75ex">'),
+		   ('student', '<td><a href="id.php?id='),
+		   ('count', 'According to our current on-line database'),
+		   ('noStudents', 'No students known.'),
+		   ('end', 'If you have additional information or')]
+
+ADVISOR_LINK = re.compile(r'a href="id\.php\?id=(\d+)"')
+
+# Row of the table of students behind the marker: ID, name, school, year and number of descendants
+STUDENT_ROW = re.compile(r'(\d+)">(.*?)</a></td><td[^>]*>(.*?)</td><td[^>]*>(.*?)</td><td[^>]*>(.*?)</td>')
+
+
+class IDNotFoundError(ValueError):
+	"""
+	Raised if the Math Genealogy Project has no record with the requested ID.
+	"""
+	pass
+
 
 
 class Grabber:
@@ -33,9 +72,22 @@ class Grabber:
 	Class for grabbing and parsing mathematician information from
 	Math Genealogy Project.
 	"""
-	def __init__(self, id):
+	# Shared by all Grabbers to avoid the risk of being blocked.
+	# Two requests per second correspond to the former break of 0.5s per Grabber.
+	rateLimiter = rateLimit.TokenBucket(2.0)
+
+	# Shared by all Grabbers to keep the connections to the Math Genealogy Project alive.
+	session = httpSession.HTTPSession()
+
+	# Grabbed pages are only stored if a pageCache.PageCache is set.
+	cache = None
+
+	# Shared by all network calls, so that the circuit breaker pauses every worker.
+	retryPolicy = retry.RetryPolicy()
+
+	def __init__(self, id, pagestr=None):
 		self.id = id
-		self.pagestr = None
+		self.pagestr = pagestr
 		self.name = None
 		self.numberOfDescendants = None
 		self.institution = []
@@ -43,9 +95,7 @@ class Grabber:
 		self.dissertation = []
 		self.advisors = []
 		self.descendants = set()
-
-		# Break to avoid the risk of being blocked.
-		time.sleep(0.5)
+		self.studentInfo = {}
 
 
 	@staticmethod
@@ -53,28 +103,38 @@ class Grabber:
 		"""
 		Removes HTML or XML character references and entities from a text string.
 		"""
-		p = HTMLParser.HTMLParser()
-		s = p.unescape(s)
+		if '&' not in s:
+			return s
 
-		return s
+		return UNESCAPER.unescape(s)
 
 
 	def getPage(self):
 		"""
 		Grab the page for self.id from the Math Genealogy Project.
+		Use the cached page instead if it isn't stale.
 		"""
-		try:
-			url = 'http://genealogy.math.ndsu.nodak.edu/id.php?id=' + str(self.id)
-			page = urllib2.urlopen(url)
-			self.pagestr = page.read()
-			self.pagestr = self.pagestr.decode('utf-8')
-
-		except urllib2.URLError:
-			print(u"URLError: Try to get page again.".encode('utf-8'))
-			self.getPage()
+		if self.cache is not None:
+			self.pagestr = self.cache.get(self.id)
+
+			if self.pagestr is not None:
+				return
 
+		self.pagestr = self.retryPolicy.call(self.fetchPage)
 
-	def extractNodeInformation(self):
+		# Pages of IDs which don't exist are never cached
+		if self.cache is not None and NOT_FOUND not in self.pagestr:
+			self.cache.put(self.id, self.pagestr)
+
+
+	def fetchPage(self):
+		self.rateLimiter.acquire()
+		url = BASE_URL + 'id.php?id=' + str(self.id)
+
+		return self.session.request(url).decode('utf-8')
+
+
+	def extractNodeInformation(self, notFoundRetries=15):
 		"""
 		For the mathematician in this object, extract the list of
 		advisor ids, the mathematician name, the mathematician
@@ -84,24 +144,140 @@ class Grabber:
 		Year stores a text and not an integer as several years per
 		dissertation are possible.
 		"""
-		self.getPage()
+		self.fetch(notFoundRetries)
+		self.parse()
+
+		return [self.name, self.institution, self.year, self.advisors, self.descendants,
+				self.dissertation, self.numberOfDescendants]
+
+
+	def fetch(self, notFoundRetries=15):
+		"""
+		Grab the page unless it is already set (e.g., if it is parsed offline).
+		The Math Genealogy Project sometimes claims that an existing ID doesn't exist.
+		Hence, such a page is grabbed again up to notFoundRetries times (every 5s).
+		"""
+		if self.pagestr is None:
+			self.getPage()
 
 		errorCounter = 0
 
-		# Split the page string at newline characters.
-		psarray = self.pagestr.split('\n')
+		# The message is always in the first line of the page
+		while NOT_FOUND in self.pagestr.split('\n', 1)[0]:
+			if errorCounter == notFoundRetries:
+				# Then a bad URL (e.g., a bad record id) was given. Throw an exception.
+				msg = "Invalid page address for id %d" % (self.id)
+				raise IDNotFoundError(msg)
 
-		while 'You have specified an ID that does not exist in the database' in psarray[0]:
 			errorCounter += 1
 			time.sleep(5)
 			self.getPage()
-			psarray = self.pagestr.split('\n')
 
-			if errorCounter == 15:
-				# Then a bad URL (e.g., a bad record id) was given. Throw an exception.
-				msg = "Invalid page address for id %d" % (self.id)
-				raise ValueError(msg)
 
+	def parse(self):
+		"""
+		Extract the information of self.pagestr in a single pass.
+		The page is never split into lines. For every marker, the position of its next
+		occurrence is known. The parser handles the nearest marker, moves behind the
+		line(s) it used and only searches again for markers it has passed.
+		"""
+		page = self.pagestr
+		nextMarker = [[page.find(marker), kind, marker] for kind, marker in MARKERS]
+		pos = 0
+
+		while True:
+			nextMarker = [entry for entry in nextMarker if entry[0] > -1]
+
+			if len(nextMarker) == 0:
+				break
+
+			start, kind, marker = min(nextMarker)
+			start += len(marker)
+			end = page.find('\n', start)
+
+			if end < 0:
+				end = len(page)
+
+			line = page[start:end]
+
+			if kind == 'name':
+				# The name is on the next line
+				start = end + 1
+				end = page.find('\n', start)
+				end = len(page) if end < 0 else end
+				self.name = self.unescape(page[start:end].split('</h2>')[0].strip())
+
+			elif kind == 'year':
+				inst_year = line.split('</span>')[:2]
+				institution = self.unescape(inst_year[0].strip())
+				year = self.unescape(inst_year[1].strip())
+				self.institution.append(institution if len(institution) > 0 else None)
+				self.year.append(year if len(year) > 0 else None)
+
+			elif kind == 'title':
+				# The title is two lines further down
+				for i in range(2):
+					start = end + 1
+					end = page.find('\n', start)
+					end = len(page) if end < 0 else end
+
+				title = self.unescape(page[start:end].split('</span></div>')[0].strip())
+				self.dissertation.append(title if len(title) > 0 else None)
+
+			elif kind == 'advisors':
+				advisorIDs = ADVISOR_LINK.findall(line)
+
+				# Mark next set of advisors
+				if len(self.institution) > 1 and len(advisorIDs) > 0:
+					self.advisors.append(0)
+
+				self.advisors.extend(int(advisorID) for advisorID in advisorIDs)
+
+			elif kind == 'student':
+				student = int(line.split('">', 1)[0])
+				self.descendants.add(student)
+				self.parseStudentRow(student, line)
+
+			elif kind == 'count':
+				self.numberOfDescendants = int(line.split('</a> and ')[1].split(' <a href=')[0])
+
+			elif kind == 'noStudents':
+				self.numberOfDescendants = 0
+
+			else:
+				break
+
+			# Continue behind the used line(s) and search again for the markers we passed
+			pos = end
+
+			for entry in nextMarker:
+				if entry[0] < pos:
+					entry[0] = page.find(entry[2], pos)
+
+
+	def parseStudentRow(self, student, line):
+		"""
+		Store name, school, year and number of descendants of a student as shown in the
+		table of students in self.studentInfo. Nothing is stored if the row is incomplete.
+		"""
+		match = STUDENT_ROW.match(line)
+
+		if match is None:
+			return
+
+		name, school, year, descendants = [self.unescape(cell.strip()) for cell in match.groups()[1:]]
+
+		if len(name) == 0 or not (descendants.isdigit() or len(descendants) == 0):
+			return
+
+		self.studentInfo[student] = [name, school if len(school) > 0 else None, year if len(year) > 0 else None,
+									 int(descendants) if len(descendants) > 0 else 0]
+
+
+	# Former parser which looks at every line several times.
+	# Only used to compare results and speed with parse() in 'benchmark.py parse'.
+	def parseLines(self):
+		psarray = self.pagestr.split('\n')
 		lines = iter(psarray)
 
 		for line in lines:
@@ -160,6 +336,3 @@ class Grabber:
 
 			if 'If you have additional information or' in line:
 				break
-
-		return [self.name, self.institution, self.year, self.advisors, self.descendants,
-				self.dissertation, self.numberOfDescendants]
\ No newline at end of file
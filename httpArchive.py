@@ -0,0 +1,178 @@
+# Copyright (c) 2011 Julian Wintermayr
+# 
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+import sqlite3
+import threading
+import urllib2
+import urlparse
+import zlib
+import time
+
+
+
+def requestKey(url, data):
+	"""
+	Return the key of a request: its path with query and its POST data. The host isn't part of it,
+	so that an archive of the Mathematics Genealogy Project can be replayed from another address.
+	"""
+	parts = urlparse.urlsplit(url)
+	path = parts.path or "/"
+
+	if parts.query:
+		path += "?" + parts.query
+
+	return path, data if data is not None else ""
+
+
+
+class HTTPArchive:
+	"""
+	Class for an archive file of HTTP requests and their responses.
+	Responses are compressed. A request which is recorded again replaces the former response.
+	"""
+	def __init__(self, path):
+		self.path = path
+		self.lock = threading.Lock()
+
+		# The archive is shared by the threads of a concurrent crawl. The lock serializes the access.
+		self.connection = sqlite3.connect(path, check_same_thread=False)
+		self.connection.text_factory = str
+		self.cursor = self.connection.cursor()
+
+		self.cursor.execute("CREATE TABLE IF NOT EXISTS exchange (\
+							path TEXT, \
+							data TEXT, \
+							response BLOB, \
+							recorded REAL, \
+							PRIMARY KEY (path, data) ON CONFLICT REPLACE)")
+		self.connection.commit()
+
+
+	def __len__(self):
+		with self.lock:
+			self.cursor.execute("SELECT COUNT(*) FROM exchange")
+
+			return self.cursor.fetchone()[0]
+
+
+	def record(self, url, data, body):
+		path, data = requestKey(url, data)
+
+		with self.lock:
+			self.cursor.execute("INSERT INTO exchange VALUES (?, ?, ?, ?)",
+								(path, data, sqlite3.Binary(zlib.compress(body, 6)), time.time()))
+			self.connection.commit()
+
+
+	def lookup(self, url, data=None):
+		"""
+		Return the recorded response body of the request or None if it wasn't recorded.
+		"""
+		path, data = requestKey(url, data)
+
+		with self.lock:
+			self.cursor.execute("SELECT response FROM exchange WHERE path=? AND data=?", (path, data))
+			row = self.cursor.fetchone()
+
+		return zlib.decompress(str(row[0])) if row is not None else None
+
+
+	def requests(self):
+		"""
+		Return all recorded requests as (path, data) tuples.
+		"""
+		with self.lock:
+			self.cursor.execute("SELECT path, data FROM exchange ORDER BY recorded")
+
+			return self.cursor.fetchall()
+
+
+	def close(self):
+		with self.lock:
+			self.connection.close()
+
+
+
+class RecordingSession:
+	"""
+	Wrapper of a httpSession.HTTPSession which stores every successful response in an HTTPArchive.
+	"""
+	def __init__(self, session, archive):
+		self.session = session
+		self.archive = archive
+
+
+	def request(self, url, data=None, redirects=5):
+		body = self.session.request(url, data, redirects)
+		self.archive.record(url, data, body)
+
+		return body
+
+
+	def close(self):
+		self.session.close()
+
+
+	def statistics(self):
+		return self.session.statistics() + u"  Recorded: {}".format(len(self.archive))
+
+
+
+class ReplaySession:
+	"""
+	Replacement of a httpSession.HTTPSession which answers with the responses of an HTTPArchive
+	instead of sending requests. 'latency' seconds are added to every answer. Requests which
+	weren't recorded fail with '404 Not Found'.
+	"""
+	def __init__(self, archive, latency=0.0):
+		self.archive = archive
+		self.latency = latency
+		self.requests = 0
+		self.missing = 0
+		self.lock = threading.Lock()
+
+
+	def request(self, url, data=None, redirects=5):
+		with self.lock:
+			self.requests += 1
+
+		if self.latency > 0:
+			time.sleep(self.latency)
+
+		body = self.archive.lookup(url, data)
+
+		if body is None:
+			with self.lock:
+				self.missing += 1
+
+			raise urllib2.HTTPError(url, 404, "Not recorded", None, None)
+
+		return body
+
+
+	def close(self):
+		pass
+
+
+	def statistics(self):
+		return u"Replayed requests: {}  Not recorded: {}".format(self.requests, self.missing)
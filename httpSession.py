@@ -0,0 +1,195 @@
+# Copyright (c) 2011 Julian Wintermayr
+# 
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import httplib
+import urllib2
+import urlparse
+import socket
+import threading
+import zlib
+
+
+
+class StaleConnectionError(urllib2.URLError):
+	"""
+	Raised if a reused connection was closed by the server in the meantime. The request
+	can be sent again at once, the next attempt uses a new connection.
+	"""
+	pass
+
+
+
+class HTTPConnection(httplib.HTTPConnection):
+	"""
+	Connection without Nagle's algorithm, as headers and body of a request are sent separately.
+	"""
+	def connect(self):
+		httplib.HTTPConnection.connect(self)
+		self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+
+class HTTPSConnection(httplib.HTTPSConnection):
+	def connect(self):
+		httplib.HTTPSConnection.connect(self)
+		self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+
+class HTTPSession:
+	"""
+	Class for sending HTTP requests over persistent connections.
+	Idle connections are kept in a pool per host and reused by the next request,
+	so a crawl doesn't pay a new TCP connect and DNS lookup for every record.
+	Responses may be gzip compressed. Errors are raised as urllib2.URLError.
+	"""
+	def __init__(self, timeout=30, maxIdle=16):
+		self.timeout = timeout
+		self.maxIdle = maxIdle
+		self.idle = {}
+		self.lock = threading.Lock()
+
+		# Statistics
+		self.requests = 0
+		self.connections = 0
+		self.reused = 0
+
+
+	def getConnection(self, scheme, host):
+		with self.lock:
+			pool = self.idle.get((scheme, host), [])
+
+			if len(pool) > 0:
+				self.reused += 1
+				return pool.pop(), True
+
+			self.connections += 1
+
+		if scheme == "https":
+			return HTTPSConnection(host, timeout=self.timeout), False
+
+		return HTTPConnection(host, timeout=self.timeout), False
+
+
+	def releaseConnection(self, scheme, host, connection):
+		with self.lock:
+			pool = self.idle.setdefault((scheme, host), [])
+
+			if len(pool) < self.maxIdle:
+				pool.append(connection)
+				return
+
+		connection.close()
+
+
+	def dropIdle(self, scheme, host):
+		"""
+		Close the idle connections to a host, e.g. because one of them was closed by the server.
+		"""
+		with self.lock:
+			pool = self.idle.pop((scheme, host), [])
+
+		for connection in pool:
+			connection.close()
+
+
+	def close(self):
+		with self.lock:
+			for pool in self.idle.values():
+				for connection in pool:
+					connection.close()
+
+			self.idle = {}
+
+
+	def request(self, url, data=None, redirects=5):
+		"""
+		Send a GET request (or a POST request if data is given) and return the
+		body of the response as byte string. If a reused connection fails,
+		StaleConnectionError is raised, so that the RetryPolicy counts the retry.
+		"""
+		parts = urlparse.urlsplit(url)
+		path = parts.path or "/"
+
+		if parts.query:
+			path += "?" + parts.query
+
+		headers = {"Accept-Encoding": "gzip", "Connection": "keep-alive", "User-Agent": "math-genealogy-db"}
+
+		if data is not None:
+			headers["Content-Type"] = "application/x-www-form-urlencoded"
+
+		with self.lock:
+			self.requests += 1
+
+		connection, reused = self.getConnection(parts.scheme, parts.netloc)
+
+		try:
+			connection.request("POST" if data is not None else "GET", path, data, headers)
+			response = connection.getresponse()
+			body = response.read()
+
+		except (httplib.HTTPException, socket.error) as e:
+			connection.close()
+
+			# A reused connection may have been closed by the server in the meantime.
+			# Then the other idle connections are most likely closed as well.
+			if reused:
+				self.dropIdle(parts.scheme, parts.netloc)
+				raise StaleConnectionError(e)
+
+			raise urllib2.URLError(e)
+
+		if response.getheader("connection", "").lower() == "close" or response.version < 11:
+			connection.close()
+
+		else:
+			self.releaseConnection(parts.scheme, parts.netloc, connection)
+
+		if response.status in (301, 302, 303, 307) and redirects > 0:
+			location = urlparse.urljoin(url, response.getheader("location", ""))
+
+			return self.request(location, data if response.status == 307 else None, redirects - 1)
+
+		if response.status >= 400:
+			raise urllib2.HTTPError(url, response.status, response.reason, response.msg, None)
+
+		if response.getheader("content-encoding", "").lower() == "gzip":
+			try:
+				body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+
+			except zlib.error as e:
+				raise urllib2.URLError(e)
+
+		return body
+
+
+	def reuseRate(self):
+		if self.requests == 0:
+			return 0.0
+
+		return float(self.reused) / self.requests
+
+
+	def statistics(self):
+		return u"HTTP requests: {}  Connections: {}  Reused: {:.1%}"\
+			   .format(self.requests, self.connections, self.reuseRate())
@@ -0,0 +1,136 @@
+# Copyright (c) 2011 Julian Wintermayr
+# 
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+import multiprocessing
+import tarfile
+import zipfile
+import os
+import re
+import grab
+
+
+# Saved pages are named <ID>.html, but names like 'id.php?id=<ID>' are understood as well
+PAGE_NAME = re.compile(r'(\d+)(\.html?)?$')
+
+
+
+def pageID(name):
+	match = PAGE_NAME.search(os.path.basename(name))
+
+	return int(match.group(1)) if match is not None else None
+
+
+def savedPages(path):
+	"""
+	Yield (ID, page) for every saved id.php page in the folder, zip or tar archive 'path'.
+	Pages are byte strings, so that the processes of the pool decode them.
+	"""
+	if os.path.isdir(path):
+		for root, folders, files in os.walk(path):
+			for filename in sorted(files):
+				id = pageID(filename)
+
+				if id is not None:
+					with open(os.path.join(root, filename), "rb") as pageFile:
+						yield id, pageFile.read()
+
+	elif zipfile.is_zipfile(path):
+		archive = zipfile.ZipFile(path)
+
+		for name in archive.namelist():
+			id = pageID(name)
+
+			if id is not None:
+				yield id, archive.read(name)
+
+		archive.close()
+
+	elif tarfile.is_tarfile(path):
+		# Stream the archive instead of reading its index first
+		archive = tarfile.open(path, "r|*")
+
+		for member in archive:
+			id = pageID(member.name)
+
+			if member.isfile() and id is not None:
+				yield id, archive.extractfile(member).read()
+
+		archive.close()
+
+	else:
+		raise IOError("%s is neither a folder nor a zip or tar archive" % (path))
+
+
+def parsePage(task):
+	"""
+	Parse one page in a process of the pool. Return (ID, record, error), where record is
+	the list of Grabber.extractNodeInformation or None if the page can't be parsed.
+	"""
+	id, page = task
+
+	if isinstance(page, str):
+		page = page.decode("utf-8")
+
+	try:
+		record = grab.Grabber(id, page).extractNodeInformation(0)
+
+	except grab.IDNotFoundError:
+		return id, None, "ID doesn't exist"
+
+	except (IndexError, ValueError) as e:
+		return id, None, "incomplete page ({})".format(e)
+
+	# Files which aren't id.php pages don't contain any marker
+	if record[0] is None:
+		return id, None, "no record on this page"
+
+	return id, record, None
+
+
+def parsePages(pages, processes=1, chunkSize=64):
+	"""
+	Parse the (ID, page) tuples of the iterable 'pages' and yield (ID, record, error) in any order.
+	The pages are parsed by a pool of 'processes' processes, as parsing needs the CPU and not the
+	network. The pool gets the pages in chunks while they are read, so that all pages never have
+	to fit into memory.
+	"""
+	if processes == 1:
+		for task in pages:
+			yield parsePage(task)
+
+		return
+
+	pool = multiprocessing.Pool(processes)
+
+	try:
+		for result in pool.imap_unordered(parsePage, pages, chunkSize):
+			yield result
+
+		pool.close()
+
+	except:
+		pool.terminate()
+		raise
+
+	finally:
+		pool.join()
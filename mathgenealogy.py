@@ -23,8 +23,16 @@
 
 from optparse import OptionParser
 import string
+import os
+import sys
+import time
 import update
+import grab
+import pageCache
+import httpArchive
 import search
+import commonAncestor
+import generationDepth
 import databaseConnection
 import intervalEncoding
 import intervalQuery
@@ -45,11 +53,32 @@ class Mathgenealogy:
 		self.ancestors = False
 		self.descendants = False
 		self.lca = False
+		self.commonAncestors = False
+		self.relationship = False
+		self.upOnly = False
+		self.bitsets = False
 		self.ie = False
 		self.pk = False
 		self.aa = False
 		self.ad = False
+		self.singleQuery = False
+		self.generations = False
+		self.ancestryTable = False
+		self.depthTable = False
+		self.within = None
+		self.stream = False
+		self.batch = None
 		self.web = False
+		self.jobs = 1
+		self.rate = 2.0
+		self.flushSize = 200
+		self.flushInterval = 5.0
+		self.cache = None
+		self.maxAge = 7.0
+		self.maxCacheSize = None
+		self.offline = False
+		self.mirror = False
+		self.shardSize = 1000
 		self.writeFilename = None
 		self.noDetails = False
 		self.database = ""
@@ -78,11 +107,20 @@ class Mathgenealogy:
 							   mathematician. Besides, the tool will also update the records of all found \
 							   mathematicians. INPUT: last name of one mathematician")
 
+		self.parser.add_option("-l", "--local-search", action="store_true", dest="localSearch", default=False,
+							   help="Search the name in the local database instead of the Mathematics Genealogy \
+							   Project. Words may be abbreviated and accents don't matter. Works only together \
+							   with '-n'")
+
+		self.parser.add_option("--online-fallback", action="store_true", dest="onlineFallback", default=False,
+							   help="Search online if the local database has no mathematician with that name. \
+							   Works only together with '-l'")
+
 		self.parser.add_option("-f", "--force", action="store_true", dest="forceNaive", default=False,
 							   help="Force the tool to use naive update logic, which downloads all records of every \
 							   mathematician you want to update without comparing the online number of descendants \
 							   with the stored local one and stores every entry in the local database (replaces \
-							   existing ones). Only available for update methods, not for search methods!")
+							   existing ones, even if their fingerprint shows that they haven't changed). Only available for update methods, not for search methods!")
 
 		self.parser.add_option("-a", "--with-ancestors", action="store_true", dest="ancestors", default=False,
 							   help="Retrieve ancestors of IDs and include in graph. Only available for update-by-ID!")
@@ -90,6 +128,86 @@ class Mathgenealogy:
 		self.parser.add_option("-d", "--with-descendants", action="store_true", dest="descendants", default=False,
 							   help="Retrieve descendants of IDs and include in graph. Only available for update-by-ID!")
 
+		self.parser.add_option("-H", "--harvest-students", action="store_true", dest="harvestStudents", default=False,
+							   help="Store students without descendants as shown on the page of their advisor \
+							   instead of grabbing their own pages. Their dissertation titles stay unknown. \
+							   Works only together with '-i' and '-d'")
+
+		self.parser.add_option("-j", "--jobs", action="store", type="int", dest="jobs", default=1,
+							   help="Number of records which are grabbed at the same time. Number of processes \
+							   which parse the pages of offline updates or search a batch of LCA. Only available \
+							   for update-by-ID, mirror, offline updates and batches of LCA! [default: %default]")
+
+		self.parser.add_option("--parse-jobs", action="store", type="int", dest="parseJobs", metavar="N", default=1,
+							   help="Number of threads which parse the grabbed pages while the jobs grab the next \
+							   ones. Only available for update-by-ID and mirror! [default: %default]")
+
+		self.parser.add_option("-r", "--rate", action="store", type="float", dest="rate", default=2.0,
+							   help="Maximum number of requests per second sent to the Mathematics Genealogy \
+							   Project, shared by all jobs. Only available for update methods! [default: %default]")
+
+		self.parser.add_option("--retries", action="store", type="int", dest="retries", metavar="N", default=7,
+							   help="Maximum number of retries of a failed request. The wait between two retries \
+							   doubles every time. Only available for update methods! [default: %default]")
+
+		self.parser.add_option("--flush-size", action="store", type="int", dest="flushSize", metavar="N", default=200,
+							   help="Number of records which are written to the local database in one \
+							   transaction. Only available for update methods! [default: %default]")
+
+		self.parser.add_option("--flush-interval", action="store", type="float", dest="flushInterval",
+							   metavar="SECONDS", default=5.0,
+							   help="Maximum time between two transactions of an update. Only available for \
+							   update methods! [default: %default]")
+
+		self.parser.add_option("-c", "--cache", action="store", type="string", dest="cache", metavar="DIR",
+							   default=None,
+							   help="Store every grabbed page compressed in this folder and use the stored page \
+							   instead of grabbing it again as long as it isn't older than the maximum age. Only \
+							   available for update methods!")
+
+		self.parser.add_option("--max-age", action="store", type="float", dest="maxAge", metavar="DAYS",
+							   default=7.0,
+							   help="Maximum age of a cached page before it has to be grabbed again. Works only \
+							   together with '-c' [default: %default]")
+
+		self.parser.add_option("--max-cache-size", action="store", type="float", dest="maxCacheSize",
+							   metavar="MB", default=None,
+							   help="Delete the oldest cached pages if the cache grows beyond this size. Works \
+							   only together with '-c' [default: unlimited]")
+
+		self.parser.add_option("-o", "--offline", action="store_true", dest="offline", default=False,
+							   help="Update method: Parse the cached pages of the entered ID(s) again and update \
+							   the local database without online access. Parse all cached pages if no ID is \
+							   entered. Works only together with '-c'. INPUT: none or ID(s)")
+
+		self.parser.add_option("-I", "--ingest", action="store", type="string", dest="ingest", metavar="PATH",
+							   default=None,
+							   help="Update method: Parse the saved id.php pages (<ID>.html) of a folder or a zip or \
+							   tar archive and update the local database without online access. INPUT: none")
+
+		self.parser.add_option("-M", "--mirror", action="store_true", dest="mirror", default=False,
+							   help="Update method: Grab every ID of a range and store all existing records in \
+							   the local database. An interrupted mirror continues where it stopped. INPUT: last ID \
+							   or first and last ID")
+
+		self.parser.add_option("--shard-size", action="store", type="int", dest="shardSize", metavar="N",
+							   default=1000,
+							   help="Number of consecutive IDs per shard of a mirror. Every job grabs another \
+							   shard. Works only together with '-M' [default: %default]")
+
+		self.parser.add_option("--record", action="store", type="string", dest="record", metavar="FILE", default=None,
+							   help="Store every request to the Mathematics Genealogy Project and its answer in this \
+							   archive file. Only available for update methods!")
+
+		self.parser.add_option("--replay", action="store", type="string", dest="replay", metavar="FILE", default=None,
+							   help="Answer every request with the answer stored in this archive file (see '--record') \
+							   instead of asking the Mathematics Genealogy Project. Only available for update methods!")
+
+		self.parser.add_option("--replay-latency", action="store", type="float", dest="replayLatency",
+							   metavar="SECONDS", default=0.0,
+							   help="Latency added to every replayed answer. Works only together with '--replay' \
+							   [default: %default]")
+
 		self.parser.add_option("-w", "--web-front-end", action="store_true", dest="web",
 		                       default=False, help="Don't use! Needed for web front-end")
 
@@ -98,6 +216,24 @@ class Mathgenealogy:
 							   help="Search method: Search for the lowest common advisor of an arbitrary number of \
 							   mathematicians. INPUT: IDs of the mathematicians separated by spaces")
 
+		self.parser.add_option("-K", "--common-ancestors", action="store_true", dest="commonAncestors", default=False,
+							   help="Search method: Search for all common ancestors of an arbitrary number of \
+							   mathematicians, ranked by their height (the length of the longest path from a \
+							   mathematician without advisors). INPUT: IDs of the mathematicians separated by spaces")
+
+		self.parser.add_option("-R", "--relationship", action="store_true", dest="relationship", default=False,
+							   help="Search method: Search for the shortest path between two mathematicians in which \
+							   every mathematician is an advisor or a student of the one before. INPUT: IDs of two \
+							   mathematicians separated by a space")
+
+		self.parser.add_option("--up-only", action="store_true", dest="upOnly", default=False,
+							   help="Only search for paths which lead up to a common ancestor and down again. Works \
+							   only together with '-R'")
+
+		self.parser.add_option("-X", "--bitsets", action="store_true", dest="bitsets", default=False,
+							   help="Intersect the ancestor sets as bitsets. Faster for many IDs with shared \
+							   ancestors. Works only together with '-L'")
+
 		self.parser.add_option("-A", "--all-ancestors", action="store_true", dest="aa", default=False,
 							   help="Search method: Search for all ancestors of one mathematician. INPUT: ID of one \
 							   mathematician")
@@ -106,6 +242,39 @@ class Mathgenealogy:
 							   help="Search method: Search for all descendants of one mathematician. INPUT: ID of one \
 							   mathematician")
 
+		self.parser.add_option("-Q", "--single-query", action="store_true", dest="singleQuery", default=False,
+							   help="Search with one recursive query instead of loading all advisors into memory first. \
+							   Faster for single searches in large databases. Works only together with '-A' or '-D'")
+
+		self.parser.add_option("-S", "--stream", action="store_true", dest="stream", default=False,
+							   help="Write every ancestor or descendant as soon as it is found instead of creating a \
+							   DOT-file. Every line contains 'ancestor' or 'descendant', the ID and the generation, \
+							   separated by tabs. Works only together with '-A' or '-D'")
+
+		self.parser.add_option("-C", "--ancestry-table", action="store_true", dest="ancestryTable", default=False,
+							   help="Look the ancestors and descendants up in the table of all ancestors. The table \
+							   is built first if it is empty. Updates keep it up to date once it is built. Works \
+							   only together with '-A', '-D', '-L' or '-K'")
+
+		self.parser.add_option("-E", "--depth-table", action="store_true", dest="depthTable", default=False,
+							   help="Skip mathematicians of different components and prune the LCA search with the \
+							   table of generation depths. The table is built first if it is empty. Updates keep it \
+							   up to date once it is built. Works only together with '-L', '-R' or '-B'")
+
+		self.parser.add_option("-k", "--within", action="store", type="int", dest="within", metavar="N",
+							   default=None,
+							   help="Only search for the ancestors or descendants up to N generations away. Works \
+							   only together with '-A' or '-D'")
+
+		self.parser.add_option("-B", "--batch-lca", action="store", type="string", dest="batch", metavar="FILE",
+							   default=None,
+							   help="Search method: Search for the LCA of every line of IDs in FILE ('-' for stdin) \
+							   and write the results as JSON lines. INPUT: none")
+
+		self.parser.add_option("-G", "--generations", action="store_true", dest="generations", default=False,
+							   help="Print the generation of every ancestor or descendant. Works only together with \
+							   '-A' or '-D'")
+
 		self.parser.add_option("-T", "--use-interval-encoding", action="store_true", dest="ie", default=False,
 							   help="Use interval encoding to compute the LSCA. Works only together with '-L'")
 
@@ -132,15 +301,45 @@ class Mathgenealogy:
 
 		self.updateByID = options.updateByID
 		self.updateByName = options.updateByName
+		self.localSearch = options.localSearch
+		self.onlineFallback = options.onlineFallback
 		self.forceNaive = options.forceNaive
 		self.ancestors = options.ancestors
 		self.descendants = options.descendants
 		self.lca = options.lca
+		self.commonAncestors = options.commonAncestors
+		self.relationship = options.relationship
+		self.upOnly = options.upOnly
+		self.bitsets = options.bitsets
 		self.ie = options.ie
 		self.pk = options.pk
 		self.aa = options.aa
 		self.ad = options.ad
+		self.singleQuery = options.singleQuery
+		self.generations = options.generations
+		self.ancestryTable = options.ancestryTable
+		self.depthTable = options.depthTable
+		self.within = options.within
+		self.stream = options.stream
+		self.batch = options.batch
 		self.web = options.web
+		self.harvestStudents = options.harvestStudents
+		self.jobs = options.jobs
+		self.parseJobs = options.parseJobs
+		self.rate = options.rate
+		self.retries = options.retries
+		self.flushSize = options.flushSize
+		self.flushInterval = options.flushInterval
+		self.cache = options.cache
+		self.maxAge = options.maxAge
+		self.maxCacheSize = options.maxCacheSize
+		self.offline = options.offline
+		self.ingest = options.ingest
+		self.mirror = options.mirror
+		self.record = options.record
+		self.replay = options.replay
+		self.replayLatency = options.replayLatency
+		self.shardSize = options.shardSize
 		self.writeFilename = options.filename
 		self.noDetails = options.noDetails
 		self.database = options.database
@@ -149,25 +348,133 @@ class Mathgenealogy:
 			print(u"Math-Genealogy-DB Version 1.0".encode('utf-8'))
 			self.parser.exit()
 
-		# Check for no arguments
-		if len(args) == 0:
+		# Check for no arguments (offline updates may parse all cached pages)
+		if len(args) == 0 and not (self.offline or self.ingest or self.batch is not None):
 			raise SyntaxError("%s: error: no IDs or no last name passed" % (self.parser.get_prog_name()))
 
 		# Check for the correct combination of options
 		if (self.updateByName or self.updateByID or self.forceNaive or self.ancestors or self.descendants) and\
-		   (self.lca or self.aa or self.ad or (self.writeFilename is not None)):
+		   (self.lca or self.commonAncestors or self.relationship or self.aa or self.ad or
+			(self.writeFilename is not None)):
 			raise SyntaxError("%s: error: invalid combination of options" % (self.parser.get_prog_name()))
 
 		if self.updateByName and (self.ancestors or self.descendants):
 			raise SyntaxError("%s: error: invalid combination of options" % (self.parser.get_prog_name()))
 
+		if (self.localSearch and not self.updateByName) or (self.onlineFallback and not self.localSearch):
+			raise SyntaxError("%s: error: invalid combination of options" % (self.parser.get_prog_name()))
+
 		if self.updateByName and self.updateByID:
 			raise SyntaxError("%s: error: you can only choose one update method" % (self.parser.get_prog_name()))
 
+		if self.offline and (self.updateByName or self.updateByID or self.lca or self.commonAncestors or
+							 self.relationship or self.aa or self.ad):
+			raise SyntaxError("%s: error: you can only choose one update method" % (self.parser.get_prog_name()))
+
+		if self.mirror and (self.updateByName or self.updateByID or self.offline or self.lca or self.commonAncestors or
+							self.relationship or self.aa or self.ad):
+			raise SyntaxError("%s: error: you can only choose one update method" % (self.parser.get_prog_name()))
+
+		if self.ingest and (self.updateByName or self.updateByID or self.offline or self.mirror or self.lca or
+							self.commonAncestors or self.relationship or self.aa or self.ad):
+			raise SyntaxError("%s: error: you can only choose one update method" % (self.parser.get_prog_name()))
+
+		if self.ingest and (self.ancestors or self.descendants or len(args) > 0):
+			raise SyntaxError("%s: error: invalid combination of options" % (self.parser.get_prog_name()))
+
+		if self.mirror and (self.ancestors or self.descendants):
+			raise SyntaxError("%s: error: invalid combination of options" % (self.parser.get_prog_name()))
+
+		if self.offline and (self.ancestors or self.descendants):
+			raise SyntaxError("%s: error: invalid combination of options" % (self.parser.get_prog_name()))
+
+		if self.offline and self.cache is None:
+			raise SyntaxError("%s: error: offline updates need a cache" % (self.parser.get_prog_name()))
+
+		if self.cache is not None and (self.lca or self.commonAncestors or self.relationship or self.aa or self.ad or
+									   self.batch is not None):
+			raise SyntaxError("%s: error: invalid combination of options" % (self.parser.get_prog_name()))
+
+		if (self.record is not None or self.replay is not None) and not (self.updateByName or self.updateByID or self.mirror):
+			raise SyntaxError("%s: error: invalid combination of options" % (self.parser.get_prog_name()))
+
+		if self.record is not None and self.replay is not None:
+			raise SyntaxError("%s: error: you can either record or replay" % (self.parser.get_prog_name()))
+
+		if self.replay is not None and not os.path.isfile(self.replay):
+			raise SyntaxError("%s: error: there is no archive %s" % (self.parser.get_prog_name(), self.replay))
+
+		if self.flushSize < 1:
+			raise SyntaxError("%s: error: the flush size has to be at least 1" % (self.parser.get_prog_name()))
+
+		if self.harvestStudents and not (self.updateByID and self.descendants):
+			raise SyntaxError("%s: error: invalid combination of options" % (self.parser.get_prog_name()))
+
+		if self.retries < 0:
+			raise SyntaxError("%s: error: the number of retries can't be negative" % (self.parser.get_prog_name()))
+
+		if self.jobs < 1:
+			raise SyntaxError("%s: error: the number of jobs has to be at least 1" % (self.parser.get_prog_name()))
+
+		if self.parseJobs < 1:
+			raise SyntaxError("%s: error: the number of parse jobs has to be at least 1" % (self.parser.get_prog_name()))
+
+		if self.shardSize < 1:
+			raise SyntaxError("%s: error: the shard size has to be at least 1" % (self.parser.get_prog_name()))
+
+		if self.jobs > 1 and not (self.updateByID or self.mirror or self.offline or self.ingest or self.batch is not None):
+			raise SyntaxError("%s: error: invalid combination of options" % (self.parser.get_prog_name()))
+
+		if self.parseJobs > 1 and not (self.updateByID or self.mirror):
+			raise SyntaxError("%s: error: invalid combination of options" % (self.parser.get_prog_name()))
+
 		if self.lca and (self.aa or self.ad):
 			raise SyntaxError("%s: error: you can only choose one search method" % (self.parser.get_prog_name()))
 
-		if not (self.updateByName or self.updateByID or self.lca or self.aa or self.ad):
+		if self.commonAncestors and (self.lca or self.aa or self.ad):
+			raise SyntaxError("%s: error: you can only choose one search method" % (self.parser.get_prog_name()))
+
+		if self.relationship and (self.lca or self.commonAncestors or self.aa or self.ad):
+			raise SyntaxError("%s: error: you can only choose one search method" % (self.parser.get_prog_name()))
+
+		if self.upOnly and not self.relationship:
+			raise SyntaxError("%s: error: invalid combination of options" % (self.parser.get_prog_name()))
+
+		if self.bitsets and (not self.lca or self.ie):
+			raise SyntaxError("%s: error: invalid combination of options" % (self.parser.get_prog_name()))
+
+		if (self.singleQuery or self.generations or self.stream) and not (self.aa or self.ad):
+			raise SyntaxError("%s: error: invalid combination of options" % (self.parser.get_prog_name()))
+
+		if self.stream and self.generations:
+			raise SyntaxError("%s: error: invalid combination of options" % (self.parser.get_prog_name()))
+
+		if self.depthTable and (not (self.lca or self.relationship or self.batch is not None) or self.bitsets or self.ie):
+			raise SyntaxError("%s: error: invalid combination of options" % (self.parser.get_prog_name()))
+
+		if self.within is not None and not (self.aa or self.ad):
+			raise SyntaxError("%s: error: invalid combination of options" % (self.parser.get_prog_name()))
+
+		if self.within is not None and self.within < 0:
+			raise SyntaxError("%s: error: the number of generations has to be at least 0" % (self.parser.get_prog_name()))
+
+		if (self.ancestryTable and not (self.aa or self.ad or self.lca or self.commonAncestors)) or (self.ancestryTable and self.singleQuery):
+			raise SyntaxError("%s: error: invalid combination of options" % (self.parser.get_prog_name()))
+
+		if self.batch is not None and (self.updateByName or self.updateByID or self.offline or self.ingest or
+									   self.mirror or self.lca or self.commonAncestors or self.relationship or self.aa or
+									   self.ad):
+			raise SyntaxError("%s: error: you can only choose one update method or one search method"
+			% (self.parser.get_prog_name()))
+
+		if self.batch is not None and (len(args) > 0 or self.writeFilename is not None or self.ie):
+			raise SyntaxError("%s: error: invalid combination of options" % (self.parser.get_prog_name()))
+
+		if self.batch not in [None, "-"] and not os.path.isfile(self.batch):
+			raise SyntaxError("%s: error: there is no file %s" % (self.parser.get_prog_name(), self.batch))
+
+		if not (self.updateByName or self.updateByID or self.offline or self.ingest or self.mirror or self.lca or
+				self.commonAncestors or self.relationship or self.aa or self.ad or self.batch is not None):
 			raise SyntaxError("%s: error: you have to choose one update method or one search method"
 			% (self.parser.get_prog_name()))
 
@@ -191,11 +498,20 @@ class Mathgenealogy:
 			if len(args) < 1:
 				raise SyntaxError("%s: error: you have to enter at least one ID" % (self.parser.get_prog_name()))
 
-		if self.lca:
+		if self.mirror:
+			if len(args) > 2 or int(args[0]) > int(args[-1]):
+				raise SyntaxError("%s: error: enter the last ID or the first and the last ID"
+				% (self.parser.get_prog_name()))
+
+		if self.lca or self.commonAncestors:
 			if len(args) < 2:
 				raise SyntaxError("%s: error: you have to enter at least two IDs to execute this search method"
 				% (self.parser.get_prog_name()))
 
+		if self.relationship:
+			if len(args) != 2:
+				raise SyntaxError("%s: error: enter exactly two IDs" % (self.parser.get_prog_name()))
+
 		# If no error occurred, then the options and arguments are correct. Hence, we can continue:
 		# Read the arguments
 		if self.updateByName:
@@ -208,15 +524,62 @@ class Mathgenealogy:
 		databaseConnector = databaseConnection.DatabaseConnector()
 		connector = databaseConnector.connectToSQLite(self.database)
 
+		grab.Grabber.rateLimiter.setRate(self.rate)
+		grab.Grabber.retryPolicy.attempts = self.retries + 1
+
+		if self.cache is not None:
+			maxCacheSize = None
+
+			if self.maxCacheSize is not None:
+				maxCacheSize = int(self.maxCacheSize * 1024 * 1024)
+
+			grab.Grabber.cache = pageCache.PageCache(self.cache, self.maxAge * 24 * 3600, maxCacheSize)
+
+		archive = None
+
+		if self.record is not None:
+			archive = httpArchive.HTTPArchive(self.record)
+			grab.Grabber.session = httpArchive.RecordingSession(grab.Grabber.session, archive)
+
+		if self.replay is not None:
+			archive = httpArchive.HTTPArchive(self.replay)
+			grab.Grabber.session = httpArchive.ReplaySession(archive, self.replayLatency)
+
 		# Call the correct function depending on the options which have been passed
 		if self.updateByName:
-			updater = update.Updater(connector, self.forceNaive, self.web)
-			updater.findID(self.passedName)
+			updater = update.Updater(connector, self.forceNaive, self.web, 1, self.flushSize, self.flushInterval)
+			updater.findID(self.passedName, self.localSearch, self.onlineFallback)
 
 		if self.updateByID:
-			updater = update.Updater(connector, self.forceNaive, self.web)
+			updater = update.Updater(connector, self.forceNaive, self.web, self.jobs, self.flushSize, self.flushInterval,
+									 self.parseJobs)
+			updater.harvestStudents = self.harvestStudents
 			updater.updateByID(self.passedIDs, self.ancestors, self.descendants)
 
+		if self.mirror:
+			first = 1 if len(self.passedIDs) == 1 else self.passedIDs[0]
+			updater = update.Updater(connector, self.forceNaive, self.web, self.jobs, self.flushSize, self.flushInterval,
+									 self.parseJobs)
+			updater.mirror(first, self.passedIDs[-1], self.shardSize)
+
+		if self.offline:
+			updater = update.Updater(connector, self.forceNaive, self.web, self.jobs, self.flushSize, self.flushInterval)
+			updater.updateFromCache(self.passedIDs)
+
+		if self.ingest:
+			updater = update.Updater(connector, self.forceNaive, self.web, self.jobs, self.flushSize, self.flushInterval)
+			updater.updateFromPages(self.ingest)
+
+		# A local search without fallback never goes online
+		if (self.updateByName or self.updateByID or self.mirror) and not self.web and \
+		   not (self.localSearch and not self.onlineFallback):
+			print(grab.Grabber.session.statistics().encode('utf-8'))
+			print(grab.Grabber.retryPolicy.statistics().encode('utf-8'))
+			print(u"Unchanged records: {}".format(updater.unchanged).encode('utf-8'))
+
+			if self.harvestStudents:
+				print(u"Records harvested from advisor pages: {}".format(updater.harvested).encode('utf-8'))
+
 		if self.lca:
 			if self.ie:    # BL: ... using interval encoding
 				if self.pk:  # BL: ... pk = true means: create pickle file
@@ -227,22 +590,64 @@ class Mathgenealogy:
 				searcher.LCA(self.passedIDs)
 
 			else:
-				searcher = search.Searcher(connector, self.writeFilename, self.noDetails)
+				searcher = search.Searcher(connector, self.writeFilename, self.noDetails,
+										   "ancestry" if self.ancestryTable else "memory", bitsets=self.bitsets,
+										   depthTable=self.depthTable)
 				searcher.lca(self.passedIDs)
 
+		if self.commonAncestors:
+			searcher = search.Searcher(connector, self.writeFilename, self.noDetails,
+									   "ancestry" if self.ancestryTable else "memory")
+			searcher.commonAncestors(self.passedIDs)
+
+		if self.relationship:
+			searcher = search.Searcher(connector, self.writeFilename, self.noDetails, depthTable=self.depthTable)
+			searcher.relationship(self.passedIDs, self.upOnly)
+
+		if self.batch is not None:
+			queries = sys.stdin if self.batch == "-" else open(self.batch)
+
+			# The workers only read the table
+			if self.depthTable:
+				depths = generationDepth.DepthTable(connector)
+
+				if depths.isEmpty():
+					sys.stderr.write(u"Stored the depths of {} mathematicians\n".format(depths.build()).encode('utf-8'))
+					connector[0].commit()
+
+			start = time.time()
+			number = commonAncestor.batchLCA(self.database, queries, self.jobs, depthTable=self.depthTable)
+			seconds = max(time.time() - start, 1e-6)
+
+			# Stdout only gets the JSON lines
+			sys.stderr.write(u"Searched the LCA of {} queries in {:.2f}s: {:.1f} queries/s\n"
+							 .format(number, seconds, number / seconds).encode('utf-8'))
+
+		backend = "query" if self.singleQuery else "ancestry" if self.ancestryTable else "memory"
+
 		if self.aa and not self.ad:
-			searcher = search.Searcher(connector, self.writeFilename, self.noDetails)
+			searcher = search.Searcher(connector, self.writeFilename, self.noDetails, backend, self.generations,
+									   self.stream, within=self.within)
 			searcher.allAncestors(self.passedIDs)
 
 		if self.ad and not self.aa:
-			searcher = search.Searcher(connector, self.writeFilename, self.noDetails)
+			searcher = search.Searcher(connector, self.writeFilename, self.noDetails, backend, self.generations,
+									   self.stream, within=self.within)
 			searcher.allDescendants(self.passedIDs)
 
 		if self.aa and self.ad:
-			searcher = search.Searcher(connector, self.writeFilename, self.noDetails)
+			searcher = search.Searcher(connector, self.writeFilename, self.noDetails, backend, self.generations,
+									   self.stream, within=self.within)
 			searcher.allAncestorsDescendants(self.passedIDs)
 
 
+		if grab.Grabber.cache is not None:
+			grab.Grabber.cache.close()
+
+		if archive is not None:
+			grab.Grabber.session.close()
+			archive.close()
+
 		connection = connector[0]
 		cursor = connector[1]
 
@@ -0,0 +1,204 @@
+# Copyright (c) 2011 Julian Wintermayr
+# 
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import sqlite3
+import hashlib
+import threading
+import zlib
+import time
+import os
+
+
+
+class PageCache:
+	"""
+	Class for storing grabbed pages on disk.
+	Pages are compressed and stored once per content (named by their SHA-1 hash).
+	An index maps every ID to the hash of its latest page and the time it was fetched.
+	Pages older than maxAge seconds are stale and have to be fetched again.
+	If the cache grows beyond maxSize bytes, the pages fetched first are evicted.
+	"""
+	def __init__(self, path, maxAge=None, maxSize=None):
+		self.path = path
+		self.maxAge = maxAge
+		self.maxSize = maxSize
+		self.lock = threading.Lock()
+
+		if not os.path.isdir(os.path.join(path, "objects")):
+			os.makedirs(os.path.join(path, "objects"))
+
+		# The cache is shared by the threads of a concurrent crawl. The lock serializes the access.
+		self.connection = sqlite3.connect(os.path.join(path, "index.sqlite"), check_same_thread=False)
+		self.cursor = self.connection.cursor()
+
+		self.cursor.execute("CREATE TABLE IF NOT EXISTS page (\
+							pID INTEGER PRIMARY KEY ON CONFLICT REPLACE, \
+							hash CHAR(40), \
+							fetched REAL, \
+							size INTEGER)")
+
+		self.cursor.execute("CREATE INDEX IF NOT EXISTS pageFetched ON page (fetched)")
+		self.connection.commit()
+
+		# The size of the cache is the size of all pages which an ID refers to. put() and evict()
+		# delete the pages which no ID refers to any more and keep the sum up to date.
+		self.cursor.execute("SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT hash, size FROM page)")
+		self.size = self.cursor.fetchone()[0]
+
+
+	def objectPath(self, hash):
+		return os.path.join(self.path, "objects", hash[:2], hash[2:])
+
+
+	def get(self, id, maxAge=None):
+		"""
+		Return the cached page of the ID or None if there is no page or if it is stale.
+		"""
+		if maxAge is None:
+			maxAge = self.maxAge
+
+		with self.lock:
+			self.cursor.execute("SELECT hash, fetched FROM page WHERE pID=?", (id,))
+			row = self.cursor.fetchone()
+
+		if row is None:
+			return None
+
+		if maxAge is not None and time.time() - row[1] > maxAge:
+			return None
+
+		try:
+			with open(self.objectPath(row[0]), "rb") as pageFile:
+				return zlib.decompress(pageFile.read()).decode("utf-8")
+
+		except (IOError, zlib.error):
+			return None
+
+
+	def put(self, id, page):
+		"""
+		Store the page of the ID. If the content didn't change since the last fetch,
+		only the time of the fetch is updated. Otherwise the former page of the ID is
+		deleted unless another ID has the same content.
+		"""
+		data = page.encode("utf-8")
+		hash = hashlib.sha1(data).hexdigest()
+		path = self.objectPath(hash)
+
+		with self.lock:
+			if not os.path.exists(path):
+				if not os.path.isdir(os.path.dirname(path)):
+					os.makedirs(os.path.dirname(path))
+
+				compressed = zlib.compress(data, 9)
+
+				# Write to a temporary file first, so that an interrupted crawl leaves no broken pages
+				with open(path + ".tmp", "wb") as pageFile:
+					pageFile.write(compressed)
+
+				os.rename(path + ".tmp", path)
+				size = len(compressed)
+
+			else:
+				size = os.path.getsize(path)
+
+			self.cursor.execute("SELECT hash, size FROM page WHERE pID=?", (id,))
+			former = self.cursor.fetchone()
+
+			if not self.isReferenced(hash):
+				self.size += size
+
+			self.cursor.execute("INSERT INTO page VALUES (?, ?, ?, ?)", (id, hash, time.time(), size))
+
+			if former is not None and former[0] != hash:
+				self.release(former[0], former[1])
+
+			self.connection.commit()
+
+			if self.maxSize is not None and self.size > self.maxSize:
+				self.evict()
+
+
+	def discard(self, id, page):
+		"""
+		Delete the page of the ID if it is the given page (e.g., because it can't be parsed).
+		"""
+		hash = hashlib.sha1(page.encode("utf-8")).hexdigest()
+
+		with self.lock:
+			self.cursor.execute("SELECT size FROM page WHERE pID=? AND hash=?", (id, hash))
+			row = self.cursor.fetchone()
+
+			if row is not None:
+				self.cursor.execute("DELETE FROM page WHERE pID=?", (id,))
+				self.release(hash, row[0])
+				self.connection.commit()
+
+
+	def evict(self):
+		"""
+		Delete the oldest pages until the cache uses 90% of maxSize.
+		Must be called with the lock held.
+		"""
+		self.cursor.execute("SELECT pID, hash, size FROM page ORDER BY fetched")
+		oldest = self.cursor.fetchall()
+
+		for id, hash, size in oldest:
+			if self.size <= 0.9 * self.maxSize:
+				break
+
+			self.cursor.execute("DELETE FROM page WHERE pID=?", (id,))
+			self.release(hash, size)
+
+		self.connection.commit()
+
+
+	def isReferenced(self, hash):
+		self.cursor.execute("SELECT 1 FROM page WHERE hash=? LIMIT 1", (hash,))
+
+		return self.cursor.fetchone() is not None
+
+
+	def release(self, hash, size):
+		"""
+		Delete the page with the hash if no ID refers to it any more (other IDs may have the same
+		content). Must be called with the lock held.
+		"""
+		if self.isReferenced(hash):
+			return
+
+		self.size -= size
+
+		if os.path.exists(self.objectPath(hash)):
+			os.remove(self.objectPath(hash))
+
+
+	def ids(self):
+		with self.lock:
+			self.cursor.execute("SELECT pID FROM page ORDER BY pID")
+			return [row[0] for row in self.cursor.fetchall()]
+
+
+	def close(self):
+		with self.lock:
+			self.cursor.close()
+			self.connection.close()
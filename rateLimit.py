@@ -0,0 +1,73 @@
+# Copyright (c) 2011 Julian Wintermayr
+# 
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import threading
+import time
+
+
+
+class TokenBucket:
+	"""
+	Thread-safe token bucket to limit the number of requests per second.
+	One bucket is shared by all Grabbers, so the limit holds for the whole
+	crawl no matter how many fetches are in flight.
+	"""
+	def __init__(self, rate, burst=1):
+		self.rate = float(rate)
+		self.burst = float(burst)
+		self.tokens = self.burst
+		self.last = time.time()
+		self.lock = threading.Lock()
+
+
+	def setRate(self, rate, burst=None):
+		with self.lock:
+			self.rate = float(rate)
+
+			if burst is not None:
+				self.burst = float(burst)
+
+			self.tokens = min(self.tokens, self.burst)
+
+
+	def acquire(self):
+		"""
+		Take one token out of the bucket. Block until a token is available.
+		A rate of 0 or less disables the limit.
+		"""
+		while True:
+			with self.lock:
+				if self.rate <= 0:
+					return
+
+				now = time.time()
+				self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+				self.last = now
+
+				if self.tokens >= 1:
+					self.tokens -= 1
+					return
+
+				wait = (1 - self.tokens) / self.rate
+
+			# Sleep outside of the lock so that other threads can refill in the meantime
+			time.sleep(wait)
@@ -0,0 +1,101 @@
+# Copyright (c) 2011 Julian Wintermayr
+# 
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+
+def shortestPath(source, target, advisorsOf, studentsOf, upwards=False):
+	"""
+	Return the shortest list of mathematicians from source to target in which every mathematician
+	is an advisor or a student of the one before (None if there is none). If upwards, both ends only
+	go up to advisors: the path leads from source up to a common ancestor and down to target.
+	The search is a breadth-first search from both ends which always expands the smaller frontier
+	by one generation. In both directions, the first generation in which the searches meet contains
+	a shortest path. Upwards, a path can't be split in its middle: the searches go on until every
+	common ancestor they haven't found yet is too far away.
+	"""
+	if source == target:
+		return [source]
+
+	if upwards:
+		neighboursOf = advisorsOf
+
+	else:
+		neighboursOf = lambda id: list(advisorsOf(id)) + list(studentsOf(id))
+
+	# Person found by each search -> (person before, distance from the end of the search)
+	found = [{source: (None, 0)}, {target: (None, 0)}]
+	frontiers = [[source], [target]]
+	levels = [0, 0]
+	best = None
+
+	while len(frontiers[0]) > 0 or len(frontiers[1]) > 0:
+		searching = [side for side in (0, 1) if len(frontiers[side]) > 0]
+
+		# Both ends of a path in both directions have to be searched
+		if not upwards and len(searching) < 2:
+			break
+
+		# A common ancestor which isn't found yet is farther than the next generation of a search
+		if best is not None and best[0] <= min(levels[side] + 1 for side in searching):
+			break
+
+		side = min(searching, key=lambda side: len(frontiers[side]))
+		own, other = found[side], found[1 - side]
+		following = []
+
+		for person in frontiers[side]:
+			distance = own[person][1] + 1
+
+			for neighbour in neighboursOf(person):
+				if neighbour in own:
+					continue
+
+				own[neighbour] = (person, distance)
+				following.append(neighbour)
+
+				if neighbour in other and (best is None or distance + other[neighbour][1] < best[0]):
+					best = (distance + other[neighbour][1], neighbour)
+
+		frontiers[side] = following
+		levels[side] += 1
+
+		if best is not None and not upwards:
+			break
+
+	if best is None:
+		return None
+
+	return pathVia(best[1], found[0]) + pathVia(best[1], found[1])[-2::-1]
+
+
+def pathVia(person, found):
+	"""
+	Return the list of mathematicians from the end of a search to person.
+	"""
+	path = []
+
+	while person is not None:
+		path.append(person)
+		person = found[person][0]
+
+	path.reverse()
+	return path
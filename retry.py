@@ -0,0 +1,201 @@
+# Copyright (c) 2011 Julian Wintermayr
+# 
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+import urllib2
+import threading
+import random
+import time
+import httpSession
+
+
+
+class CircuitBreaker:
+	"""
+	Thread-safe circuit breaker shared by all network calls. After 'threshold'
+	failures in a row the circuit opens and every call waits for 'cooldown'
+	seconds. Then one call may try again: a success closes the circuit, a failure
+	opens it for another cooldown.
+	"""
+	def __init__(self, threshold=5, cooldown=30.0):
+		self.threshold = threshold
+		self.cooldown = cooldown
+		self.failures = 0
+		self.openUntil = 0.0
+		self.trial = False
+		self.opened = 0
+		self.lock = threading.Lock()
+
+
+	def wait(self):
+		"""
+		Block while the circuit is open.
+		"""
+		while True:
+			with self.lock:
+				now = time.time()
+
+				if self.failures < self.threshold:
+					return
+
+				if now >= self.openUntil and not self.trial:
+					# Half open: only this call tries the server
+					self.trial = True
+					return
+
+				wait = max(self.openUntil - now, 0.1)
+
+			time.sleep(wait)
+
+
+	def success(self):
+		with self.lock:
+			self.failures = 0
+			self.trial = False
+
+
+	def failure(self):
+		with self.lock:
+			self.failures += 1
+			self.trial = False
+
+			if self.failures >= self.threshold:
+				if time.time() >= self.openUntil:
+					self.opened += 1
+
+				self.openUntil = time.time() + self.cooldown
+
+
+
+class RetryPolicy:
+	"""
+	Retry network calls with exponential backoff and full jitter: the n-th retry
+	waits a random time between 0 and min(cap, base * 2**n) seconds.
+	Errors are classified as 'server' (the server answered 5xx, 408 or 429),
+	'network' (connection failed, timed out or was reset), 'stale' (a reused
+	keep-alive connection was closed by the server) or 'parse' (the page was
+	incomplete). Other errors are raised at once. Server, network and stale errors
+	count for the circuit breaker. Stale connections are retried at once and don't
+	use up an attempt.
+	"""
+	def __init__(self, attempts=8, base=0.5, cap=30.0, breaker=None):
+		self.attempts = attempts
+		self.base = base
+		self.cap = cap
+		self.breaker = breaker if breaker is not None else CircuitBreaker()
+		self.retries = {"server": 0, "network": 0, "stale": 0, "parse": 0}
+		self.failed = 0
+		self.lock = threading.Lock()
+
+
+	@staticmethod
+	def classify(error):
+		if isinstance(error, urllib2.HTTPError):
+			if error.code >= 500 or error.code in (408, 429):
+				return "server"
+
+			return None
+
+		if isinstance(error, httpSession.StaleConnectionError):
+			return "stale"
+
+		if isinstance(error, urllib2.URLError):
+			return "network"
+
+		if isinstance(error, IndexError):
+			return "parse"
+
+		return None
+
+
+	def delay(self, retry, error):
+		"""
+		Return the time to wait before the given retry (starting at 0).
+		A numeric Retry-After header of the server is used as lower bound.
+		"""
+		delay = random.uniform(0, min(self.cap, self.base * 2 ** retry))
+
+		if isinstance(error, urllib2.HTTPError) and error.hdrs is not None:
+			retryAfter = error.hdrs.getheader("retry-after", "")
+
+			if retryAfter.isdigit():
+				delay = max(delay, min(self.cap, float(retryAfter)))
+
+		return delay
+
+
+	def call(self, function, args=(), retryOn=("server", "network", "stale", "parse")):
+		"""
+		Call function(*args) and return its result. Retry errors whose class is in
+		'retryOn'. The last error is raised if every attempt failed.
+		"""
+		retry = 0
+
+		while True:
+			self.breaker.wait()
+
+			try:
+				result = function(*args)
+
+			except Exception as e:
+				kind = self.classify(e)
+
+				# The server answered if the page was incomplete or the error is final
+				if kind in ("server", "network", "stale"):
+					self.breaker.failure()
+
+				else:
+					self.breaker.success()
+
+				if kind not in retryOn:
+					raise
+
+				# The session dropped its idle connections, so that the next attempt uses a new one
+				if kind == "stale":
+					with self.lock:
+						self.retries[kind] += 1
+
+					continue
+
+				if retry + 1 >= self.attempts:
+					with self.lock:
+						self.failed += 1
+
+					raise
+
+				with self.lock:
+					self.retries[kind] += 1
+
+				print(u"{}: Try again ({}/{})".format(type(e).__name__, retry + 1, self.attempts - 1).encode('utf-8'))
+				time.sleep(self.delay(retry, e))
+				retry += 1
+				continue
+
+			self.breaker.success()
+
+			return result
+
+
+	def statistics(self):
+		return u"Retries: {}  (server: {}  network: {}  stale connection: {}  parse: {})  Given up: {}  Circuit opened: {}"\
+			   .format(sum(self.retries.values()), self.retries["server"], self.retries["network"], self.retries["stale"],
+					   self.retries["parse"], self.failed, self.breaker.opened)
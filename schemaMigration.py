@@ -0,0 +1,206 @@
+# Copyright (c) 2011 Julian Wintermayr
+# 
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+"""
+Versioned schema of the local database. The table 'schemaVersion' stores every migration
+applied to a database. Opening a database applies all missing migrations in order, so that
+files of former versions of the tool are upgraded in place. Databases created before the
+table existed start at version 0. Hence, every migration has to work on databases which
+already contain parts of it.
+"""
+
+
+import sqlite3
+
+
+
+def createBaseTables(cursor):
+	cursor.execute("CREATE TABLE IF NOT EXISTS person (\
+					pID INTEGER PRIMARY KEY ON CONFLICT REPLACE, \
+					name VARCHAR(255), \
+					onlineDescendants INTEGER)")
+
+	cursor.execute("CREATE TABLE IF NOT EXISTS dissertation (\
+					dID INTEGER PRIMARY KEY ON CONFLICT REPLACE AUTOINCREMENT, \
+					author INTEGER REFERENCES person ON DELETE SET NULL ON UPDATE CASCADE, \
+					title TEXT, \
+					university TEXT, \
+					year VARCHAR(255))")
+
+	cursor.execute("CREATE TABLE IF NOT EXISTS advised (\
+					student INTEGER REFERENCES dissertation ON DELETE CASCADE ON UPDATE CASCADE, \
+					advisorOrder INTEGER CHECK (advisorOrder > 0), \
+					advisor INTEGER REFERENCES person ON DELETE CASCADE ON UPDATE CASCADE, \
+					PRIMARY KEY (student, advisor) ON CONFLICT REPLACE)")
+
+	cursor.execute("CREATE TRIGGER IF NOT EXISTS delPerson AFTER DELETE ON dissertation FOR EACH ROW \
+					BEGIN \
+						DELETE FROM person WHERE OLD.author = pID; \
+					END")
+
+
+def createCrawlTables(cursor):
+	# IDs of an update-by-ID which are still to be grabbed (grabbed=0) or already grabbed (grabbed=1)
+	cursor.execute("CREATE TABLE IF NOT EXISTS frontier (\
+					pID INTEGER, \
+					direction VARCHAR(16), \
+					grabbed INTEGER DEFAULT 0, \
+					PRIMARY KEY (pID, direction) ON CONFLICT IGNORE)")
+
+	# Shards of a mirror with the first ID which hasn't been grabbed yet (next > last if the shard is done)
+	cursor.execute("CREATE TABLE IF NOT EXISTS mirrorShard (\
+					first INTEGER PRIMARY KEY ON CONFLICT IGNORE, \
+					last INTEGER, \
+					next INTEGER, \
+					missing INTEGER DEFAULT 0)")
+
+
+def addFingerprint(cursor):
+	# The fingerprint 'harvested' marks records taken from the table of students of their advisor
+	cursor.execute("PRAGMA table_info(person)")
+
+	if "fingerprint" not in [row["name"] for row in cursor.fetchall()]:
+		cursor.execute("ALTER TABLE person ADD COLUMN fingerprint CHAR(40)")
+
+
+def createDescendantCount(cursor):
+	# Number of descendants of every mathematician in the local database
+	cursor.execute("CREATE TABLE IF NOT EXISTS descendantCount (\
+					pID INTEGER PRIMARY KEY ON CONFLICT REPLACE, \
+					number INTEGER)")
+
+
+def createNameIndex(cursor):
+	# Full-text index of the names. The tokenizer ignores case and diacritics.
+	cursor.execute("SELECT 1 FROM sqlite_master WHERE name='personName'")
+	indexNames = cursor.fetchone() is None
+
+	cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS personName USING fts4(name, tokenize=unicode61)")
+
+	cursor.execute("CREATE TRIGGER IF NOT EXISTS insPersonName AFTER INSERT ON person FOR EACH ROW \
+					BEGIN \
+						INSERT INTO personName (docid, name) VALUES (NEW.pID, NEW.name); \
+					END")
+
+	cursor.execute("CREATE TRIGGER IF NOT EXISTS delPersonName AFTER DELETE ON person FOR EACH ROW \
+					BEGIN \
+						DELETE FROM personName WHERE docid = OLD.pID; \
+					END")
+
+	cursor.execute("CREATE TRIGGER IF NOT EXISTS updPersonName AFTER UPDATE OF name ON person FOR EACH ROW \
+					BEGIN \
+						UPDATE personName SET name = NEW.name WHERE docid = OLD.pID; \
+					END")
+
+	if indexNames:
+		cursor.execute("INSERT INTO personName (docid, name) SELECT pID, name FROM person")
+
+	# Finds the dissertations of a mathematician without scanning the whole table.
+	# The index covers author -> dID, because dID is the rowid.
+	cursor.execute("CREATE INDEX IF NOT EXISTS dissertationAuthor ON dissertation (author)")
+
+
+def createAdvisorIndex(cursor):
+	# Covers advisor -> student. The primary key of 'advised' already covers student -> advisor.
+	cursor.execute("CREATE INDEX IF NOT EXISTS advisedAdvisor ON advised (advisor, student)")
+	cursor.execute("ANALYZE")
+
+
+def createAncestry(cursor):
+	# Optional table of all pairs of an ancestor and a descendant with the smallest number of degrees between them
+	cursor.execute("CREATE TABLE IF NOT EXISTS ancestry (\
+					ancestor INTEGER, \
+					descendant INTEGER, \
+					minDistance INTEGER, \
+					PRIMARY KEY (descendant, ancestor) ON CONFLICT REPLACE) WITHOUT ROWID")
+
+	cursor.execute("CREATE INDEX IF NOT EXISTS ancestryAncestor ON ancestry (ancestor, descendant, minDistance)")
+
+
+def createGenerationDepth(cursor):
+	# Optional tables of the shortest and the longest path from a mathematician without advisors down to
+	# every mathematician, and of the connected components of the genealogy with their smallest and largest depths
+	cursor.execute("CREATE TABLE IF NOT EXISTS generationDepth (\
+					pID INTEGER PRIMARY KEY ON CONFLICT REPLACE, \
+					component INTEGER, \
+					minDepth INTEGER, \
+					maxDepth INTEGER)")
+
+	cursor.execute("CREATE INDEX IF NOT EXISTS generationDepthComponent ON generationDepth (component)")
+
+	cursor.execute("CREATE TABLE IF NOT EXISTS componentDepth (\
+					component INTEGER PRIMARY KEY ON CONFLICT REPLACE, \
+					size INTEGER, \
+					minDepth INTEGER, \
+					maxDepth INTEGER)")
+
+
+# Never change or reorder applied migrations, only append new ones
+MIGRATIONS = [("Tables person, dissertation and advised", createBaseTables),
+			  ("Tables frontier and mirrorShard", createCrawlTables),
+			  ("Fingerprints of the records", addFingerprint),
+			  ("Table descendantCount", createDescendantCount),
+			  ("Full-text index personName and index dissertationAuthor", createNameIndex),
+			  ("Index advisedAdvisor", createAdvisorIndex),
+			  ("Table ancestry", createAncestry),
+			  ("Tables generationDepth and componentDepth", createGenerationDepth)]
+
+
+
+def schemaVersion(cursor):
+	cursor.execute("SELECT MAX(version) FROM schemaVersion")
+
+	return cursor.fetchone()[0] or 0
+
+
+def migrate(connector):
+	"""
+	Apply all migrations which are missing in the database and return their versions.
+	Every migration is committed on its own. An interrupted migration is applied again
+	the next time the database is opened.
+	"""
+	[connection, cursor] = connector
+
+	cursor.execute("CREATE TABLE IF NOT EXISTS schemaVersion (\
+					version INTEGER PRIMARY KEY, \
+					description TEXT, \
+					applied TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+
+	current = schemaVersion(cursor)
+
+	if current > len(MIGRATIONS):
+		raise sqlite3.DatabaseError("The database has schema version {}, but this version of the tool only knows "
+									"version {}".format(current, len(MIGRATIONS)))
+
+	applied = []
+
+	for version, (description, migration) in enumerate(MIGRATIONS, 1):
+		if version <= current:
+			continue
+
+		migration(cursor)
+		cursor.execute("INSERT INTO schemaVersion (version, description) VALUES (?, ?)", (version, description))
+		connection.commit()
+		applied.append(version)
+
+	return applied
@@ -20,17 +20,45 @@
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 
+import sys
 import visualize
+import genealogyGraph
+import commonAncestor
+import ancestorBitsets
+import relationPath
+import ancestry
+import generationDepth
 
 
+# Recursive queries of the search backend 'query'. The columns are ('advisor', 'author') to follow
+# the advisors and ('author', 'advisor') to follow the students.
+REACHABLE = "WITH RECURSIVE found(pID) AS (SELECT ? UNION SELECT {0} FROM advised, dissertation, found \
+			WHERE student=dID AND {1}=found.pID) SELECT pID FROM found"
+
+# Generations are counted up to MAX_GENERATIONS, so that a cycle in the table 'advised' can't stop the query
+GENERATIONS = "WITH RECURSIVE found(pID, generation) AS (SELECT ?, 0 UNION SELECT {0}, generation + 1 \
+			  FROM advised, dissertation, found WHERE student=dID AND {1}=found.pID AND generation < ?) \
+			  SELECT pID, MIN(generation) AS generation FROM found GROUP BY pID"
+
+MAX_GENERATIONS = 1000
+
 
 class Searcher:
 	"""
-	Class for several search methods.
+	Class for several search methods. The backend 'memory' loads the whole graph of advisors,
+	'query' answers every search with one recursive query, 'ancestry' looks the ancestors and
+	descendants up in the table 'ancestry' and 'node' sends one query per visited node. If within
+	is set, the searches for ancestors and descendants stop after that many generations.
 	"""
-	def __init__(self, connector, filename, details):
+	def __init__(self, connector, filename, details, backend="memory", generations=False, stream=False,
+				 bitsets=False, depthTable=False, within=None):
 		self.filename = filename
 		self.noDetails = details
+		self.backend = backend
+		self.withGenerations = generations
+		self.stream = stream
+		self.bitsets = bitsets
+		self.within = within
 		self.maxPrefix = 0
 		self.lcaMode = False
 
@@ -38,17 +66,42 @@ class Searcher:
 		self.descendantSet = set()
 
 		self.LCAset = set()
-		self.paths = set()
-		self.allLCApaths = set()
 
 		self.connector = connector
 		self.connection = connector[0]
 		self.cursor = connector[1]
 
+		# Without the graph in memory, every visited node costs one query (except for the recursive queries)
+		self.graph = genealogyGraph.GenealogyGraph(connector) if backend == "memory" else None
+		self.ancestry = None
+
+		if backend == "ancestry":
+			self.ancestry = ancestry.AncestryTable(connector)
+
+			# Updates keep the table up to date once it is built
+			if self.ancestry.isEmpty():
+				print(u"Building the table of all ancestors...".encode('utf-8'))
+				rows = self.ancestry.build()
+				self.connection.commit()
+				print(u"Stored {} pairs of an ancestor and a descendant".format(rows).encode('utf-8'))
+
+		self.depths = None
+
+		if depthTable:
+			self.depths = generationDepth.DepthTable(connector)
+
+			if self.depths.isEmpty():
+				print(u"Building the table of generation depths...".encode('utf-8'))
+				rows = self.depths.build()
+				self.connection.commit()
+				print(u"Stored the depths of {} mathematicians".format(rows).encode('utf-8'))
+
+			self.depths.load()
+
 
 	def saveDotFile(self, queryName, rootID, blackSet, redSet=None):
 		# Create DOT-file
-		visualizer = visualize.Visualizer(self.connector, self.noDetails)
+		visualizer = visualize.Visualizer(self.connector, self.noDetails, self.graph)
 		dotFile = visualizer.generateDotFile(blackSet, redSet)
 
 		# Print DOT-file to user defined file
@@ -63,6 +116,9 @@ class Searcher:
 
 
 	def createAdvisorSet(self, id):
+		if self.graph is not None:
+			return set(self.graph.advisors(id))
+
 		# Get all advisors
 		self.cursor.execute("SELECT advisor FROM advised, dissertation WHERE student=dID AND author=?", (id,))
 		queryList = self.cursor.fetchall()
@@ -77,6 +133,9 @@ class Searcher:
 
 
 	def createStudentSet(self, id):
+		if self.graph is not None:
+			return set(self.graph.students(id))
+
 		# Get all students
 		self.cursor.execute("SELECT author FROM advised, dissertation WHERE student=dID AND advisor=?", (id,))
 		queryList = self.cursor.fetchall()
@@ -93,13 +152,12 @@ class Searcher:
 	def allAncestors(self, id):
 		# 'id' is a list containing one item
 		id = id[0]
-		self.ancestorSet.add(id)
 
-		advisors = self.createAdvisorSet(id)
+		if self.stream and not self.lcaMode:
+			self.streamSearch(id, "All-Ancestors", [True])
+			return
 
-		# Start grabbing ancestors recursively
-		if len(advisors) > 0:
-			self.recursiveAncestors(advisors)
+		self.collectAncestors(id)
 
 		# Only create DOT-file if the user only searches for all ancestors and not for the LCA
 		if not self.lcaMode:
@@ -112,6 +170,10 @@ class Searcher:
 				self.ancestorSet.remove(id)
 				print(u"The {} ancestor(s) of {} is/are {}".format(len(self.ancestorSet), id, self.ancestorSet).encode('utf-8'))
 				self.ancestorSet.add(id)
+
+				if self.withGenerations:
+					self.printGenerations(id, True)
+
 				self.saveDotFile("All-Ancestors", id, self.ancestorSet)
 
 		# If searching for the LCA, then store this set
@@ -125,13 +187,12 @@ class Searcher:
 	def allDescendants(self, id):
 		# 'id' is a list containing one item
 		id = id[0]
-		self.descendantSet.add(id)
 
-		students = self.createStudentSet(id)
+		if self.stream and not self.lcaMode:
+			self.streamSearch(id, "All-Descendants", [False])
+			return
 
-		# Start grabbing descendants recursively
-		if len(students) > 0:
-			self.recursiveDescendants(students)
+		self.collectDescendants(id)
 
 		# Only create DOT-file if the user only searches for all descendants and not for the LCA
 		if not self.lcaMode:
@@ -144,6 +205,10 @@ class Searcher:
 				self.descendantSet.remove(id)
 				print(u"The {} descendant(s) of {} is/are {}".format(len(self.descendantSet), id, self.descendantSet).encode('utf-8'))
 				self.descendantSet.add(id)
+
+				if self.withGenerations:
+					self.printGenerations(id, False)
+
 				self.saveDotFile("All-Descendants", id, self.descendantSet)
 
 		# If searching for the LCA, then store this set
@@ -157,20 +222,13 @@ class Searcher:
 	def allAncestorsDescendants(self, id):
 		# 'id' is a list containing one item
 		id = id[0]
-		self.ancestorSet.add(id)
-		self.descendantSet.add(id)
-
-		advisors = self.createAdvisorSet(id)
-
-		# Start grabbing ancestors recursively
-		if len(advisors) > 0:
-			self.recursiveAncestors(advisors)
 
-		students = self.createStudentSet(id)
+		if self.stream:
+			self.streamSearch(id, "All-Ancestors-Descendants", [True, False])
+			return
 
-		# Start grabbing descendants recursively
-		if len(students) > 0:
-			self.recursiveDescendants(students)
+		self.collectAncestors(id)
+		self.collectDescendants(id)
 
 		# If there is only the start node in the set, then there are no ancestors
 		if len(self.ancestorSet) < 2:
@@ -181,6 +239,9 @@ class Searcher:
 			print(u"The {} ancestor(s) of {} is/are {}".format(len(self.ancestorSet), id, self.ancestorSet).encode('utf-8'))
 			self.ancestorSet.add(id)
 
+			if self.withGenerations:
+				self.printGenerations(id, True)
+
 			print(u"".encode('utf-8'))
 
 		# If there is only the start node in the set, then there are no descendants
@@ -192,6 +253,9 @@ class Searcher:
 			print(u"The {} descendant(s) of {} is/are {}".format(len(self.descendantSet), id, self.descendantSet).encode('utf-8'))
 			self.descendantSet.add(id)
 
+			if self.withGenerations:
+				self.printGenerations(id, False)
+
 		# Create DOT-file
 		if len(self.ancestorSet) > 1 or len(self.descendantSet) > 1:
 			AncestorDescendantSet = self.ancestorSet.union(self.descendantSet)
@@ -202,209 +266,341 @@ class Searcher:
 		self.descendantSet = set()
 
 
-	def recursiveAncestors(self, advisors):
-		for advisor in advisors:
-			self.ancestorSet.add(advisor)
+	def collectAncestors(self, id):
+		"""
+		Add id and all its ancestors to self.ancestorSet.
+		"""
+		if self.within is not None:
+			self.ancestorSet.add(id)
+			self.ancestorSet.update(relative for relative, generation in self.iterGenerations(id, True))
+			return
 
-			nextAdvisors = self.createAdvisorSet(advisor)
+		if self.graph is not None:
+			self.ancestorSet.update(self.graph.ancestors(id))
+			return
 
-			if len(nextAdvisors) > 0:
-				self.recursiveAncestors(nextAdvisors.difference(self.ancestorSet))
+		if self.backend == "query":
+			self.ancestorSet.update(self.queryReachable(id, True))
+			return
 
+		if self.ancestry is not None:
+			self.ancestorSet.update(self.ancestry.ancestorSet(id))
+			return
 
-	def recursiveDescendants(self, students):
-		for student in students:
-			self.descendantSet.add(student)
+		self.ancestorSet.add(id)
+		advisors = self.createAdvisorSet(id)
 
-			nextStudents = self.createStudentSet(student)
+		# Start grabbing ancestors recursively
+		if len(advisors) > 0:
+			self.recursiveAncestors(advisors)
 
-			if len(nextStudents) > 0:
-				self.recursiveDescendants(nextStudents.difference(self.descendantSet))
 
+	def collectDescendants(self, id):
+		"""
+		Add id and all its descendants to self.descendantSet.
+		"""
+		if self.within is not None:
+			self.descendantSet.add(id)
+			self.descendantSet.update(relative for relative, generation in self.iterGenerations(id, False))
+			return
 
-	# Used by 'update.py'
-	def numberOfDescendants(self, students):
-		self.recursiveDescendants(students)
+		if self.graph is not None:
+			self.descendantSet.update(self.graph.descendants(id))
+			return
 
-		return len(self.descendantSet)
+		if self.backend == "query":
+			self.descendantSet.update(self.queryReachable(id, False))
+			return
 
+		if self.ancestry is not None:
+			self.descendantSet.add(id)
+			self.descendantSet.update(self.ancestry.descendants(id))
+			return
+
+		self.descendantSet.add(id)
+		students = self.createStudentSet(id)
+
+		# Start grabbing descendants recursively
+		if len(students) > 0:
+			self.recursiveDescendants(students)
 
-	def lca(self, ids):
-		self.lcaMode = True
 
-		id1 = [0, ids[0]]
+	@staticmethod
+	def columns(upwards):
+		return ("advisor", "author") if upwards else ("author", "advisor")
 
-		for i in range(len(ids)-1):
-			if len(id1) < 1:
-				break
+
+	def queryReachable(self, id, upwards):
+		"""
+		Return id and all its ancestors (upwards) or descendants with one recursive query.
+		"""
+		self.cursor.execute(REACHABLE.format(*self.columns(upwards)), (id,))
+
+		return set(row["pID"] for row in self.cursor.fetchall())
+
+
+	def generationsOf(self, id, upwards):
+		"""
+		Return a dictionary of id and all its ancestors (upwards) or descendants with their
+		generation, which is the smallest number of degrees between them and id.
+		"""
+		generations = dict(self.iterGenerations(id, upwards))
+		generations[id] = 0
+
+		return generations
+
+
+	def iterGenerations(self, id, upwards):
+		"""
+		Yield (ID, generation) for every ancestor (upwards) or descendant of id, ordered by generation.
+		The graph in memory yields them while it is searched. The recursive query and the table
+		'ancestry' sort their whole result before the first row. Hence, a stream of these backends
+		walks generation by generation like the backend 'node', so that apart from the visited IDs
+		only the current and the next generation are kept. No backend visits the mathematicians
+		beyond self.within generations.
+		"""
+		if self.graph is not None:
+			for relative in self.graph.generations(id, upwards, self.within):
+				yield relative
+
+			return
+
+		if (self.backend == "query" or self.ancestry is not None) and not self.stream:
+			cursor = self.connection.cursor()
+
+			if self.backend == "query":
+				cursor.execute(GENERATIONS.format(*self.columns(upwards)) + " ORDER BY generation",
+							   (id, min(MAX_GENERATIONS, self.within) if self.within is not None else MAX_GENERATIONS))
 
 			else:
-				id1 = self.recursiveLCA(id1, ids[i+1])
+				cursor.execute("SELECT {}, minDistance FROM ancestry WHERE {}=? AND minDistance <= ? ORDER BY minDistance"
+							   .format(*(("ancestor", "descendant") if upwards else ("descendant", "ancestor"))),
+							   (id, self.within if self.within is not None else MAX_GENERATIONS))
 
-		if len(id1) < 1:
-			print(u"There is no LCA!".encode('utf-8'))
+			for row in cursor:
+				if row[0] != id:
+					yield row[0], row[1]
 
-		else:
-			for id in ids:
-				self.allAncestors([id])
-				self.allDescendants([id])
+			cursor.close()
+			return
 
-			lca = id1
-			redLCAset = set()
+		visited = set([id])
+		current = [id]
+		generation = 0
 
-			for singleLCA in lca:
-				redLCAset.add(singleLCA)
+		while current and generation != self.within:
+			generation += 1
+			following = []
 
-				for path in self.allLCApaths:
-					splitPath = path.split(str(singleLCA) + '.')
+			for relative in self.relativesOf(current, upwards):
+				if relative not in visited:
+					visited.add(relative)
+					following.append(relative)
+					yield relative, generation
 
-					if len(splitPath) > 1 and not splitPath[1] == "":
-						redIDlist = splitPath[1].split('.')
+			current = following
 
-						for redID in redIDlist:
-							try:
-								intID = int(redID)
 
-							except ValueError:
-								continue
+	def relativesOf(self, persons, upwards):
+		"""
+		Return the advisors (upwards) or students of all persons. The backend 'node' sends one
+		query per person, the other backends one query per 500 persons.
+		"""
+		if self.backend == "node":
+			nextGeneration = self.createAdvisorSet if upwards else self.createStudentSet
 
-							redLCAset.add(intID)
+			return [relative for person in persons for relative in nextGeneration(person)]
 
-				self.cursor.execute("SELECT name FROM person WHERE pID=?", (singleLCA,))
-				lcaName = self.cursor.fetchone()
-				print(u"The LCA with {} common ancestors is {}: {}".format(self.maxPrefix, singleLCA, lcaName["name"]).encode('utf-8'))
+		relatives = []
 
-			blackLCAset = self.LCAset.difference(redLCAset)
+		for i in range(0, len(persons), 500):
+			chunk = persons[i:i+500]
+			self.cursor.execute("SELECT {0} FROM advised, dissertation WHERE student=dID AND {1} IN ({2})"
+								.format(*(self.columns(upwards) + (", ".join("?" * len(chunk)),))), chunk)
+			relatives.extend(row[0] for row in self.cursor.fetchall())
 
-			rootIDs = "-"
+		return relatives
 
-			for id in ids:
-				rootIDs += str(id) + "-"
 
-			self.saveDotFile("LCA", rootIDs, blackLCAset, redLCAset)
+	def streamSearch(self, id, queryName, directions):
+		"""
+		Write every ancestor (upwards in directions) and descendant of id as soon as it is found
+		instead of creating a DOT-file. Every line contains the direction, the ID and the
+		generation, separated by tabs.
+		"""
+		if self.filename is not None:
+			filename = self.filename + str(id) + queryName + ".tsv"
+			output = open(filename, "w")
 
-		self.lcaMode = False
+		else:
+			output = sys.stdout
 
+		for upwards in directions:
+			direction = "ancestor" if upwards else "descendant"
+			number = 0
 
-	def recursiveLCA(self, idSet, id2):
-		path2 = self.generatePathOf(id2)
-		lcaPath = set()
-		self.maxPrefix = 0
-		lca = []
+			for relative, generation in self.iterGenerations(id, upwards):
+				output.write("{}\t{}\t{}\n".format(direction, relative, generation))
+				number += 1
 
-		for id1 in idSet:
-			if id1 == 0:
-				continue
+			if self.filename is not None:
+				print(u"Wrote {} {}(s) of {} to {}".format(number, direction, id, filename).encode('utf-8'))
 
-			path1 = self.generatePathOf(id1)
+		if self.filename is not None:
+			output.close()
 
-			for row1 in path1:
-				splitPath1 = row1.split('.')
 
-				for row2 in path2:
-					prefix = 0
-					splitPath2 = row2.split('.')
+	def printGenerations(self, id, upwards):
+		generations = {}
 
-					if len(splitPath1) >= len(splitPath2):
-						longPathIter = iter(splitPath1)
-						shortPathIter = iter(splitPath2)
+		for person, generation in self.generationsOf(id, upwards).items():
+			if generation > 0:
+				generations.setdefault(generation, []).append(person)
 
-					else:
-						longPathIter = iter(splitPath2)
-						shortPathIter = iter(splitPath1)
+		for generation in sorted(generations):
+			print(u"Generation {}: {}".format(generation, sorted(generations[generation])).encode('utf-8'))
 
-					for singlePathID1 in shortPathIter:
-						singlePathID2 = next(longPathIter)
 
-						prefix += 1
+	def recursiveAncestors(self, advisors):
+		for advisor in advisors:
+			self.ancestorSet.add(advisor)
 
-						if singlePathID1 == singlePathID2:
-							if prefix == self.maxPrefix:
-								if int(singlePathID1) not in lca:
-									lca.append(int(singlePathID1))
+			nextAdvisors = self.createAdvisorSet(advisor)
 
-								lcaPath.add(row1)
-								lcaPath.add(row2)
+			if len(nextAdvisors) > 0:
+				self.recursiveAncestors(nextAdvisors.difference(self.ancestorSet))
 
-							if prefix > self.maxPrefix:
-								lca = []
-								lcaPath = set()
 
-								lca.append(int(singlePathID1))
-								lcaPath.add(row1)
-								lcaPath.add(row2)
-								self.maxPrefix = prefix
+	def recursiveDescendants(self, students):
+		for student in students:
+			self.descendantSet.add(student)
 
-						else:
-							break
+			nextStudents = self.createStudentSet(student)
 
-		for row in lcaPath:
-			self.allLCApaths.add(row)
+			if len(nextStudents) > 0:
+				self.recursiveDescendants(nextStudents.difference(self.descendantSet))
 
-		return lca
 
+	# Used by 'update.py'
+	def numberOfDescendants(self, students):
+		self.recursiveDescendants(students)
 
-	def generatePathOf(self, id):
-		print(u"Generating paths of #{}".format(id).encode('utf-8'))
-		nextAdvisors = self.createAdvisorSet(id)
+		return len(self.descendantSet)
 
-		if len(nextAdvisors) > 0:
-			self.recursiveAncestorsPath(nextAdvisors, str(id))
+
+	def relations(self):
+		"""
+		Return the functions which return the advisors and the students of an ID.
+		"""
+		if self.graph is not None:
+			return self.graph.advisors, self.graph.students
+
+		return self.createAdvisorSet, self.createStudentSet
+
+
+	def lcaFinder(self):
+		advisorsOf, studentsOf = self.relations()
+
+		if self.bitsets:
+			return ancestorBitsets.AncestorBitsets(advisorsOf, studentsOf)
+
+		if self.ancestry is not None:
+			return commonAncestor.LCAFinder(advisorsOf, studentsOf, self.ancestry.ancestorSet, self.depths)
+
+		return commonAncestor.LCAFinder(advisorsOf, studentsOf, depths=self.depths)
+
+
+	def lca(self, ids):
+		self.lcaMode = True
+
+		finder = self.lcaFinder()
+		lca, self.maxPrefix = finder.find(ids)
+
+		if len(lca) < 1:
+			print(u"There is no LCA!".encode('utf-8'))
 
 		else:
-			self.paths.add(str(id) + ".")
-			print(str(id) + ".")
+			for id in ids:
+				self.allAncestors([id])
+				self.allDescendants([id])
 
-		allPaths = self.paths
-		self.paths = set()
+			# The LCA and the paths from them to the IDs are red
+			redLCAset = finder.connectingPaths(lca, ids)
 
-		return allPaths
+			for singleLCA in lca:
+				self.cursor.execute("SELECT name FROM person WHERE pID=?", (singleLCA,))
+				lcaName = self.cursor.fetchone()
+				print(u"The LCA with {} common ancestors is {}: {}".format(self.maxPrefix, singleLCA, lcaName["name"]).encode('utf-8'))
+
+			blackLCAset = self.LCAset.difference(redLCAset)
 
+			rootIDs = "-"
+
+			for id in ids:
+				rootIDs += str(id) + "-"
+
+			self.saveDotFile("LCA", rootIDs, blackLCAset, redLCAset)
+
+		self.lcaMode = False
 
-	def recursiveAncestorsPath(self, advisors, treeString):
+
+	def commonAncestors(self, ids):
 		"""
-		Create all ancestors paths for the requested ID.
+		Print all common ancestors of ids (including ids themselves), the deepest first, and create
+		a DOT-file of the ancestors of ids with the common ancestors in red.
 		"""
-		for advisor in advisors:
-			nextAdvisors = self.createAdvisorSet(advisor)
+		bitsets = ancestorBitsets.AncestorBitsets(*self.relations())
+		common = bitsets.commonAncestors(ids)
 
-			treeString = str(advisor) + "." + treeString
+		if len(common) < 1:
+			print(u"There are no common ancestors!".encode('utf-8'))
+			return
 
-			if len(nextAdvisors) > 0:
-				self.recursiveAncestorsPath(nextAdvisors, treeString)
+		print(u"The {} common ancestor(s) ranked by their height are:".format(len(common)).encode('utf-8'))
 
-				# We have to delete the last node from the string because we are following another path now
-				treeString = treeString.split(".", 1)[1]
+		for person, height in common:
+			self.cursor.execute("SELECT name FROM person WHERE pID=?", (person,))
+			row = self.cursor.fetchone()
+			print(u"{:4}  {}: {}".format(height, person, row["name"] if row is not None else None).encode('utf-8'))
 
-			else:
-				# If we reach the highest ancestor, then store this string!
-				self.paths.add(treeString + ".")
-				print(treeString + ".")
+		redSet = set(person for person, height in common)
+		blackSet = set(bitsets.members(bitsets.union(ids))).difference(redSet)
+		rootIDs = "-" + "-".join(str(id) for id in ids) + "-"
 
-				# We have to delete the last node from the string because we are following another path now
-				treeString = treeString.split(".", 1)[1]
+		self.saveDotFile("Common-Ancestors", rootIDs, blackSet, redSet)
 
 
-	# Function not used yet!
-	def recursiveDescendantsPath(self, students, treeString):
+	def relationship(self, ids, upwards=False):
 		"""
-		Create all descendants paths for the requested ID.
+		Print the shortest path between two mathematicians in which every mathematician is an
+		advisor or a student of the one before, and create a DOT-file of it. If upwards, the path
+		leads up to a common ancestor and down again.
 		"""
-		for student in students:
-			nextStudents = self.createStudentSet(student)
+		advisorsOf, studentsOf = self.relations()
+		components = set(self.depths.component(id) for id in ids) if self.depths is not None else set()
+		path = None
 
-			treeString = treeString + "." + str(student)
+		# Mathematicians of different components aren't related at all
+		if None in components or len(components) < 2:
+			path = relationPath.shortestPath(ids[0], ids[1], advisorsOf, studentsOf, upwards)
 
-			if len(nextStudents) > 0:
-				self.recursiveDescendantsPath(nextStudents, treeString)
+		if path is None:
+			print(u"There is no path between {} and {}!".format(ids[0], ids[1]).encode('utf-8'))
+			return
+
+		print(u"The shortest path between {} and {} has {} relation(s):".format(ids[0], ids[1], len(path) - 1)
+			  .encode('utf-8'))
+
+		for i, person in enumerate(path):
+			self.cursor.execute("SELECT name FROM person WHERE pID=?", (person,))
+			row = self.cursor.fetchone()
+			name = row["name"] if row is not None else None
 
-				# We have to delete the last node from the string because we are following another path now
-				treeString = treeString.rsplit(".", 1)[0]
+			if i == 0:
+				print(u"{}: {}".format(person, name).encode('utf-8'))
 
 			else:
-				# If we reach the highest ancestor, then store this string!
-				self.paths.add(treeString + ".")
-				print(treeString + ".")
+				relation = "advisor" if person in advisorsOf(path[i - 1]) else "student"
+				print(u"  {} {}: {}".format(relation, person, name).encode('utf-8'))
 
-				# We have to delete the last node from the string because we are following another path now
-				treeString = treeString.rsplit(".", 1)[0]
\ No newline at end of file
+		self.saveDotFile("Path", "-{}-{}-".format(ids[0], ids[1]), None, set(path))
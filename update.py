@@ -21,9 +21,26 @@
 
 
 import grab
-import urllib2
 import urllib
-import search
+import descendantCount
+import ancestry
+import generationDepth
+import crawl
+import ingest
+import collections
+import hashlib
+import time
+import re
+
+
+# Fingerprint of records which are only known from the table of students of their advisor
+HARVESTED = "harvested"
+
+# Is there a harvested record below an ID? The branch of such records isn't skipped by an update without harvesting.
+HARVESTED_BELOW = "WITH RECURSIVE found(pID) AS (SELECT ? UNION SELECT author FROM advised, dissertation, found \
+				  WHERE student=dID AND advisor=found.pID) SELECT 1 FROM found, person \
+				  WHERE found.pID=person.pID AND fingerprint=? LIMIT 1"
+
 
 
 class Updater:
@@ -32,45 +49,72 @@ class Updater:
 	Update-by-ID and Update-by-name implemented.
 	Can find the corresponding ID to a last name.
 	"""
-	def __init__(self, connector, naive, web):
+	def __init__(self, connector, naive, web, workers=1, flushSize=200, flushInterval=5.0, parsers=1):
 		self.pagestr = None
 		self.foundID = False
 		self.foundIDs = []
 		self.naiveMode = naive
 		self.webMode = web
+		self.workers = workers
+		self.parsers = parsers
+		self.printRecords = True
+
+		# Store students without descendants from the page of their advisor instead of grabbing them
+		self.harvestStudents = False
+		self.studentInfo = {}
+		self.harvested = 0
+
+		# Records which still have to be written to the database
+		self.buffered = collections.OrderedDict()
+		self.uncommitted = 0
+		self.flushSize = flushSize
+		self.flushInterval = flushInterval
+		self.lastFlush = time.time()
 
-		# The Grabber returns only for the students a set and not for the advisors as the advisors need to be
-		# ordererd to separate different advisor sets
-		self.currentAdvisorsGrab = []
-		self.currentStudentsGrab = set()
+		# Number of grabbed records which didn't change
+		self.unchanged = 0
 
 		self.connector = connector
 		self.connection = connector[0]
 		self.cursor = connector[1]
 
+		self.counter = descendantCount.DescendantCounter(connector)
+		self.ancestry = ancestry.AncestryTable(connector)
+		self.depths = generationDepth.DepthTable(connector)
+
 
 	def getSearchPage(self, lastName):
-		try:
-			# Get the raw data of this site. Return an object of class 'http.client.HTTPResponse'
-			page = urllib2.urlopen("http://genealogy.math.ndsu.nodak.edu/query-prep.php",
-									urllib.urlencode({"family_name":lastName}).encode("utf-8"))
+		self.pagestr = grab.Grabber.retryPolicy.call(self.fetchSearchPage, (lastName,))
 
-			# Read the raw data and return an object of class 'bytes' (html-code)
-			self.pagestr = page.read()
 
-			# Convert bytes-string to readable UTF-8 html-code of class 'str'
-			self.pagestr = self.pagestr.decode("utf-8")
+	def fetchSearchPage(self, lastName):
+		# Get the raw data of this site over the connections shared with the Grabber class.
+		# Return an object of class 'bytes' (html-code)
+		grab.Grabber.rateLimiter.acquire()
+		pagestr = grab.Grabber.session.request(grab.BASE_URL + "query-prep.php",
+											   urllib.urlencode({"family_name":lastName}).encode("utf-8"))
 
-		except urllib2.URLError:
-			print(u"URLError: Try to get page again.".encode('utf-8'))
-			self.getSearchPage(lastName)
+		# Convert bytes-string to readable UTF-8 html-code of class 'str'
+		return pagestr.decode("utf-8")
 
 
-	def findID(self, lastName):
+	def findID(self, lastName, local=False, fallback=False):
 		"""
 		Find the corresponding ID of a mathematician listed in the
 		Mathematics Genealogy Project. This ID is needed to run Update-by-ID.
+		If local is set, search the local database instead and search online
+		only if nothing is found there and fallback is set.
 		"""
+		if local:
+			if self.findLocalID(lastName):
+				return
+
+			if not fallback:
+				if not self.webMode:
+					print(u"There is no mathematician with that name in the local database.".encode('utf-8'))
+
+				return
+
 		self.getSearchPage(lastName)
 
 		# Split the page string at newline characters to get single lines.
@@ -120,9 +164,12 @@ class Updater:
 			if self.foundID:
 				# Print every found mathematician and store them in the local database.
 				for id in self.foundIDs:
-					[name, uni, year, advisors, students, dissertation, numberOfDescendants] = self.grabNode(id)
+					record = self.grabNode(id)
+					[name, uni, year, advisors, students, dissertation, numberOfDescendants] = record
 					print(u"ID: {}  Name: {}  University: {}  Year: {}".format(id, name, uni[0], year[0]).encode('utf-8'))
-					self.insertOrUpdate(id, name, uni, year, advisors, dissertation, numberOfDescendants)
+					self.storeRecord(id, record)
+
+				self.flush()
 
 		if not self.foundID:
 			print(u"There is either no mathematician in the online-database with that entered last name or there are too many. \
@@ -130,138 +177,558 @@ class Updater:
 					by using more search options. You can then use the ID of this mathematician to run Update-by-ID.".encode('utf-8'))
 
 
-	def insertOrUpdate(self, id, name, unis, years, advisors, dissertations, numberOfDescendants):
+	def searchNames(self, name):
+		"""
+		Return ID, name, university and year of the first dissertation of every mathematician in the
+		local database whose name contains words beginning with every word of the given name.
+		Case and accents don't matter.
+		"""
+		if isinstance(name, str):
+			name = name.decode("utf-8")
+
+		# Lower case words are never taken as operators of the query
+		words = re.findall(r"\w+", name, re.UNICODE)
+
+		if len(words) == 0:
+			return []
+
+		self.cursor.execute("SELECT pID, person.name AS name, university, year FROM personName, person \
+							LEFT JOIN dissertation ON dID = (SELECT MIN(dID) FROM dissertation WHERE author=pID) \
+							WHERE personName MATCH ? AND pID=personName.docid ORDER BY person.name, pID",
+							(u" ".join(word.lower() + u"*" for word in words),))
+
+		return self.cursor.fetchall()
+
+
+	def findLocalID(self, lastName):
+		"""
+		Print every mathematician of the local database who matches the name like findID does
+		for the online search. Return True if at least one was found.
+		"""
+		start = time.time()
+		rows = self.searchNames(lastName)
+
+		for row in rows:
+			if self.webMode:
+				print(u"{};{};{};{}".format(row["pID"], row["name"], row["university"], row["year"]).encode('utf-8'))
+
+			else:
+				print(u"ID: {}  Name: {}  University: {}  Year: {}"
+					  .format(row["pID"], row["name"], row["university"], row["year"]).encode('utf-8'))
+
+		if not self.webMode and len(rows) > 0:
+			print(u"Found {} mathematician(s) in the local database in {:.1f}ms"
+				  .format(len(rows), 1000 * (time.time() - start)).encode('utf-8'))
+
+		return len(rows) > 0
+
+
+	def insertOrUpdate(self, id, name, unis, years, advisors, dissertations, numberOfDescendants, fingerprint=None):
 		"""
 		Update or create entries in the tables mathematicians, advised and dissertation of the local database.
 		Replace existing mathematicians.
+		The records are buffered and written together in one transaction as soon as flushSize records
+		are waiting or flushInterval seconds have passed since the last transaction.
 		"""
-		self.cursor.execute("DELETE FROM dissertation WHERE author=?", (id,))
-		self.connection.commit()
+		self.buffered[id] = [name, unis, years, advisors, dissertations, numberOfDescendants, fingerprint]
 
-		self.cursor.execute("INSERT INTO person VALUES (?, ?, ?)",  (id, name, numberOfDescendants))
-		self.connection.commit()
+		# A record which is grabbed again replaces the buffered one
+		self.buffered[id] = self.buffered.pop(id)
+
+		if len(self.buffered) + self.uncommitted >= self.flushSize or \
+		   time.time() - self.lastFlush >= self.flushInterval:
+			self.flush()
+
+
+	@staticmethod
+	def fingerprint(record):
+		"""
+		Return a hash of everything the Mathematics Genealogy Project shows of a mathematician,
+		including the students and the number of descendants.
+		"""
+		[name, uni, year, advisors, students, dissertation, numberOfDescendants] = record
+		content = repr([name, uni, year, advisors, sorted(students), dissertation, numberOfDescendants])
+
+		return hashlib.sha1(content).hexdigest()
+
+
+	def storedFingerprint(self, id):
+		if id in self.buffered:
+			return self.buffered[id][6]
+
+		self.cursor.execute("SELECT fingerprint FROM person WHERE pID=?", (id,))
+		row = self.cursor.fetchone()
+
+		return row["fingerprint"] if row is not None else None
+
+
+	def storeRecord(self, id, record):
+		"""
+		Store a grabbed record with insertOrUpdate unless its fingerprint shows that the stored
+		record is still up to date. The naive mode always stores it.
+		Return True if the record changed.
+		"""
+		fingerprint = self.fingerprint(record)
+
+		if not self.naiveMode and self.storedFingerprint(id) == fingerprint:
+			self.unchanged += 1
+			return False
 
-		advOrder = 0
+		[name, uni, year, advisors, students, dissertation, numberOfDescendants] = record
+		self.insertOrUpdate(id, name, uni, year, advisors, dissertation, numberOfDescendants, fingerprint)
 
-		# Create iterators.
-		iterAdvisor = iter(advisors)
-		iterUni = iter(unis)
-		iterYear = iter(years)
+		return True
 
-		# The lists dissertation, uni and year have the same length. The items are either set or None.
-		# Hence, iterating one of them is enough to avoid range errors.
-		for dissertation in dissertations:
-			uni = next(iterUni)
-			year = next(iterYear)
 
-			self.cursor.execute("INSERT INTO dissertation VALUES (NULL, ?, ?, ?, ?)", (id, dissertation, uni, year))
-			self.connection.commit()
-			did = self.cursor.lastrowid
+	def writeBuffered(self):
+		"""
+		Write the buffered records with one statement per table without committing them.
+		Queries of this connection see them anyway.
+		"""
+		if len(self.buffered) == 0:
+			return
+
+		persons = []
+		dissertationRows = []
+		advisedRows = []
+
+		# Set the dIDs here instead of asking for every lastrowid. Then all tables can be written at once.
+		# AUTOINCREMENT never reuses a dID, so continue after the highest one ever used.
+		self.cursor.execute("SELECT seq FROM sqlite_sequence WHERE name='dissertation'")
+		row = self.cursor.fetchone()
+		did = row[0] if row is not None else 0
+
+		# Only records with other advisors than before change the number of descendants of their ancestors
+		# and the ancestors of their descendants
+		countersUsed = not self.counter.isEmpty()
+		ancestryUsed = not self.ancestry.isEmpty()
+		depthsUsed = not self.depths.isEmpty()
+		changedIDs = []
+
+		if countersUsed or ancestryUsed or depthsUsed:
+			ids = list(self.buffered)
+			oldAdvisors = collections.defaultdict(set)
+
+			# Ask for the stored advisors of many records at once (SQLite allows 999 parameters per statement)
+			for i in range(0, len(ids), 500):
+				chunk = ids[i:i+500]
+				self.cursor.execute("SELECT author, advisor FROM advised, dissertation WHERE student=dID AND author IN ({})"
+									.format(", ".join("?" * len(chunk))), chunk)
+
+				for row in self.cursor.fetchall():
+					oldAdvisors[row["author"]].add(row["advisor"])
+
+			changedAdvisors = set()
+
+			for id, record in self.buffered.items():
+				newAdvisors = set(record[3])
+				newAdvisors.discard(0)
+
+				if newAdvisors != oldAdvisors[id]:
+					changedIDs.append(id)
+					changedAdvisors.update(newAdvisors.symmetric_difference(oldAdvisors[id]))
+
+			if countersUsed:
+				self.counter.invalidate(changedAdvisors)
+
+		for id, [name, unis, years, advisors, dissertations, numberOfDescendants, fingerprint] in self.buffered.items():
+			persons.append((id, name, numberOfDescendants, fingerprint))
+
+			advOrder = 0
+
+			# Create iterators.
+			iterAdvisor = iter(advisors)
+			iterUni = iter(unis)
+			iterYear = iter(years)
+
+			# The lists dissertation, uni and year have the same length. The items are either set or None.
+			# Hence, iterating one of them is enough to avoid range errors.
+			for dissertation in dissertations:
+				uni = next(iterUni)
+				year = next(iterYear)
+
+				did += 1
+				dissertationRows.append((did, id, dissertation, uni, year))
+
+				for advID in iterAdvisor:
+					# If advisors are separated by 0, then a new set of advisors starts
+					# which means, that there is also another dissertation.
+					# Hence, the order must be reset and the next set of advisors must be grabbed.
+					if advID == 0:
+						advOrder = 0
+						break
+
+					advOrder += 1
+					advisedRows.append((did, advOrder, advID))
+
+		# Foreign keys aren't enforced, so the advisors of the former dissertations are deleted explicitly.
+		# The trigger delPerson deletes the persons as well, before they are inserted again
+		authors = [(id,) for id in self.buffered]
+		self.cursor.executemany("DELETE FROM advised WHERE student IN (SELECT dID FROM dissertation WHERE author=?)", authors)
+		self.cursor.executemany("DELETE FROM dissertation WHERE author=?", authors)
+		self.cursor.executemany("INSERT INTO person VALUES (?, ?, ?, ?)", persons)
+		self.cursor.executemany("INSERT INTO dissertation VALUES (?, ?, ?, ?, ?)", dissertationRows)
+		self.cursor.executemany("INSERT INTO advised VALUES (?, ?, ?)", advisedRows)
+
+		if ancestryUsed:
+			self.ancestry.update(changedIDs)
+
+		if depthsUsed:
+			self.depths.update(changedIDs)
+
+		self.uncommitted += len(self.buffered)
+		self.buffered = collections.OrderedDict()
 
-			for advID in iterAdvisor:
-				# If advisors are separated by 0, then a new set of advisors starts
-				# which means, that there is also another dissertation.
-				# Hence, the order must be reset and the next set of advisors must be grabbed.
-				if advID == 0:
-					advOrder = 0
-					break
 
-				advOrder += 1
-				self.cursor.execute("INSERT INTO advised VALUES (?, ?, ?)",  (did, advOrder, advID))
-				self.connection.commit()
+	def advisorsOf(self, id):
+		self.cursor.execute("SELECT advisor FROM advised, dissertation WHERE student=dID AND author=?", (id,))
 
+		return set(row["advisor"] for row in self.cursor.fetchall())
 
-	def grabNode(self, id):
+
+	def flush(self):
+		"""
+		Write the buffered records and commit everything written since the last transaction.
+		"""
+		self.writeBuffered()
+		self.connection.commit()
+
+		self.uncommitted = 0
+		self.lastFlush = time.time()
+
+
+	def grabNode(self, id, notFoundRetries=15):
 		"""
 		Use the Grabber class to grab all stored information of a mathematician from
 		the Mathematics Genealogy Project and return them.
+		An incomplete page is grabbed again. Network errors are already retried by the Grabber.
 		"""
+		return grab.Grabber.retryPolicy.call(self.grabRecord, (id, notFoundRetries), ("parse",))
+
+
+	def grabRecord(self, id, notFoundRetries, page=None):
 		try:
-			grabber = grab.Grabber(id)
+			grabber = grab.Grabber(id, page)
 
 			# foundID indicates that the program runs in Update-by-Name mode. Following output
-			# is disturbing in this mode.
-			if not self.foundID:
+			# is disturbing in this mode and in mirror mode.
+			if not self.foundID and self.printRecords:
 				print(u"\nGrabbing record #{}:".format(id).encode('utf-8'))
 
-			[name, uni, year, advisors, students, dissertation, numberOfDescendants] = grabber.extractNodeInformation()
+			[name, uni, year, advisors, students, dissertation, numberOfDescendants] = \
+				grabber.extractNodeInformation(notFoundRetries)
 
-			if not self.foundID:
+			if not self.foundID and self.printRecords:
 				print(u"Name: {}  University: {}  Year: {}".format(name, uni[0], year[0]).encode('utf-8'))
 
+			if self.harvestStudents:
+				# Workers only add entries, the calling thread takes them out again
+				self.studentInfo[id] = grabber.studentInfo
+
 		except ValueError:
 			# The given id does not exist in the Math Genealogy Project.
 			raise
 
 		except IndexError:
-			print(u"Index Error: Grab again.".encode('utf-8'))
-			return self.grabNode(id)
+			# An incomplete page is grabbed again, hence it mustn't be read from the cache
+			if grab.Grabber.cache is not None:
+				grab.Grabber.cache.discard(id, grabber.pagestr)
+
+			raise
 
 		return [name, uni, year, advisors, students, dissertation, numberOfDescendants]
 
 
-	def recursiveAncestors(self, advisors):
+	def fetchNode(self, id, notFoundRetries=15):
 		"""
-		Take the advisor list and grab them recursively.
-		Grabbed advisors will be stored in a separate list to avoid grabbing the same ID several times.
+		First stage of the Crawler: grab the page of a mathematician.
 		"""
-		for advisor in advisors:
-			# ID=0 just indicates that a new set of advisors begins here. ID=0 shouldn't be grabbed.
-			if advisor == 0:
-				continue
+		grabber = grab.Grabber(id)
+		grabber.fetch(notFoundRetries)
+
+		return grabber.pagestr
+
+
+	def parseNode(self, id, page):
+		"""
+		Second stage of the Crawler: extract the record of a grabbed page.
+		"""
+		try:
+			return self.grabRecord(id, 0, page)
+
+		except IndexError:
+			# The page is incomplete. Grab it again like grabNode does.
+			return self.grabNode(id)
 
-			[name, uni, year, nextAdvisors, nextStudents, dissertation, numberOfDescendants] = self.grabNode(advisor)
-			self.currentAdvisorsGrab.append(advisor)
-			self.insertOrUpdate(advisor, name, uni, year, nextAdvisors, dissertation, numberOfDescendants)
 
-			# Smart update not possible for ancestors as the number of all ancestors isn't stored online.
+	def crawlStages(self, fetchFunction, parseFunction):
+		return [("fetch", fetchFunction, self.workers), ("parse", parseFunction, self.parsers)]
 
-			ungrabbedAdvisors = []
 
-			if len(nextAdvisors) > 0:
-				for nextAdvisor in nextAdvisors:
-					if nextAdvisor not in self.currentAdvisorsGrab:
-						ungrabbedAdvisors.append(nextAdvisor)
+	def updateByID(self, ids, ancestors, descendants):
+		"""
+		Grab the given ID(s) and grab their ancestors and/or descendants and update their paths.
+		Instead of recursion, a frontier in the local database holds the IDs which are still to be
+		grabbed. Hence, an interrupted update continues where it stopped when it is started again.
+		Several records are grabbed at the same time if there is more than one worker.
+		Pages are parsed by other threads than the ones which grab them.
+		"""
+		frontier = crawl.Frontier(self.connector)
+
+		if len(frontier) > 0:
+			print(u"Continue interrupted update: {} record(s) left".format(len(frontier)).encode('utf-8'))
+
+		frontier.add(ids, "seed")
+		self.connection.commit()
+
+		crawler = crawl.Crawler(self.crawlStages(self.fetchNode, self.parseNode), frontier)
+		crawler.start()
+
+		try:
+			for id, direction, result in crawler.results():
+				[name, uni, year, advisors, students, dissertation, numberOfDescendants] = result
+				studentInfo = self.studentInfo.pop(id, {})
+
+				if not self.storeRecord(id, result) and self.printRecords:
+					print(u"Record unchanged".encode('utf-8'))
+
+				# Ancestors are only followed upwards and descendants only downwards
+				if direction == "ancestors" or (ancestors and direction == "seed"):
+					# Smart update not possible for ancestors as the number of all ancestors isn't stored online.
+					frontier.add(advisors, "ancestors")
 
-				self.recursiveAncestors(ungrabbedAdvisors)
+				if direction == "descendants" or (descendants and direction == "seed"):
+					# The fingerprint covers the students and the online number of descendants. Whether the
+					# subtree below is complete in the local database is still checked by smartUpdate.
+					if self.naiveMode or not self.smartUpdate(id, numberOfDescendants):
+						frontier.add(self.harvestLeaves(id, students, studentInfo), "descendants")
 
+				frontier.done(id, direction)
 
-	def recursiveDescendants(self, students):
+		finally:
+			crawler.stop()
+
+			# Keep the records of an interrupted update, together with their state in the frontier
+			self.flush()
+
+		frontier.clear()
+
+		if not self.webMode:
+			print(crawler.statistics().encode('utf-8'))
+
+
+	def harvestLeaves(self, advisor, students, studentInfo):
 		"""
-		Take the student list and grab them recursively.
-		Grabbed students will be stored in a separate list to avoid grabbing the same ID several times.
+		Store the students without descendants as shown in the table of students of their advisor
+		and return the students which still have to be grabbed. Every student is returned if
+		harvestStudents isn't set.
 		"""
+		if not self.harvestStudents:
+			return students
+
+		remaining = []
+
 		for student in students:
-			[name, uni, year, nextAdvisors, nextStudents, dissertation, numberOfDescendants] = self.grabNode(student)
-			self.currentStudentsGrab.add(student)
+			if not (student in studentInfo and studentInfo[student][3] == 0 and
+					self.storeHarvested(student, advisor, studentInfo[student])):
+				remaining.append(student)
 
-			# Update before comparing numbers because the comparing checks only if the
-			# descendants are in the database and not if the current mathematician is in it.
-			self.insertOrUpdate(student, name, uni, year, nextAdvisors, dissertation, numberOfDescendants)
+		return remaining
 
-			if not self.naiveMode and self.smartUpdate(student, numberOfDescendants):
-				continue
 
-			if len(nextStudents) > 0:
-				self.recursiveDescendants(nextStudents.difference(self.currentStudentsGrab))
+	def storeHarvested(self, id, advisor, info):
+		"""
+		Store a student known from the table of students of an advisor. The dissertation title
+		is unknown. Completely grabbed records are never replaced. Return False if the student
+		has to be grabbed: the table of students doesn't show whether a student with another
+		advisor has one dissertation with both advisors or two dissertations, nor their order.
+		"""
+		[name, school, year, numberOfDescendants] = info
 
+		if id in self.buffered:
+			fingerprint = self.buffered[id][6]
+			advisors = self.buffered[id][3]
 
-	def updateByID(self, ids, ancestors, descendants):
+		else:
+			self.cursor.execute("SELECT fingerprint FROM person WHERE pID=?", (id,))
+			row = self.cursor.fetchone()
+
+			if row is None:
+				fingerprint = HARVESTED
+				advisors = []
+
+			else:
+				fingerprint = row["fingerprint"]
+				advisors = sorted(self.advisorsOf(id))
+
+		if fingerprint != HARVESTED or advisor in advisors:
+			return True
+
+		if len(advisors) > 0:
+			return False
+
+		self.harvested += 1
+		self.insertOrUpdate(id, name, [school], [year], [advisor], [None], numberOfDescendants, HARVESTED)
+
+		return True
+
+
+	def fetchMirrorNode(self, id):
 		"""
-		Grab the given ID(s) and grab their ancestors and/or descendants and update their paths.
+		Grab a page for the mirror. IDs which don't exist are expected in a range of IDs.
+		Hence, they are neither grabbed again nor raised, but None is returned.
+		"""
+		try:
+			return self.fetchNode(id, 0)
+
+		except grab.IDNotFoundError:
+			return None
+
+
+	def parseMirrorNode(self, id, page):
+		if page is None:
+			return None
+
+		return self.parseNode(id, page)
+
+
+	def mirror(self, first, last, shardSize):
+		"""
+		Grab every ID from first to last and store all existing records in the local database.
+		The range is split into shards which are grabbed at the same time by the workers.
+		Every shard stores how far it got. Hence, an interrupted mirror continues where it
+		stopped when it is started again. Progress and estimated time left are printed every 10s.
+		"""
+		frontier = crawl.ShardFrontier(self.connector, first, last, shardSize, self.workers)
+		total = len(frontier)
+
+		if total == 0:
+			print(u"All IDs from {} to {} have already been grabbed.".format(first, last).encode('utf-8'))
+			return
+
+		print(u"Mirror IDs from {} to {}: {} ID(s) left".format(first, last, total).encode('utf-8'))
+
+		self.printRecords = False
+		crawler = crawl.Crawler(self.crawlStages(self.fetchMirrorNode, self.parseMirrorNode), frontier)
+		crawler.start()
+
+		start = time.time()
+		lastReport = start
+		finished = 0
+		missing = 0
+
+		try:
+			for id, direction, result in crawler.results():
+				finished += 1
+
+				if result is None:
+					missing += 1
+					frontier.done(id, True)
+
+				else:
+					self.storeRecord(id, result)
+					frontier.done(id)
+
+				if time.time() - lastReport >= 10 or finished == total:
+					lastReport = time.time()
+					rate = finished / (lastReport - start)
+					eta = int((total - finished) / rate) if rate > 0 else 0
+
+					print(u"{}/{} ID(s) ({:.1%})  Records: {}  Missing: {}  {:.1f} IDs/s  ETA: {}:{:02}:{:02}"
+						  .format(finished, total, float(finished) / total, finished - missing, missing, rate,
+								  eta // 3600, eta // 60 % 60, eta % 60).encode('utf-8'))
+
+		finally:
+			crawler.stop()
+
+			# Keep the records of an interrupted mirror, together with the checkpoints of the shards
+			self.flush()
+			self.printRecords = True
+
+		if not self.webMode:
+			print(crawler.statistics().encode('utf-8'))
+
+
+	def updateFromCache(self, ids):
+		"""
+		Parse the cached pages of the given ID(s) again and update the local database without online access.
+		If no ID is given, all cached pages will be parsed. Records which aren't cached stay untouched.
+		The workers are processes which parse the pages.
 		"""
+		cache = grab.Grabber.cache
+
+		if len(ids) == 0:
+			ids = cache.ids()
+
+		self.storeParsed(ingest.parsePages(self.cachedPages(cache, ids), self.workers))
+
+
+	def cachedPages(self, cache, ids):
 		for id in ids:
-			[name, uni, year, advisors, students, dissertation, numberOfDescendants] = self.grabNode(id)
-			self.insertOrUpdate(id, name, uni, year, advisors, dissertation, numberOfDescendants)
+			# Stale pages are good enough offline
+			page = cache.get(id, float("inf"))
+
+			if page is None:
+				print(u"No cached page of #{}".format(id).encode('utf-8'))
+				continue
+
+			yield id, page
+
+
+	def updateFromPages(self, path):
+		"""
+		Parse the saved id.php pages of a folder or a zip or tar archive and update the local database
+		without online access. The workers are processes which parse the pages, while this process
+		writes the records in batches. Progress is printed every 10s.
+		"""
+		self.printRecords = False
+
+		try:
+			self.storeParsed(ingest.parsePages(ingest.savedPages(path), self.workers))
+
+		finally:
+			self.printRecords = True
+
 
-			if ancestors:
-				self.recursiveAncestors(advisors)
+	def storeParsed(self, results):
+		"""
+		Store the (ID, record, error) tuples of ingest.parsePages.
+		"""
+		start = time.time()
+		lastReport = start
+		parsed = 0
+		failed = 0
+
+		try:
+			for id, record, error in results:
+				if record is None:
+					failed += 1
+
+					if not self.webMode:
+						print(u"Skipped #{}: {}".format(id, error).encode('utf-8'))
 
-			if descendants:
-				if not self.naiveMode and self.smartUpdate(id, numberOfDescendants):
 					continue
 
-				self.recursiveDescendants(students)
+				parsed += 1
+
+				if not self.webMode and self.printRecords:
+					print(u"Parsed record #{}: {}".format(id, record[0]).encode('utf-8'))
+
+				# A changed parser changes the fingerprint as well
+				self.storeRecord(id, record)
+
+				if not self.webMode and not self.printRecords and time.time() - lastReport >= 10:
+					lastReport = time.time()
+					print(u"{} page(s) parsed  {:.1f} pages/s".format(parsed + failed, (parsed + failed) / (lastReport - start))
+						  .encode('utf-8'))
+
+		finally:
+			self.flush()
+
+		if not self.webMode:
+			seconds = max(time.time() - start, 1e-6)
+			print(u"Parsed: {}  Skipped: {}  Unchanged: {}  Time: {:.1f}s  {:.1f} pages/s"
+				  .format(parsed, failed, self.unchanged, seconds, (parsed + failed) / seconds).encode('utf-8'))
 
 
 	def smartUpdate(self, id, onlineNumber):
@@ -270,6 +737,9 @@ class Updater:
 		given by the advised-table.
 		If numbers are equal, no mathematician has been added and no update is needed.
 		"""
+		# The buffered records are part of the local database, too
+		self.writeBuffered()
+
 		self.cursor.execute("SELECT author FROM advised, dissertation WHERE student=dID AND advisor=?", (id,))
 		localStudents = self.cursor.fetchall()
 
@@ -281,14 +751,25 @@ class Updater:
 			for row in localStudents:
 				storedStudents.add(row["author"])
 
-			searcher = search.Searcher(self.connector, False, False)
-			calculatedNumber = searcher.numberOfDescendants(storedStudents)
+			# Compute the numbers of all mathematicians at once instead of walking every branch
+			if self.counter.isEmpty():
+				self.counter.build()
+
+			calculatedNumber = self.counter.get(id)
 
 			if calculatedNumber == onlineNumber:
 				print(u"In local database = {}".format(calculatedNumber).encode('utf-8'))
-				print(u"Skip branch!".encode('utf-8'))
 
-				return True
+				# Harvested records are grabbed completely by an update without harvesting
+				if not self.harvestStudents:
+					self.cursor.execute(HARVESTED_BELOW, (id, HARVESTED))
+
+				if self.harvestStudents or self.cursor.fetchone() is None:
+					print(u"Skip branch!".encode('utf-8'))
+
+					return True
+
+				print(u"Grab the harvested records of this branch!".encode('utf-8'))
 
 			else:
 				print(u"In local database >= {}".format(calculatedNumber).encode('utf-8'))
@@ -296,10 +777,17 @@ class Updater:
 			if calculatedNumber > onlineNumber:
 				print(u"Student(s) online deleted! Delete them in local database and grab this branch again.".encode('utf-8'))
 
+				formerAdvisors = set()
+
 				for delStudent in storedStudents:
+					formerAdvisors.update(self.advisorsOf(delStudent))
 					self.cursor.execute("DELETE FROM dissertation WHERE author=?", (delStudent,))
 					# TRIGGER and CASCADE statements will delete the entries in the other tables
-					self.connection.commit()
+					# The next flush commits the deletion
+
+				self.counter.invalidate(formerAdvisors)
+				self.ancestry.update(storedStudents)
+				self.depths.update(storedStudents)
 
 		elif len(localStudents) == 0 and onlineNumber < 2:
 			print(u"In local database = 0".encode('utf-8'))
@@ -25,10 +25,13 @@ class Visualizer:
 	"""
 	Class for generating DOT-files to answer the search queries.
 	"""
-	def __init__(self, connector, details):
+	def __init__(self, connector, details, graph=None):
 		self.connection = connector[0]
 		self.cursor = connector[1]
 
+		# Students are taken from the graph in memory if the searcher has loaded it
+		self.graph = graph
+
 		self.noDetails = details
 
 
@@ -61,18 +64,22 @@ class Visualizer:
 	def createEdgeStr(self, color, id, blackSet, redSet):
 		# Get relationship and store it to add it at the end of the
 		# DOT-file when exiting this loop.
-		self.cursor.execute("SELECT author FROM advised, dissertation WHERE student=dID AND advisor=?", (id,))
-		students = self.cursor.fetchall()
+		if self.graph is not None:
+			students = self.graph.students(id)
+
+		else:
+			self.cursor.execute("SELECT author FROM advised, dissertation WHERE student=dID AND advisor=?", (id,))
+			students = [row["author"] for row in self.cursor.fetchall()]
 
 		edges = ""
 
 		for student in students:
-			if redSet is not None and student["author"] in redSet:
-				edgeStr = u"\n    {} -> {} [color={}];".format(id, student["author"], color).encode('utf-8')
+			if redSet is not None and student in redSet:
+				edgeStr = u"\n    {} -> {} [color={}];".format(id, student, color).encode('utf-8')
 				edges += edgeStr
 
-			elif blackSet is not None and student["author"] in blackSet:
-				edgeStr = u"\n    {} -> {} [color=black];".format(id, student["author"]).encode('utf-8')
+			elif blackSet is not None and student in blackSet:
+				edgeStr = u"\n    {} -> {} [color=black];".format(id, student).encode('utf-8')
 				edges += edgeStr
 
 		return edges